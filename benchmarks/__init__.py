@@ -0,0 +1,5 @@
+"""
+End-to-end benchmarks of the integration against the emulated Salus cloud.
+
+Run with `python -m benchmarks`, see `--help` for comparing to a baseline.
+"""
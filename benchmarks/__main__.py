@@ -0,0 +1,52 @@
+"""Runs the benchmarks and compares them to a baseline."""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.salus_controls.capture import read_capture
+
+from .suite import async_run, compare
+
+
+async def main(args: argparse.Namespace) -> dict:
+    """Runs the benchmarks with a Home Assistant instance of their own."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        try:
+            capture = read_capture(args.capture) if args.capture else None
+            return await async_run(hass, args.rounds, args.iterations, capture)
+        finally:
+            await hass.async_stop(force=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("python -m benchmarks", description="Salus Controls benchmarks")
+    parser.add_argument("--output", help="File the results are written to as JSON")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against")
+    parser.add_argument("--tolerance", default=0.25, type=float,
+                        help="Share by which a metric may be worse than the baseline")
+    parser.add_argument("--rounds", default=50, type=int, help="Polls and writes timed per backend")
+    parser.add_argument("--iterations", default=5000, type=int, help="Responses decoded per backend")
+    parser.add_argument("--capture", help="Capture whose reads are replayed, e.g. one recorded in the field")
+    args = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.WARNING)
+
+    results = asyncio.run(main(args))
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,97 @@
+"""
+Sets up the integration against the emulator the way Home Assistant would.
+"""
+import logging
+import types
+
+from collections.abc import Callable
+
+import aiohttp
+
+from homeassistant.util import slugify
+
+from custom_components.salus_controls import climate, number, select, switch
+from custom_components.salus_controls.api_client import ApiClient
+from custom_components.salus_controls.client import CloudClient
+from custom_components.salus_controls.const import BACKEND_API, BACKEND_WEB
+from custom_components.salus_controls.coordinator import SalusCoordinator
+from custom_components.salus_controls.web_client import WebClient
+from emulator import Faults, SalusCloud
+
+PASSWORD = "secret"
+
+PLATFORMS = (climate, number, select, switch)
+
+CLIENTS = {
+    BACKEND_API: ApiClient,
+    BACKEND_WEB: WebClient,
+}
+
+
+def username_of(account: int) -> str:
+    """Returns the username of the numbered account, as named by `python -m emulator`."""
+    return f"user{account}@example.com"
+
+
+def device_ids_of(account: int, devices: int) -> list[str]:
+    """Returns the IDs of the devices of the numbered account, as named by `python -m emulator`."""
+    return [f"{account}{device:04d}" for device in range(devices)]
+
+
+def create_cloud(accounts: int, devices: int, faults: Faults | None = None, **kwargs) -> SalusCloud:
+    """Creates a cloud with the given number of accounts and devices per account."""
+    cloud = SalusCloud(faults, **kwargs)
+    for account in range(accounts):
+        username = username_of(account)
+        cloud.add_account(username, PASSWORD)
+        for device_id in device_ids_of(account, devices):
+            cloud.add_device(username, device_id)
+    return cloud
+
+
+def create_client(backend: str, username: str, base_url: str, **kwargs) -> CloudClient:
+    """Creates a client of the backend talking to the emulator."""
+    return CLIENTS[backend](username, PASSWORD, base_url=base_url, **kwargs)
+
+
+async def async_setup_entities(hass, coordinator: SalusCoordinator) -> list:
+    """Creates the entities of all platforms, subscribes them to the coordinator and writes their states."""
+    # Entities added without an entity platform warn once each
+    logging.getLogger("homeassistant.helpers.entity").setLevel(logging.ERROR)
+
+    entry = types.SimpleNamespace(runtime_data=coordinator)
+    entities = []
+    for platform in PLATFORMS:
+        await platform.async_setup_entry(hass, entry, entities.extend)
+
+    for entity in entities:
+        entity.hass = hass
+        domain = type(entity).__module__.rsplit(".", 1)[-1]
+        entity.entity_id = f"{domain}.{slugify(entity.unique_id)}"
+        await entity.async_added_to_hass()
+        # Written once when added, as the entity platform does
+        entity.async_write_ha_state()
+    return entities
+
+
+def trace_requests(clock: Callable[[], float],
+                   record: Callable[[str, float, int | str], None]) -> aiohttp.TraceConfig:
+    """Reports every request of a session with the path of its URL, its duration and outcome.
+
+    The outcome is the status of the response or the name of the exception raised.
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(_session, context, params):
+        context.started = clock()
+
+    async def on_request_end(_session, context, params):
+        record(params.url.path, clock() - context.started, params.response.status)
+
+    async def on_request_exception(_session, context, params):
+        record(params.url.path, clock() - context.started, type(params.exception).__name__)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
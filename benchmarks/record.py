@@ -0,0 +1,67 @@
+"""Records the exchanges of polling an account into a capture file.
+
+Polls the devices through the same clients Home Assistant uses, against
+the Salus cloud or the URL of an emulator, e.g. to capture the responses
+of a thermostat showing a problem:
+
+    python -m benchmarks.record --username me@example.com --devices 12345 --output field.jsonl.gz
+    python -m benchmarks --capture field.jsonl.gz
+
+The password is read from the SALUS_PASSWORD environment variable or
+asked for. Credentials and tokens are redacted in the capture.
+"""
+import argparse
+import asyncio
+import getpass
+import logging
+import os
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.capture import start_capture, stop_capture
+from custom_components.salus_controls.config_flow import parse_device_ids
+from custom_components.salus_controls.const import BACKEND_API, BACKEND_WEB
+
+from .fixtures import CLIENTS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def main(args: argparse.Namespace, password: str) -> int:
+    """Polls the devices until the duration is over and returns the number of exchanges recorded."""
+    url = {"base_url": args.url} if args.url else {}
+    client = CLIENTS[args.backend](args.username, password, **url)
+    device_ids = parse_device_ids(args.devices)
+    loop = asyncio.get_running_loop()
+    end = loop.time() + args.duration
+    writer = start_capture(client, args.output)
+    try:
+        while (started := loop.time()) < end:
+            for device_id in device_ids:
+                try:
+                    await client.fetch_state(device_id)
+                except UpdateFailed as err:
+                    _LOGGER.warning("Could not read %s: %s", device_id, err)
+            await asyncio.sleep(max(0.0, min(end, started + args.interval) - loop.time()))
+    finally:
+        stop_capture(client)
+        await client.close()
+        await loop.run_in_executor(None, writer.join)
+    return writer.count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("python -m benchmarks.record", description="Records a Salus capture")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--devices", required=True, help="Comma separated device IDs")
+    parser.add_argument("--output", required=True, help="Capture file written, gzip compressed JSON lines")
+    parser.add_argument("--backend", default=BACKEND_API, choices=(BACKEND_API, BACKEND_WEB))
+    parser.add_argument("--url", help="Base URL of an emulator instead of the Salus cloud")
+    parser.add_argument("--duration", default=300.0, type=float, help="Seconds to record")
+    parser.add_argument("--interval", default=30.0, type=float, help="Seconds between polls")
+    arguments = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.WARNING)
+
+    secret = os.environ.get("SALUS_PASSWORD") or getpass.getpass("Salus password: ")
+    count = asyncio.run(main(arguments, secret))
+    print(f"Recorded {count} exchanges to {arguments.output}")
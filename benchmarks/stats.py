@@ -0,0 +1,24 @@
+"""
+Summaries of latency samples.
+"""
+import statistics
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Returns the sample below which the given fraction of the samples lies."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples: list[float], scale: float = 1000.0) -> dict:
+    """Returns the count, mean and percentiles of the samples, in milliseconds by default."""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean": statistics.fmean(samples) * scale,
+        "p50": percentile(samples, 0.50) * scale,
+        "p95": percentile(samples, 0.95) * scale,
+        "p99": percentile(samples, 0.99) * scale,
+        "max": max(samples) * scale,
+    }
@@ -0,0 +1,261 @@
+"""
+Benchmarks of the integration against the emulated Salus cloud.
+
+Every benchmark returns its metrics keyed by name, each with its value,
+unit and whether lower or higher values are better.
+"""
+import asyncio
+import json
+import time
+
+from homeassistant.components.climate.const import HVACMode
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls import api_client, web_client
+from custom_components.salus_controls.api_client import ApiClient
+from custom_components.salus_controls.capture import CapturedExchange, replay
+from custom_components.salus_controls.climate import ThermostatEntity
+from custom_components.salus_controls.const import BACKEND_API, BACKEND_WEB
+from custom_components.salus_controls.coordinator import CONFIRM_DELAY_SECONDS, SalusCoordinator
+from custom_components.salus_controls.trace import REDACTED
+from custom_components.salus_controls.transport import Response
+from custom_components.salus_controls.web_client import WebClient, parse_response
+from emulator import EmulatorServer, Thermostat, attributes_xml
+from emulator.cloud import OPERATION_LOGIN, OPERATION_READ, OPERATION_WRITE
+
+from .fixtures import async_setup_entities, create_client, create_cloud
+from .stats import summarize
+
+BACKENDS = (BACKEND_API, BACKEND_WEB)
+
+LOWER = "lower"
+HIGHER = "higher"
+
+# Devices of the account polled by the poll path benchmark
+POLL_DEVICES = 4
+
+# Setters of the clients with the field they write and the values they alternate between
+SETTERS = {
+    "set_temperature": ("target_temperature", (21.5, 20.5)),
+    "set_hvac_mode": ("mode", (HVACMode.OFF, HVACMode.HEAT)),
+    "set_hot_water_mode": ("hot_water_enabled", (False, True)),
+    "set_freeze_protection_temperature": ("frost", (7.0, 5.0)),
+    "set_temperature_offset": ("temperature_offset", (0.5, 0.0)),
+    "set_temperature_span": ("temperature_span", (1, 0)),
+}
+
+# Client and path of the reads of each backend replayed from a capture
+REPLAYED_READS = {
+    BACKEND_API: (ApiClient, api_client.URL_GET_DATA),
+    BACKEND_WEB: (WebClient, web_client.URL_GET_DATA),
+}
+
+# Setpoints sent while dragging the thermostat's slider
+SETPOINT_BURST = (21.0, 21.5, 22.0, 22.5, 23.0)
+SETPOINT_BURST_INTERVAL_SECONDS = 0.1
+
+
+def metric(value: float, unit: str, better: str = LOWER) -> dict:
+    """Returns a metric as stored in the results."""
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def latency_metrics(name: str, samples: list[float]) -> dict:
+    """Returns the median and 95th percentile of the samples."""
+    summary = summarize(samples)
+    return {
+        f"{name}.p50": metric(summary["p50"], "ms"),
+        f"{name}.p95": metric(summary["p95"], "ms"),
+    }
+
+
+async def async_poll_path(hass, backend: str, rounds: int) -> dict:
+    """Times refreshes of the coordinator, from the requests to the entity updates."""
+    cloud = create_cloud(1, POLL_DEVICES)
+    username, account = next(iter(cloud.accounts.items()))
+    async with EmulatorServer(cloud) as server:
+        client = create_client(backend, username, server.base_url)
+        # Every refresh reaches the cloud
+        client.configure(freshness=0)
+        coordinator = SalusCoordinator(hass, client, list(account.devices))
+        await async_setup_entities(hass, coordinator)
+        # The first refresh also logs in
+        await coordinator.async_refresh()
+
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            samples.append(time.perf_counter() - start)
+
+        await coordinator.async_shutdown()
+        await client.close()
+
+    return latency_metrics(f"poll.{backend}", samples)
+
+
+async def async_write_latency(backend: str, rounds: int) -> dict:
+    """Times each setter the backend supports."""
+    cloud = create_cloud(1, 1)
+    username, account = next(iter(cloud.accounts.items()))
+    device_id = next(iter(account.devices))
+    results = {}
+    async with EmulatorServer(cloud) as server:
+        client = create_client(backend, username, server.base_url)
+        # Logs in, the web client needs a device to get its token from
+        await client.get_state(device_id)
+
+        for setter, (field, values) in SETTERS.items():
+            if field not in client.writable_fields:
+                continue
+            samples = []
+            for index in range(rounds):
+                start = time.perf_counter()
+                await getattr(client, setter)(device_id, values[index % len(values)])
+                samples.append(time.perf_counter() - start)
+            results.update(latency_metrics(f"write.{backend}.{setter}", samples))
+
+        await client.close()
+    return results
+
+
+async def async_user_actions(hass, backend: str) -> dict:
+    """Counts the requests and logins caused by typical user actions.
+
+    Writes are counted together with the refresh confirming them.
+    """
+    cloud = create_cloud(1, 1)
+    username, account = next(iter(cloud.accounts.items()))
+    results = {}
+    async with EmulatorServer(cloud) as server:
+        client = create_client(backend, username, server.base_url)
+        # The refresh right after the writes reaches the cloud rather than
+        # returning the state read while confirming them
+        client.configure(freshness=0)
+        coordinator = SalusCoordinator(hass, client, list(account.devices))
+        entities = await async_setup_entities(hass, coordinator)
+        thermostat = next(entity for entity in entities if isinstance(entity, ThermostatEntity))
+
+        async def set_temperature():
+            await thermostat.async_set_temperature(temperature=22.0)
+            await asyncio.sleep(CONFIRM_DELAY_SECONDS + 0.5)
+
+        async def drag_slider():
+            writes = []
+            for temperature in SETPOINT_BURST:
+                writes.append(asyncio.create_task(
+                    thermostat.async_set_temperature(temperature=temperature)))
+                await asyncio.sleep(SETPOINT_BURST_INTERVAL_SECONDS)
+            await asyncio.gather(*writes)
+            await asyncio.sleep(CONFIRM_DELAY_SECONDS + 0.5)
+
+        actions = {
+            "first_refresh": coordinator.async_refresh,
+            "set_temperature": set_temperature,
+            "setpoint_burst": drag_slider,
+            "refresh": coordinator.async_refresh,
+        }
+        for action, run in actions.items():
+            before = cloud.stats.copy()
+            await run()
+            requests = sum(
+                cloud.stats[operation] - before[operation]
+                for operation in (OPERATION_LOGIN, OPERATION_READ, OPERATION_WRITE))
+            logins = cloud.stats[OPERATION_LOGIN] - before[OPERATION_LOGIN]
+            results[f"actions.{backend}.{action}.requests"] = metric(requests, "requests")
+            results[f"actions.{backend}.{action}.logins"] = metric(logins, "logins")
+
+        await coordinator.async_shutdown()
+        await client.close()
+    return results
+
+
+def parse_throughput(iterations: int) -> dict:
+    """Measures how many responses of each backend are decoded per second."""
+    thermostat = Thermostat()
+    api_response = Response(200, (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        + attributes_xml("0", thermostat.attributes())).encode())
+    web_body = json.dumps(thermostat.values())
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        ApiClient.decode_response(api_response)
+    api_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        WebClient.convert_to_state(parse_response(200, web_body))
+    web_elapsed = time.perf_counter() - start
+
+    return {
+        f"parse.{BACKEND_API}.throughput": metric(iterations / api_elapsed, "ops/s", HIGHER),
+        f"parse.{BACKEND_WEB}.throughput": metric(iterations / web_elapsed, "ops/s", HIGHER),
+    }
+
+
+async def async_replay(exchanges: list[CapturedExchange], rounds: int) -> dict:
+    """Times reads answered with the successful responses of a capture.
+
+    Every round replays all captured reads through a new client, so the
+    responses are decoded as they were in the field. Reads whose response
+    cannot be decoded are counted as failures.
+    """
+    results = {}
+    for backend, (factory, path) in REPLAYED_READS.items():
+        reads = [exchange for exchange in exchanges if exchange.path == path and exchange.status == 200]
+        if not reads:
+            continue
+        samples = []
+        failures = 0
+        for _ in range(rounds):
+            client = factory("replay", "replay")
+            replay(client, reads)
+            # Tokens are redacted in the capture, no login is replayed
+            client.restore_token(REDACTED, time.time())
+            for exchange in reads:
+                start = time.perf_counter()
+                try:
+                    await client.fetch_state(exchange.device_id)
+                except UpdateFailed:
+                    failures += 1
+                samples.append(time.perf_counter() - start)
+            await client.close()
+        results.update(latency_metrics(f"replay.{backend}.fetch", samples))
+        results[f"replay.{backend}.failures"] = metric(failures / rounds, "reads")
+    return results
+
+
+async def async_run(hass, rounds: int = 50, iterations: int = 5000,
+                    capture: list[CapturedExchange] | None = None) -> dict:
+    """Runs all benchmarks, the backends of the user actions concurrently as they mostly wait.
+
+    The reads of a capture are replayed when given.
+    """
+    results = parse_throughput(iterations)
+    if capture:
+        results.update(await async_replay(capture, rounds))
+    for backend in BACKENDS:
+        results.update(await async_poll_path(hass, backend, rounds))
+        results.update(await async_write_latency(backend, rounds))
+    for actions in await asyncio.gather(
+            *(async_user_actions(hass, backend) for backend in BACKENDS)):
+        results.update(actions)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns a description of every metric worse than the baseline by more than the tolerance."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        value = result["value"]
+        expected = baseline[name]["value"]
+        if result["better"] == HIGHER:
+            regressed = value < expected * (1 - tolerance)
+        else:
+            regressed = value > expected * (1 + tolerance)
+        if regressed:
+            regressions.append(f"{name}: {value} {result['unit']} (baseline {expected})")
+    return regressions
@@ -1,14 +0,0 @@
-# this file is used by the run.py test script
-# it is not required by the custom component
-
-# copy this file to config.py and replace the values
-
-USERNAME = "replace"
-PASSWORD = "replace"
-DEVICE_ID = "replace"
-
-SIMULATOR = False
-ENABLE_TEMPERATURE_CLIENT = False
-HOST = "your-home-assistant-ip-address"
-ENTITY_ID = "sensor.your-temperature-sensor"
-ACCESS_TOKEN = "your-HA-access-token"
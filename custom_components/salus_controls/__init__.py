@@ -7,65 +7,209 @@ from homeassistant.const import (
     Platform,
     CONF_PASSWORD,
     CONF_USERNAME,
-    CONF_DEVICE_ID
+    CONF_DEVICE_ID,
+    CONF_DEVICES
 )
 from homeassistant.helpers import device_registry
 
+from .accounts import AccountRegistry
+from .cache import SalusCache
+from .client import SalusClient
 from .web_client import WebClient
 from .api_client import ApiClient
-from .const import DOMAIN
+from .failover import FailoverClient
+from .const import (
+    BACKEND_API,
+    BACKEND_AUTO,
+    BACKEND_WEB,
+    CONF_BACKEND,
+    CONF_BACKENDS,
+    CONF_FEATURES,
+    CONF_LATENCY,
+    CONF_LOGIN_TIMEOUT,
+    CONF_MAX_PARALLEL_FETCHES,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_POLL_INTERVAL,
+    CONF_READ_FRESHNESS,
+    CONF_READ_TIMEOUT,
+    CONF_RETRIES,
+    CONF_TOKEN_MAX_AGE,
+    CONF_TRACE_DEVICES,
+    CONF_TRACE_ERRORS,
+    CONF_TRACE_SAMPLE_RATE,
+    CONF_WRITE_DELAY,
+    CONF_WRITE_TIMEOUT,
+    DATA_ACCOUNTS,
+    DOMAIN,
+)
+from .config_flow import parse_device_ids
 from .coordinator import SalusCoordinator
+from .transport import OPERATION_LOGIN, OPERATION_READ, OPERATION_WRITE
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS = [
     Platform.CLIMATE,
     Platform.SWITCH,
     Platform.NUMBER,
-    Platform.SELECT
+    Platform.SELECT,
+    Platform.SENSOR
 ]
 
 async def async_setup_entry(hass, entry) -> bool:
     """Set up components from a config entry."""
-    hass.data[DOMAIN] = {}
     if entry.data[CONF_USERNAME]:
-        client = create_client_from(entry.data)
-        name = entry.data[CONF_DEVICE_ID]
-
-        # assuming API object stored here by __init__.py
-        coordinator = SalusCoordinator(hass, client)
-        # Fetch initial data so we have data when entities subscribe
-        #
-        # If the refresh fails, async_config_entry_first_refresh will
-        # raise ConfigEntryNotReady and setup will try again later
-        #
-        # If you do not want to retry setup on failure, use
-        # coordinator.async_refresh() instead
-        #
-        await coordinator.async_config_entry_first_refresh()
+        accounts = hass.data.setdefault(DATA_ACCOUNTS, AccountRegistry())
+        client = acquire_client(accounts, entry.data)
+        device_ids = entry.data[CONF_DEVICES]
+
+        cache = SalusCache(hass, entry.entry_id)
+        await cache.async_load()
+        if cache.token is not None:
+            client.restore_token(cache.token, cache.token_retrieved_at)
+
+        # One coordinator fetches all thermostats of the account
+        coordinator = SalusCoordinator(
+            hass, client, device_ids, writable_fields=entry.data.get(CONF_FEATURES))
+        apply_options(coordinator, entry.options)
+        if all(device_id in cache.states for device_id in device_ids):
+            # Entities come up with the cached states while the first
+            # refresh runs in the background
+            coordinator.async_restore(cache.states)
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh(), "salus_controls first refresh")
+        else:
+            # Fetch initial data so we have data when entities subscribe
+            #
+            # If the refresh fails, async_config_entry_first_refresh will
+            # raise ConfigEntryNotReady and setup will try again later
+            #
+            try:
+                await coordinator.async_config_entry_first_refresh()
+            except Exception:
+                await accounts.async_release(client)
+                raise
 
+        entry.async_on_unload(entry.add_update_listener(async_update_options))
+        entry.async_on_unload(coordinator.async_add_listener(
+            lambda: cache.async_schedule_save(client, coordinator.data)))
+        entry.async_on_unload(lambda: cache.async_save(client, coordinator.data))
         entry.runtime_data = coordinator
 
         registry = device_registry.async_get(hass)
-        registry.async_get_or_create(
-            config_entry_id=entry.entry_id,
-            identifiers={(DOMAIN, name)},
-            manufacturer="Salus Controls",
-            name="Salus",
-            model="iT500",
-        )
+        for device_id in device_ids:
+            registry.async_get_or_create(
+                config_entry_id=entry.entry_id,
+                identifiers={(DOMAIN, device_id)},
+                manufacturer="Salus Controls",
+                name="Salus" if len(device_ids) == 1 else f"Salus {device_id}",
+                model="iT500",
+            )
 
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
 
-def create_client_from(config) -> WebClient:
+async def async_update_options(hass, entry) -> None:
+    """Apply the changed options without reloading the entry."""
+    apply_options(entry.runtime_data, entry.options)
+
+async def async_unload_entry(hass, entry) -> bool:
+    """Unload a config entry and close its connection pool."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        await entry.runtime_data.async_shutdown()
+        await hass.data[DATA_ACCOUNTS].async_release(entry.runtime_data.get_client)
+
+    return unload_ok
+
+async def async_remove_entry(hass, entry) -> None:
+    """Delete the cache of a removed config entry."""
+    await SalusCache(hass, entry.entry_id).async_remove()
+
+async def async_migrate_entry(hass, entry) -> bool:
+    """Migrate entries of a single device to entries of an account.
+
+    Entries configured before the backends were probed keep their
+    backend, the mobile application API unless failing over was chosen.
+    """
+    if entry.version == 1:
+        data = {**entry.data, CONF_DEVICES: [entry.data[CONF_DEVICE_ID]]}
+        data.pop(CONF_DEVICE_ID)
+        hass.config_entries.async_update_entry(entry, data=data, version=2, minor_version=1)
+        _LOGGER.info("Migrated Salus entry %s to version 2", entry.entry_id)
+
+    if entry.version == 2 and entry.minor_version < 2:
+        data = dict(entry.data)
+        backend = data.pop(CONF_BACKEND, BACKEND_API)
+        data.setdefault(CONF_BACKENDS, [BACKEND_API, BACKEND_WEB] if backend == BACKEND_AUTO else [backend])
+        hass.config_entries.async_update_entry(entry, data=data, minor_version=2)
+        _LOGGER.info("Migrated Salus entry %s to version 2.2", entry.entry_id)
+
+    return True
+
+def apply_options(coordinator: SalusCoordinator, options) -> None:
+    """Applies the tuning options to the coordinator and its client.
+
+    The client is shared by all entries of the account, so the options
+    applied last win for its timeouts, retries, token lifetime, read
+    freshness and tracing.
+    """
+    coordinator.configure(
+        interval=options.get(CONF_POLL_INTERVAL),
+        min_interval=options.get(CONF_MIN_POLL_INTERVAL),
+        max_interval=options.get(CONF_MAX_POLL_INTERVAL),
+        write_delay=options.get(CONF_WRITE_DELAY),
+        max_parallel_fetches=options.get(CONF_MAX_PARALLEL_FETCHES))
+
+    timeouts = {
+        operation: options[key]
+        for operation, key in (
+            (OPERATION_LOGIN, CONF_LOGIN_TIMEOUT),
+            (OPERATION_READ, CONF_READ_TIMEOUT),
+            (OPERATION_WRITE, CONF_WRITE_TIMEOUT))
+        if key in options}
+    coordinator.get_client.configure(
+        timeouts=timeouts,
+        retries=options.get(CONF_RETRIES),
+        token_max_age=options.get(CONF_TOKEN_MAX_AGE),
+        freshness=options.get(CONF_READ_FRESHNESS),
+        trace_errors=options.get(CONF_TRACE_ERRORS),
+        trace_sample_rate=options.get(CONF_TRACE_SAMPLE_RATE),
+        trace_devices=parse_device_ids(options.get(CONF_TRACE_DEVICES, "")))
+
+def acquire_client(accounts: AccountRegistry, config) -> SalusClient:
+    """Returns the client shared by all entries of the account"""
+
+    return accounts.acquire(
+        backend_of(config),
+        config[CONF_USERNAME],
+        config[CONF_PASSWORD],
+        lambda: create_client_from(config))
+
+def backend_of(config) -> str:
+    """Returns which Salus backend the entry talks to"""
+
+    backends = config.get(CONF_BACKENDS, [BACKEND_API])
+    return backends[0] if len(backends) == 1 else BACKEND_AUTO
+
+def create_client_from(config) -> SalusClient:
     """Creates a client object based on the specified configuration"""
 
     username = config[CONF_USERNAME]
     password = config[CONF_PASSWORD]
-    device_id = config[CONF_DEVICE_ID]
-    use_api_client = True
+    backend = backend_of(config)
 
-    _LOGGER.info("Creating Salus client %s", config)
+    _LOGGER.info("Creating Salus client for the %s backend", backend)
 
-    return ApiClient(username, password, device_id) if use_api_client else WebClient(username, password, device_id)
\ No newline at end of file
+    if backend == BACKEND_API:
+        return ApiClient(username, password)
+    if backend == BACKEND_WEB:
+        return WebClient(username, password)
+    # In the order measured by the config flow, the fastest backend first,
+    # ranked by the measured fetch latency until requests replace it
+    factories = {BACKEND_API: ApiClient, BACKEND_WEB: WebClient}
+    return FailoverClient(
+        {backend: factories[backend](username, password) for backend in config[CONF_BACKENDS]},
+        latencies={
+            backend: latency["fetch"] for backend, latency in config.get(CONF_LATENCY, {}).items()})
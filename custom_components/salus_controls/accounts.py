@@ -0,0 +1,58 @@
+"""
+Shares one client per Salus account between config entries.
+"""
+import hashlib
+import logging
+
+from collections.abc import Callable
+
+from .client import SalusClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AccountRegistry:
+    """Hands out one client, and so one login and connection pool, per set of credentials.
+
+    The clients are reference counted and closed once the last config
+    entry using them releases them.
+    """
+
+    def __init__(self):
+        """Initialize the registry."""
+        self._clients = {}
+        self._references = {}
+
+    def acquire(self, backend: str, username: str, password: str,
+                factory: Callable[[], SalusClient]) -> SalusClient:
+        """Returns the client of the account, creating it when it is not used yet."""
+        key = (backend, username.lower(), hashlib.sha256(password.encode()).hexdigest())
+        client = self._clients.get(key)
+        if client is None:
+            _LOGGER.debug("Creating %s client of %s", backend, username)
+            client = factory()
+            self._clients[key] = client
+            self._references[key] = 0
+        else:
+            _LOGGER.debug("Sharing %s client of %s", backend, username)
+
+        self._references[key] += 1
+        return client
+
+    async def async_release(self, client: SalusClient) -> None:
+        """Releases the client, closing it when no config entry uses it anymore."""
+        for key, shared in self._clients.items():
+            if shared is client:
+                break
+        else:
+            await client.close()
+            return
+
+        self._references[key] -= 1
+        if self._references[key] == 0:
+            del self._clients[key]
+            del self._references[key]
+            await client.close()
+
+    def __len__(self) -> int:
+        return len(self._clients)
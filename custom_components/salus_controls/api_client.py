@@ -1,187 +1,196 @@
 """
 Adds support for the Salus Thermostat units.
 """
-import time
 import logging
 import xml.etree.ElementTree as ET
 import json
 import aiohttp
 import hashlib
 
+from collections.abc import Callable
+
 from homeassistant.components.climate.const import (
     HVACMode,
-    HVACAction,
 )
 
 from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 
+from .attributes import WRITABLE_FIELDS, decode_attributes, encode_attributes
+from .client import AuthenticationError, CloudClient
 from .state import State
+from .transport import OPERATION_LOGIN, OPERATION_READ, OPERATION_WRITE, Response
 
 MAX_TOKEN_AGE_SECONDS = 60 * 60
 
-URL_LOGIN = "https://sal-emea-p01-api.arrayent.com/acc/applications/SalusService/sessions"
-URL_GET_DATA = "https://sal-emea-p01-api.arrayent.com/zdk/services/zamapi/getDeviceAttributesWithValues"
-URL_SET_DATA = "https://sal-emea-p01-api.arrayent.com/zdk/services/zamapi/setMultiDeviceAttributes2"
+BASE_URL = "https://sal-emea-p01-api.arrayent.com"
+URL_LOGIN = "/acc/applications/SalusService/sessions"
+URL_GET_DATA = "/zdk/services/zamapi/getDeviceAttributesWithValues"
+URL_SET_DATA = "/zdk/services/zamapi/setMultiDeviceAttributes2"
 
 AUTHORIZATION_TOKEN = "687886-679716122"
 
-TEMPERATURE_SPAN_ATTR = "S15"
-TEMPERATURE_OFFSET_ATTR = "S17"
-HOT_WATER_STATUS_ATTR = "C45"
-HOT_WATER_MODE_ATTR = "C42"
-FROST_TEMPERATURE_ATTR = "S09"
-CURRENT_TEMPERATURE_ATTR = "A84"
-TARGET_TEMPERATURE_ATTR = "A85"
-CURRENT_STATE_ATTR = "A87"
-AUTO_VS_TEMP_HOLD_MODE_ATTR = "A88"
-OFF_MODE_ATTR = "A89"
-
 _LOGGER = logging.getLogger(__name__)
 
-TEMPERATURE_OFFSET_VALUES = [
-    -3.0, -2.5, -2.0, -1.5, -1.0, -0.5, 0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0]
 
+def check_status(status: int) -> None:
+    """Raises when the server refused the request."""
 
-class DeviceAttributesResponse:
-    def __init__(self, content: str):
-        self._root = ET.fromstring(content)
+    if status in (401, 403):
+        raise AuthenticationError(f"Server rejected the session token ({status})")
 
-    def get_value(self, attributeName: str) -> str:
-        return self._root.find(f"./attrList/[name='{attributeName}']/value").text
 
+def check_error_message(error_message: str | None) -> None:
+    """Raises when the response reports an error."""
 
-class ApiClient:
-    """Adapter around Salus IT500 mobile application."""
+    if error_message is None:
+        return
+    if "token" in error_message.lower() or "session" in error_message.lower():
+        raise AuthenticationError(
+            f"Server rejected the session token: {error_message}")
+    raise UpdateFailed(
+        f"Error during communication with the API: {error_message}")
 
-    def __init__(self, username: str, password: str, device_id: str):
-        """Initialize the client."""
-        self._username = username
-        self._password_hash = hashlib.md5(password.encode()).hexdigest()
-        self._id = device_id
-        self._token = None
-        self._token_retrieved_at = None
 
-    async def set_temperature(self, temperature: float) -> None:
-        """Set new target temperature, via URL commands."""
+class DeviceAttributesResponse:
+    """Attribute values of a device, decoded in a single pass over the XML.
+
+    The content can be passed at once or fed in chunks as it arrives.
+    """
+
+    def __init__(self, content: str | bytes | None = None):
+        self._parser = ET.XMLPullParser(events=("end",))
+        self._values = {}
+        self._name = None
+        self._value = None
+        self.error_message = None
+        if content is not None:
+            self.feed(content)
+            self.close()
+
+    def feed(self, chunk: str | bytes) -> None:
+        """Decodes the next chunk of the response."""
+        try:
+            self._parser.feed(chunk)
+        except ET.ParseError as err:
+            raise UpdateFailed(f"Response is not a valid XML: {err}")
+        self._read_events()
 
-        _LOGGER.info("Setting the temperature to %.1f...", temperature)
+    def close(self) -> None:
+        """Finishes decoding the response."""
+        try:
+            self._parser.close()
+        except ET.ParseError as err:
+            raise UpdateFailed(f"Response is not a valid XML: {err}")
+        self._read_events()
+
+    def _read_events(self) -> None:
+        for _, element in self._parser.read_events():
+            tag = element.tag
+            if tag == "name":
+                self._name = element.text
+            elif tag == "value":
+                self._value = element.text or ""
+            elif tag == "attrList":
+                if self._name is not None:
+                    self._values[self._name] = self._value
+                self._name = self._value = None
+                element.clear()
+            elif tag == "errorMsg":
+                self.error_message = element.text or ""
+
+    def __contains__(self, attribute_name: str) -> bool:
+        return attribute_name in self._values
+
+    def get_value(self, attribute_name: str) -> str:
+        """Returns the raw value of the attribute."""
+        try:
+            value = self._values[attribute_name]
+        except KeyError:
+            raise UpdateFailed(
+                f"Response does not contain attribute {attribute_name}") from None
+        if value is None:
+            raise UpdateFailed(
+                f"Response does not contain value of attribute {attribute_name}")
+        return value
 
-        options = {"name1": AUTO_VS_TEMP_HOLD_MODE_ATTR, "value1": "1",
-                   "name2": TARGET_TEMPERATURE_ATTR, "value2": int(temperature * 100)}
-        return_code = await self.set_data(options)
 
-        if return_code == 0:
-            _LOGGER.info("Sucessfully set temperature to %.1f", temperature)
-        else:
-            raise UpdateFailed("Server returned unknown error")
+class ApiClient(CloudClient):
+    """Adapter around Salus IT500 mobile application.
 
-    async def set_hvac_mode(self, hvac_mode: HVACMode) -> None:
-        """Set HVAC mode, via URL commands."""
+    A single client serves all devices of the account.
+    """
 
-        _LOGGER.info("Setting the HVAC mode to %s...", hvac_mode)
+    writable_fields = WRITABLE_FIELDS
 
-        options = {}
-        if hvac_mode == HVACMode.OFF:
-            options = {"name1": OFF_MODE_ATTR, "value1": "1"}
-        elif hvac_mode == HVACMode.HEAT:
-            options = {"name1": OFF_MODE_ATTR, "value1": "0"}
+    def __init__(self, username: str, password: str,
+                 session: aiohttp.ClientSession | None = None,
+                 base_url: str = BASE_URL,
+                 clock: Callable[[], float] | None = None):
+        """Initialize the client.
 
-        return_code = await self.set_data(options)
+        The base URL can point to a stand-in of the Salus cloud, e.g. the emulator.
+        """
+        super().__init__(MAX_TOKEN_AGE_SECONDS, session, clock)
+        self._base_url = base_url
+        self._username = username
+        self._password_hash = hashlib.md5(password.encode()).hexdigest()
+        self.tracer.add_credentials(username, password, self._password_hash)
 
-        if return_code == 0:
-            _LOGGER.info("Sucessfully set the HVAC mode to %s", hvac_mode)
-        else:
-            raise UpdateFailed("Could not set the HVAC mode")
+    async def set_temperature(self, device_id: str, temperature: float) -> None:
+        """Set new target temperature, via URL commands."""
 
-    async def set_hot_water_mode(self, enabled: bool) -> None:
-        """Set HVAC mode, via URL commands."""
+        await self.set_attributes(device_id, target_temperature=temperature)
 
-        _LOGGER.info("Setting the hot water mode to %s...", str(enabled))
+    async def set_hvac_mode(self, device_id: str, hvac_mode: HVACMode) -> None:
+        """Set HVAC mode, via URL commands."""
 
-        mode = "2" if enabled else "3"
+        await self.set_attributes(device_id, mode=hvac_mode)
 
-        options = {"name1": HOT_WATER_MODE_ATTR, "value1": mode}
-        return_code = await self.set_data(options)
+    async def set_hot_water_mode(self, device_id: str, enabled: bool) -> None:
+        """Set HVAC mode, via URL commands."""
 
-        if return_code == 0:
-            _LOGGER.info(
-                "Sucessfully set the hot water mode to %s", str(enabled))
-        else:
-            raise UpdateFailed("Could not set the hot water mode")
+        await self.set_attributes(device_id, hot_water_enabled=enabled)
 
-    async def set_freeze_protection_temperature(self, temperature: float) -> None:
+    async def set_freeze_protection_temperature(self, device_id: str, temperature: float) -> None:
         """Set freeze protection temperature."""
 
-        _LOGGER.info(
-            "Setting the freeze protection temperature to %.1f...", temperature)
-
-        options = {"name1": FROST_TEMPERATURE_ATTR,
-                   "value1": int(temperature * 100)}
+        await self.set_attributes(device_id, frost=temperature)
 
-        return_code = await self.set_data(options)
-
-        if return_code == 0:
-            _LOGGER.info(
-                "Sucessfully set the freeze protection temperature to %.1f", temperature)
-        else:
-            raise UpdateFailed(
-                "Could not set the freeze protection temperature")
-
-    async def set_temperature_offset(self, temperature: float) -> None:
+    async def set_temperature_offset(self, device_id: str, temperature: float) -> None:
         """Set temperature offset."""
 
-        _LOGGER.info(
-            "Setting the temperature offset to %.1f...", temperature)
+        await self.set_attributes(device_id, temperature_offset=temperature)
 
-        options = {"name1": TEMPERATURE_OFFSET_ATTR,
-                   "value1": TEMPERATURE_OFFSET_VALUES.index(temperature)}
+    async def set_temperature_span(self, device_id: str, value: int) -> None:
+        """Set temperature span."""
 
-        return_code = await self.set_data(options)
+        await self.set_attributes(device_id, temperature_span=value)
 
-        if return_code == 0:
-            _LOGGER.info(
-                "Sucessfully set the temperature offset to %.1f", temperature)
-        else:
-            raise UpdateFailed(
-                "Could not set the temperature offset")
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        """Set several attributes in a single request.
 
-    async def set_temperature_span(self, value: int) -> None:
-        """Set temperature span."""
+        The arguments are named after the fields of `State`, for example
+        `set_attributes(device_id, mode=HVACMode.HEAT, target_temperature=21.5)`.
+        """
 
-        _LOGGER.info(
-            "Setting the temperature span to index %s...", str(value))
+        options = {}
+        for index, (name, value) in enumerate(encode_attributes(changes).items(), start=1):
+            options[f"name{index}"] = name
+            options[f"value{index}"] = value
 
-        options = {"name1": TEMPERATURE_SPAN_ATTR,
-                   "value1": value}
+        _LOGGER.info("Setting %s of %s...", changes, device_id)
 
-        return_code = await self.set_data(options)
+        return_code = await self.set_data(device_id, options)
 
         if return_code == 0:
-            _LOGGER.info(
-                "Sucessfully set the temperature span to index %s", str(value))
+            _LOGGER.info("Sucessfully set %s of %s", changes, device_id)
         else:
             raise UpdateFailed(
-                "Could not set the temperature span")
-
-    async def obtain_token(self, session: aiohttp.ClientSession) -> str:
-        """Gets the existing session token of the thermostat or retrieves a new one if expired."""
-
-        if self._token is None:
-            _LOGGER.info("Retrieving token for the first time this session...")
-            await self.get_token(session)
-            return self._token
-
-        if self._token_retrieved_at > time.time() - MAX_TOKEN_AGE_SECONDS:
-            _LOGGER.debug("Using cached token...")
-            return self._token
+                f"Could not set {', '.join(changes)}, server returned {return_code}")
 
-        _LOGGER.info("Token has expired, getting new one...")
-        await self.get_token(session)
-        return self._token
-
-    async def get_token(self, session: aiohttp.ClientSession) -> None:
+    async def get_token(self) -> str:
         """Get the Session Token of the Thermostat."""
 
         _LOGGER.info("Getting token from Salus Gateway...")
@@ -193,81 +202,78 @@ class ApiClient:
         headers = {"Authorization": AUTHORIZATION_TOKEN,
                    "Accept": "application/json"}
 
-        try:
-            response = await session.post(URL_LOGIN, json=payload, headers=headers)
-            body = await response.text()
-            data = json.loads(body)
-
-            _LOGGER.info("Sucessfully retrieved token")
+        response = await self.transport.request(
+            "POST", self._base_url + URL_LOGIN, OPERATION_LOGIN, idempotent=True, json=payload, headers=headers)
+        with self.traced(response):
+            check_status(response.status)
+            try:
+                data = json.loads(response.body)
+            except ValueError as err:
+                _LOGGER.error("Error getting the session token: %s", str(err))
+                raise UpdateFailed(f"Error getting the session token: {err}")
+            if not isinstance(data, dict) or "securityToken" not in data:
+                raise AuthenticationError("Server did not return a session token, check the credentials")
 
-            self._token = data["securityToken"]
-            self._token_retrieved_at = time.time()
-        except Exception as err:
-            self._token = None
-            self._token_retrieved_at = None
-            _LOGGER.error("Error getting the session token: %s", str(err))
+        _LOGGER.info("Sucessfully retrieved token")
+        return data["securityToken"]
 
-    async def get_state(self) -> dict:
+    async def fetch_state(self, device_id: str) -> State:
         """Retrieves the raw state from the Salus gateway"""
 
-        _LOGGER.debug("Retrieving the device state...")
+        _LOGGER.debug("Retrieving the state of %s...", device_id)
 
-        async with aiohttp.ClientSession() as session:
-            token = await self.obtain_token(session)
+        return await self.with_token(
+            lambda token: self._get_device_state(token, device_id))
 
-            params = {"devId": self._id,
-                      "deviceTypeId": "1", "secToken": token}
-            try:
-                r = await session.get(url=URL_GET_DATA, params=params)
-                if not r:
-                    _LOGGER.error("Could not get the data")
-                    return None
-            except BaseException as err:
-                _LOGGER.error(
-                    "Error Getting the data from Salus")
-                raise UpdateFailed(
-                    f"Error during communication with the API: {err}")
+    async def _get_device_state(self, token: str, device_id: str) -> State:
+        params = {"devId": device_id,
+                  "deviceTypeId": "1", "secToken": token}
+        response = await self.transport.request(
+            "GET", self._base_url + URL_GET_DATA, OPERATION_READ, idempotent=True, params=params)
 
-            body = await r.text()
-            _LOGGER.debug("Sucessfully retrieved the device state: %s", body)
+        with self.traced(response):
+            check_status(response.status)
+            return self.decode_state(device_id, response, ApiClient.decode_response)
 
-            return ApiClient.convert_to_state(DeviceAttributesResponse(body))
+    @classmethod
+    def decode_response(cls, response: Response) -> State:
+        """Parses the attributes of the response into a state object."""
+        attributes = DeviceAttributesResponse(response.body)
+        check_error_message(attributes.error_message)
+        return cls.convert_to_state(attributes)
 
-    async def set_data(self, options: dict) -> int:
+    async def set_data(self, device_id: str, options: dict) -> int:
         """Send POST request with token"""
 
+        try:
+            return await self.with_token(
+                lambda token: self._set_device_attributes(token, device_id, options))
+        finally:
+            # Even a failed write may have been applied
+            self._reads.invalidate(device_id)
+
+    async def _set_device_attributes(self, token: str, device_id: str, options: dict) -> int:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        async with aiohttp.ClientSession() as session:
-            token = await self.obtain_token(session)
+        payload = {
+            **options,
+            "secToken": token,
+            "devId": device_id}
 
-            payload = {
-                **options,
-                "secToken": token,
-                "devId": self._id}
+        response = await self.transport.request(
+            "PUT", self._base_url + URL_SET_DATA, OPERATION_WRITE, data=payload, headers=headers)
 
+        with self.traced(response):
+            check_status(response.status)
             try:
-                response = await session.put(URL_SET_DATA, data=payload, headers=headers)
-                if not response:
-                    _LOGGER.error("Could not get data from Salus.")
-                    return None
-            except BaseException as err:
-                _LOGGER.error(
-                    "Error during communication with Salus.")
-                raise UpdateFailed(
-                    f"Error during communication with the API: {err}")
-
-            body = await response.text()
-            _LOGGER.debug(
-                "Sucessfully retrieved response from action: %s", body)
-            xml = ET.fromstring(body)
+                xml = ET.fromstring(response.body)
+            except ET.ParseError as err:
+                raise UpdateFailed(f"Response is not a valid XML: {err}")
             error_message = xml.find("./errorMsg")
+            check_error_message(None if error_message is None else error_message.text or "")
             return_code = xml.find("./retCode")
 
-            if error_message is not None:
-                raise UpdateFailed(
-                    f"Error during communication with the API: {error_message.text}")
-            elif return_code is None:
+            if return_code is None:
                 raise UpdateFailed(
                     f"Response does not contain return code")
             else:
@@ -276,21 +282,4 @@ class ApiClient:
     @classmethod
     def convert_to_state(cls, response: DeviceAttributesResponse) -> State:
         """Converts the data payload to a state object"""
-        state = State()
-        state.target_temperature = float(
-            response.get_value(TARGET_TEMPERATURE_ATTR)) * 0.01
-        state.current_temperature = float(
-            response.get_value(CURRENT_TEMPERATURE_ATTR)) * 0.01
-        state.frost = float(response.get_value(FROST_TEMPERATURE_ATTR)) * 0.01
-        state.action = HVACAction.HEATING if response.get_value(
-            CURRENT_STATE_ATTR) == "1" else HVACAction.IDLE
-        state.mode = HVACMode.OFF if response.get_value(
-            OFF_MODE_ATTR) == "1" else HVACMode.HEAT
-        state.hot_water_enabled = False if response.get_value(
-            HOT_WATER_STATUS_ATTR) == "0" else True
-        state.temperature_span = int(
-            response.get_value(TEMPERATURE_SPAN_ATTR))
-        state.temperature_offset = TEMPERATURE_OFFSET_VALUES[
-            int(response.get_value(TEMPERATURE_OFFSET_ATTR))]
-
-        return state
+        return decode_attributes(response.get_value)
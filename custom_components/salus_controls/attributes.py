@@ -0,0 +1,238 @@
+"""
+Describes the attributes of the iT500 in the mobile application API.
+
+Each attribute maps a code of the device to a field of `State`. The
+descriptions drive decoding the state, encoding writes and creating the
+entities of the writable attributes.
+"""
+import dataclasses
+import logging
+
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.components.climate.const import (
+    HVACAction,
+    HVACMode,
+)
+from homeassistant.components.number import (
+    NumberDeviceClass,
+    NumberEntityDescription,
+    NumberMode,
+)
+from homeassistant.components.select import SelectEntityDescription
+from homeassistant.components.switch import SwitchEntityDescription
+from homeassistant.const import EntityCategory, Platform, UnitOfTemperature
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.update_coordinator import (
+    UpdateFailed,
+)
+
+from .const import (
+    FREEZE_PROTECTION_MAX_TEMP,
+    FREEZE_PROTECTION_MIN_TEMP,
+    MAX_TEMP,
+    MIN_TEMP,
+    TEMPERATURE_OFFSET_MAX,
+    TEMPERATURE_OFFSET_MIN,
+)
+from .state import State
+
+TEMPERATURE_OFFSET_VALUES = [
+    -3.0, -2.5, -2.0, -1.5, -1.0, -0.5, 0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0]
+
+TEMPERATURE_SPAN_COUNT = 5
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Attribute:
+    """An attribute of the device, mapped to a field of `State`."""
+
+    field: str
+    code: str
+    # Numbers are sent as integers, the value divided by the scale
+    scale: float | None = None
+    # Raw values of enumerations and the values they stand for
+    values: dict[str, Any] | None = None
+    # Value of the raw values missing from `values`, if any is allowed
+    default: Any = None
+    # Whether unsupported raw values leave the field unknown rather than
+    # failing the poll
+    optional: bool = False
+    writable: bool = False
+    minimum: float | None = None
+    maximum: float | None = None
+    # Code and raw values written, when they differ from the ones read
+    write_code: str | None = None
+    write_values: dict[Any, str] | None = None
+    # Attributes written along with the value
+    write_also: tuple[tuple[str, str], ...] = ()
+    # Platform and description of the entity showing the attribute,
+    # unless the climate entity does
+    platform: Platform | None = None
+    entity: EntityDescription | None = None
+    # Labels of the values offered by a select entity
+    labels: dict[Any, str] | None = None
+
+    def decode(self, raw: str) -> Any:
+        """Returns the value of the raw attribute."""
+        if self.scale is not None:
+            try:
+                return float(raw) * self.scale
+            except ValueError:
+                raise UpdateFailed(
+                    f"Attribute {self.code} is not a number: {raw}") from None
+
+        value = self.values.get(raw, self.default)
+        if value is None and self.optional:
+            _LOGGER.warning("Ignoring unsupported value %s of attribute %s", raw, self.code)
+        elif value is None:
+            raise UpdateFailed(f"Attribute {self.code} has unsupported value {raw}")
+        return value
+
+    def encode(self, value: Any) -> dict:
+        """Returns the raw attributes to write for the value."""
+        if not self.writable:
+            raise ValueError(f"Attribute {self.field} cannot be set")
+        if self.minimum is not None and not self.minimum <= value <= self.maximum:
+            raise ValueError(f"{self.field} {value} is out of range")
+
+        if self.scale is not None:
+            raw = int(round(value / self.scale))
+        else:
+            write_values = self.write_values or {value: raw for raw, value in self.values.items()}
+            if value not in write_values:
+                raise ValueError(f"{self.field} {value} is not supported")
+            raw = write_values[value]
+
+        return {**dict(self.write_also), self.write_code or self.code: raw}
+
+
+ATTRIBUTES = (
+    Attribute(
+        field="current_temperature",
+        code="A84",
+        scale=0.01),
+    Attribute(
+        field="target_temperature",
+        code="A85",
+        scale=0.01,
+        writable=True,
+        minimum=MIN_TEMP,
+        maximum=MAX_TEMP,
+        # Holds the temperature instead of following the schedule
+        write_also=(("A88", "1"),)),
+    Attribute(
+        field="action",
+        code="A87",
+        values={"1": HVACAction.HEATING},
+        default=HVACAction.IDLE),
+    Attribute(
+        field="mode",
+        code="A89",
+        values={"1": HVACMode.OFF},
+        default=HVACMode.HEAT,
+        writable=True,
+        write_values={HVACMode.OFF: "1", HVACMode.HEAT: "0"}),
+    Attribute(
+        field="hot_water_enabled",
+        code="C45",
+        values={"0": False},
+        default=True,
+        writable=True,
+        # Switching the hot water goes through its mode
+        write_code="C42",
+        write_values={True: "2", False: "3"},
+        platform=Platform.SWITCH,
+        entity=SwitchEntityDescription(
+            key="hot_water_valve",
+            name="Hot Water Valve",
+            icon="mdi:water-thermometer")),
+    Attribute(
+        field="frost",
+        code="S09",
+        scale=0.01,
+        writable=True,
+        minimum=FREEZE_PROTECTION_MIN_TEMP,
+        maximum=FREEZE_PROTECTION_MAX_TEMP,
+        platform=Platform.NUMBER,
+        entity=NumberEntityDescription(
+            key="freeze_protection_temperature",
+            name="Freeze protection temperature",
+            icon="mdi:snowflake-thermometer",
+            entity_category=EntityCategory.CONFIG,
+            device_class=NumberDeviceClass.TEMPERATURE,
+            mode=NumberMode.AUTO,
+            native_min_value=FREEZE_PROTECTION_MIN_TEMP,
+            native_max_value=FREEZE_PROTECTION_MAX_TEMP,
+            native_step=0.5,
+            native_unit_of_measurement=UnitOfTemperature.CELSIUS)),
+    Attribute(
+        field="temperature_span",
+        code="S15",
+        values={str(value): value for value in range(TEMPERATURE_SPAN_COUNT)},
+        # Spans of newer firmware are left unknown
+        optional=True,
+        writable=True,
+        platform=Platform.SELECT,
+        entity=SelectEntityDescription(
+            key="temperature_span",
+            name="Temperature span",
+            entity_category=EntityCategory.CONFIG),
+        # The two narrowest spans are numbered the other way round
+        labels={
+            1: "Hysteresis ±0.25°C",
+            0: "Hysteresis ±0.5°C",
+            2: "Hysteresis ±1.0°C",
+            3: "Hysteresis ±1.5°C",
+            4: "Hysteresis ±2.0°C"}),
+    Attribute(
+        field="temperature_offset",
+        code="S17",
+        values={str(index): value for index, value in enumerate(TEMPERATURE_OFFSET_VALUES)},
+        writable=True,
+        platform=Platform.NUMBER,
+        entity=NumberEntityDescription(
+            key="temperature_offset",
+            name="Temperature offset",
+            icon="mdi:thermometer-plus",
+            entity_category=EntityCategory.CONFIG,
+            device_class=NumberDeviceClass.TEMPERATURE,
+            mode=NumberMode.AUTO,
+            native_min_value=TEMPERATURE_OFFSET_MIN,
+            native_max_value=TEMPERATURE_OFFSET_MAX,
+            native_step=0.5,
+            native_unit_of_measurement=UnitOfTemperature.CELSIUS)),
+)
+
+# Compiled once, decoding and encoding only look up the attributes they need
+_DECODERS = tuple((attribute.code, attribute.field, attribute.decode) for attribute in ATTRIBUTES)
+_ATTRIBUTES_BY_FIELD = {attribute.field: attribute for attribute in ATTRIBUTES}
+
+WRITABLE_FIELDS = frozenset(attribute.field for attribute in ATTRIBUTES if attribute.writable)
+
+
+def decode_attributes(get_value: Callable[[str], str]) -> State:
+    """Decodes the state from the raw values of the attributes."""
+    return State(**{field: decode(get_value(code)) for code, field, decode in _DECODERS})
+
+
+def encode_attributes(changes: dict) -> dict:
+    """Validates the changes keyed by `State` fields and maps them to device attributes."""
+
+    if not changes:
+        raise ValueError("No attributes to set")
+
+    attributes = {}
+    for field, value in changes.items():
+        if field not in _ATTRIBUTES_BY_FIELD:
+            raise ValueError(f"Attribute {field} cannot be set")
+        attributes.update(_ATTRIBUTES_BY_FIELD[field].encode(value))
+    return attributes
+
+
+def entity_attributes(platform: Platform) -> list[Attribute]:
+    """Returns the attributes shown by entities of the platform."""
+    return [attribute for attribute in ATTRIBUTES if attribute.platform == platform]
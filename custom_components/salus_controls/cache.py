@@ -0,0 +1,66 @@
+"""
+Persists the token and the last state of the thermostats across restarts.
+"""
+import logging
+
+from homeassistant.helpers.storage import Store
+
+from .client import SalusClient
+from .const import DOMAIN
+from .state import State
+
+STORAGE_VERSION = 1
+# States change every few polls, so saving them is coalesced
+SAVE_DELAY_SECONDS = 60
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SalusCache:
+    """Last known token and states of one config entry."""
+
+    def __init__(self, hass, entry_id: str):
+        """Initialize the cache."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        self.token = None
+        self.token_retrieved_at = None
+        self.states = {}
+
+    async def async_load(self) -> None:
+        """Loads what was saved before the restart."""
+        data = await self._store.async_load()
+        if not data:
+            return
+
+        self.token = data.get("token")
+        self.token_retrieved_at = data.get("token_retrieved_at")
+        try:
+            self.states = {
+                device_id: State.from_dict(state)
+                for device_id, state in data.get("states", {}).items()}
+        except (TypeError, ValueError) as err:
+            _LOGGER.warning("Ignoring the cached states: %s", err)
+            self.states = {}
+
+    def async_schedule_save(self, client: SalusClient, states: dict) -> None:
+        """Saves the token and the states shortly, coalescing frequent changes."""
+        self._store.async_delay_save(lambda: _serialize(client, states), SAVE_DELAY_SECONDS)
+
+    async def async_save(self, client: SalusClient, states: dict) -> None:
+        """Saves the token and the states right away."""
+        await self._store.async_save(_serialize(client, states))
+
+    async def async_remove(self) -> None:
+        """Deletes the cache of a removed entry."""
+        await self._store.async_remove()
+
+
+def _serialize(client: SalusClient, states: dict) -> dict:
+    token, retrieved_at = client.token
+    return {
+        "token": token,
+        "token_retrieved_at": retrieved_at,
+        "states": {
+            device_id: state.as_dict()
+            for device_id, state in states.items() if state is not None},
+    }
@@ -0,0 +1,206 @@
+"""
+Records the exchanges of the clients with the Salus cloud and replays them.
+
+A capture is a gzip compressed file with one exchange per line as JSON:
+the path, the redacted parameters, the status, the body and the timing of
+the request. Replaying a capture feeds its responses back into the clients
+in the recorded order, e.g. to reproduce a problem seen in the field or to
+benchmark the parsers with real responses.
+"""
+import asyncio
+import collections
+import dataclasses
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+import aiohttp
+
+from collections.abc import Callable, Iterable
+from urllib.parse import urlsplit
+
+from homeassistant.helpers.update_coordinator import (
+    UpdateFailed,
+)
+
+from .client import CloudClient, SalusClient
+from .failover import FailoverClient
+from .trace import PayloadTracer
+from .transport import Request, Response, Transport
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReplayError(UpdateFailed):
+    """The capture holds no further response to the request."""
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class CapturedExchange:
+    """A request to the Salus cloud and its response as recorded in a capture."""
+    # Seconds since the capture started
+    at: float
+    operation: str
+    method: str
+    path: str
+    params: dict | None
+    status: int | None
+    seconds: float
+    body: str | None
+    error: str | None = None
+
+    @property
+    def device_id(self) -> str | None:
+        """Returns the device the request was sent for."""
+        return self.params.get("devId") if self.params else None
+
+
+class CaptureWriter:
+    """Appends every exchange of the clients it is set on to a capture file.
+
+    The secrets known to the tracer of the client are redacted, as well as
+    the tokens within the responses, so the replayed client logs in with a
+    placeholder token. The exchanges are formatted on the event loop and
+    compressed and written by a thread of the writer, so recording never
+    blocks the loop on the file.
+    """
+
+    def __init__(self, path: str, tracer: PayloadTracer,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the writer and start its thread."""
+        self._tracer = tracer
+        self._clock = clock
+        self._started_at = clock()
+        self._lines = queue.SimpleQueue()
+        self._failed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._write_lines, args=(path,), name="salus_controls capture")
+        self._thread.start()
+        self.count = 0
+
+    def record(self, request: Request, status: int | None, body: bytes | None,
+               error: str | None = None) -> None:
+        """Queues the exchange of the request to be appended."""
+        if self._failed.is_set():
+            return
+        exchange = CapturedExchange(
+            at=round(self._clock() - request.seconds - self._started_at, 6),
+            operation=request.operation,
+            method=request.method,
+            path=urlsplit(request.url).path,
+            params=self._tracer.redact_params(request.kwargs),
+            status=status,
+            seconds=round(request.seconds, 6),
+            body=None if body is None else self._tracer.redact_body(body, limit=None),
+            error=error)
+        self._lines.put(json.dumps(dataclasses.asdict(exchange), separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        """Finishes the capture file once the queued exchanges are written, without waiting for it."""
+        self._lines.put(None)
+
+    def join(self, timeout: float | None = None) -> None:
+        """Waits until the capture file is finished."""
+        self._thread.join(timeout)
+
+    def _write_lines(self, path: str) -> None:
+        try:
+            with gzip.open(path, "at", encoding="utf-8") as file:
+                while (line := self._lines.get()) is not None:
+                    file.write(line)
+        except OSError:
+            self._failed.set()
+            _LOGGER.exception("Could not write the capture %s", path)
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        self.join()
+
+
+def read_capture(path: str) -> list[CapturedExchange]:
+    """Returns the exchanges of a capture file in the recorded order."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        return [CapturedExchange(**json.loads(line)) for line in file if line.strip()]
+
+
+class ReplayTransport(Transport):
+    """Answers the requests of a client with the responses of a capture.
+
+    Each request gets the next unused response recorded for the same
+    method, path and device, so concurrent reads of several devices
+    replay the same way every time. Recorded connection errors are raised
+    again and retried like the original ones.
+    """
+
+    def __init__(self, exchanges: Iterable[CapturedExchange], delay: bool = False, **kwargs):
+        """Initialize the transport, waiting the recorded time of each request if delay is set."""
+        super().__init__(lambda: None, **kwargs)
+        self.delay = delay
+        self._queues = collections.defaultdict(collections.deque)
+        for exchange in exchanges:
+            self._queues[(exchange.method, exchange.path, exchange.device_id)].append(exchange)
+
+    @property
+    def remaining(self) -> int:
+        """Returns the number of responses not replayed yet."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def _send(self, method: str, url: str, operation: str, **kwargs) -> Response:
+        params = kwargs.get("params") or kwargs.get("data") or kwargs.get("json")
+        device_id = params.get("devId") if isinstance(params, dict) else None
+        queue = self._queues.get((method, urlsplit(url).path, device_id))
+        if not queue:
+            raise ReplayError(f"Capture holds no further response to {method} {url}")
+
+        exchange = queue.popleft()
+        if self.delay:
+            await asyncio.sleep(exchange.seconds)
+        if exchange.status is None:
+            raise aiohttp.ClientConnectionError(exchange.error)
+        return Response(exchange.status, (exchange.body or "").encode())
+
+
+def _clients_of(client: SalusClient) -> list[CloudClient]:
+    if isinstance(client, FailoverClient):
+        return [backend.client for backend in client.backends]
+    return [client]
+
+
+def start_capture(client: SalusClient, path: str) -> CaptureWriter:
+    """Records all further exchanges of the client, of every backend of a failover client."""
+    writer = CaptureWriter(path, client.tracer, client.tracer.clock)
+    for target in _clients_of(client):
+        target.transport.capture = writer
+    return writer
+
+
+def stop_capture(client: SalusClient) -> None:
+    """Stops recording the exchanges of the client and finishes the capture file in the background."""
+    writers = {id(target.transport.capture): target.transport.capture
+               for target in _clients_of(client) if target.transport.capture is not None}
+    for target in _clients_of(client):
+        target.transport.capture = None
+    for writer in writers.values():
+        writer.close()
+
+
+def replay(client: SalusClient, exchanges: Iterable[CapturedExchange], delay: bool = False) -> None:
+    """Answers all further requests of the client from the exchanges.
+
+    The backends of a failover client replay the exchanges sent to their
+    own paths.
+    """
+    exchanges = list(exchanges)
+    for target in _clients_of(client):
+        transport = target.transport
+        replayed = ReplayTransport(
+            exchanges, delay, retries=transport.retries, breaker=transport.breaker,
+            metrics=transport.metrics, tracer=transport.tracer)
+        replayed.timeouts = transport.timeouts
+        target.transport = replayed
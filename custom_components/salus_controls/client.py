@@ -0,0 +1,286 @@
+"""
+Shared plumbing of the Salus cloud clients.
+"""
+import contextlib
+import hashlib
+import logging
+import aiohttp
+
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from typing import TypeVar
+
+from homeassistant.helpers.update_coordinator import (
+    UpdateFailed,
+)
+from homeassistant.util.ssl import get_default_context
+
+from .metrics import (
+    COUNTER_TOKEN_REFRESHES,
+    METRIC_FETCH,
+    METRIC_LOGIN,
+    METRIC_PARSE,
+    Metrics,
+)
+from .read_cache import ReadCache
+from .state import State
+from .token_manager import TokenManager
+from .trace import PayloadTracer
+from .transport import CircuitBreaker, Response, Transport
+
+DEFAULT_CONNECTION_LIMIT = 10
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 4
+DEFAULT_DNS_CACHE_SECONDS = 300
+DEFAULT_KEEPALIVE_SECONDS = 60
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class AuthenticationError(UpdateFailed):
+    """The Salus cloud rejected the session token."""
+
+
+def create_session(
+        limit: int = DEFAULT_CONNECTION_LIMIT,
+        limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST,
+        dns_cache_seconds: int = DEFAULT_DNS_CACHE_SECONDS,
+        keepalive_seconds: float = DEFAULT_KEEPALIVE_SECONDS,
+        trace_configs: list[aiohttp.TraceConfig] | None = None) -> aiohttp.ClientSession:
+    """Creates a session with a pool of keep-alive connections.
+
+    DNS lookups are cached and the shared SSL context lets repeated
+    handshakes resume the TLS session instead of negotiating a new one.
+    Trace configs observe the requests, e.g. to time them.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_seconds,
+        keepalive_timeout=keepalive_seconds,
+        ssl=get_default_context())
+
+    return aiohttp.ClientSession(connector=connector, trace_configs=trace_configs)
+
+
+class SalusClient:
+    """What the coordinator and the integration need from the client of an account."""
+
+    # Fields of `State` the client can write
+    writable_fields = frozenset()
+
+    @property
+    def metrics(self) -> Metrics:
+        """Returns the timings and counters of the requests."""
+        raise NotImplementedError()
+
+    @property
+    def tracer(self) -> PayloadTracer:
+        """Returns the recorder of the sampled and failed exchanges."""
+        raise NotImplementedError()
+
+    @property
+    def retry_after(self) -> float | None:
+        """Returns the seconds until requests are sent again, None when they are not paused."""
+        raise NotImplementedError()
+
+    async def get_state(self, device_id: str) -> State:
+        """Retrieves the state of the device."""
+        raise NotImplementedError()
+
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        """Set several attributes of the device, named after the fields of `State`."""
+        raise NotImplementedError()
+
+    @property
+    def token(self) -> tuple[str | None, float | None]:
+        """Returns the current token and the time it was retrieved at."""
+        raise NotImplementedError()
+
+    def restore_token(self, token: str, retrieved_at: float) -> None:
+        """Reuses a token retrieved earlier, e.g. before a restart."""
+        raise NotImplementedError()
+
+    def configure(self, timeouts: dict | None = None, retries: int | None = None,
+                  token_max_age: float | None = None, freshness: float | None = None,
+                  trace_errors: bool | None = None, trace_sample_rate: float | None = None,
+                  trace_devices: Iterable[str] | None = None) -> None:
+        """Applies new request timeouts per operation, retry budget, token lifetime, read freshness and tracing."""
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        """Releases the connections of the client."""
+        raise NotImplementedError()
+
+
+class CloudClient(SalusClient):
+    """Base of the adapters around one backend of the Salus cloud."""
+
+    def __init__(self, token_max_age: float, session: aiohttp.ClientSession | None = None,
+                 clock: Callable[[], float] | None = None):
+        """Initialize the client.
+
+        When no session is given (e.g. the one from Home Assistant's
+        `async_get_clientsession`), the client creates and owns one.
+        A clock, e.g. the time of a simulated event loop, replaces the
+        clocks aging the token and the cached states and timing the
+        circuit breaker and the traced requests.
+        """
+        clocks = {} if clock is None else {"clock": clock}
+        self._session = session
+        self._owns_session = session is None
+        self._default_token_max_age = token_max_age
+        self._tokens = TokenManager(self._async_login, token_max_age, **clocks)
+        self.transport = Transport(
+            lambda: self.session, breaker=CircuitBreaker(**clocks), metrics=Metrics(**clocks),
+            tracer=PayloadTracer(**clocks))
+        self._reads = ReadCache(self._async_fetch_state, **clocks)
+        # Fingerprint of the last response of each device and the state decoded from it
+        self._fingerprints = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Returns the long-lived session used for all requests."""
+        if self._session is None or self._session.closed:
+            _LOGGER.debug("Opening a new connection pool...")
+            self._session = create_session()
+            self._owns_session = True
+        return self._session
+
+    @property
+    def metrics(self) -> Metrics:
+        """Returns the timings and counters of the requests."""
+        return self.transport.metrics
+
+    @metrics.setter
+    def metrics(self, metrics: Metrics) -> None:
+        self.transport.metrics = metrics
+
+    @property
+    def tracer(self) -> PayloadTracer:
+        """Returns the recorder of the sampled and failed exchanges."""
+        return self.transport.tracer
+
+    @tracer.setter
+    def tracer(self, tracer: PayloadTracer) -> None:
+        tracer.adopt(self.transport.tracer)
+        self.transport.tracer = tracer
+
+    @property
+    def retry_after(self) -> float | None:
+        """Returns the seconds until requests are sent again, None when they are not paused."""
+        breaker = self.transport.breaker
+        return breaker.retry_after if breaker.is_open else None
+
+    async def get_token(self) -> str:
+        """Logs in and returns a new session token."""
+        raise NotImplementedError()
+
+    async def get_state(self, device_id: str) -> State:
+        """Retrieves the state of the device, sharing concurrent and just completed reads."""
+        return await self._reads.async_get(device_id)
+
+    async def fetch_state(self, device_id: str) -> State:
+        """Fetches the state of the device from the cloud."""
+        raise NotImplementedError()
+
+    async def _async_fetch_state(self, device_id: str) -> State:
+        with self.metrics.time(METRIC_FETCH, device_id):
+            return await self.fetch_state(device_id)
+
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        """Set several attributes of the device, named after the fields of `State`."""
+        raise NotImplementedError()
+
+    def decode_state(self, device_id: str, response: Response,
+                     decode: Callable[[Response], State]) -> State:
+        """Decodes the response, unless its body is identical to the last one of the device.
+
+        An identical body returns the very same state object, telling the
+        coordinator that nothing changed without parsing anything.
+        """
+        if response.status != 200:
+            return decode(response)
+
+        fingerprint = hashlib.blake2b(response.body, digest_size=16).digest()
+        last = self._fingerprints.get(device_id)
+        if last is not None and last[0] == fingerprint:
+            return last[1]
+
+        with self.metrics.time(METRIC_PARSE, device_id):
+            state = decode(response)
+        self._fingerprints[device_id] = (fingerprint, state)
+        return state
+
+    @contextlib.contextmanager
+    def traced(self, response: Response) -> Iterator[None]:
+        """Records the exchange of the response when the block handling it raises."""
+        try:
+            yield
+        except Exception as err:
+            if response.request is not None:
+                self.tracer.record_failure(response, err)
+            raise
+
+    async def _async_login(self) -> str:
+        self.metrics.increment(COUNTER_TOKEN_REFRESHES)
+        with self.metrics.time(METRIC_LOGIN):
+            token = await self.get_token()
+        self.tracer.add_token(token)
+        return token
+
+    async def obtain_token(self) -> str:
+        """Gets the existing session token of the thermostat or retrieves a new one if expired."""
+        return await self._tokens.async_get_token()
+
+    @property
+    def token(self) -> tuple[str | None, float | None]:
+        """Returns the current token and the time it was retrieved at."""
+        return self._tokens.token, self._tokens.retrieved_at
+
+    def restore_token(self, token: str, retrieved_at: float) -> None:
+        """Reuses a token retrieved earlier, e.g. before a restart."""
+        self.tracer.add_token(token)
+        self._tokens.restore(token, retrieved_at)
+
+    def configure(self, timeouts: dict | None = None, retries: int | None = None,
+                  token_max_age: float | None = None, freshness: float | None = None,
+                  trace_errors: bool | None = None, trace_sample_rate: float | None = None,
+                  trace_devices: Iterable[str] | None = None) -> None:
+        """Applies new request timeouts per operation, retry budget, token lifetime, read freshness and tracing.
+
+        The token lifetime goes back to the default of the backend when None.
+        """
+        if trace_errors is not None:
+            self.tracer.errors = trace_errors
+        if trace_sample_rate is not None:
+            self.tracer.sample_rate = trace_sample_rate
+        if trace_devices is not None:
+            self.tracer.devices = frozenset(trace_devices)
+        if freshness is not None:
+            self._reads.freshness = freshness
+        if timeouts is not None:
+            self.transport.timeouts.update(timeouts)
+        if retries is not None:
+            self.transport.retries = retries
+        self._tokens.max_age = token_max_age or self._default_token_max_age
+
+    async def with_token(self, request: Callable[[str], Awaitable[_T]]) -> _T:
+        """Runs the request with a valid token, logging in again once if the token is rejected."""
+
+        token = await self.obtain_token()
+        try:
+            return await request(token)
+        except AuthenticationError:
+            _LOGGER.info("Token was rejected, getting new one...")
+            self._tokens.invalidate(token)
+            return await request(await self.obtain_token())
+
+    async def close(self) -> None:
+        """Closes the connection pool if it is owned by the client."""
+        await self._tokens.async_close()
+        await self._reads.async_close()
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
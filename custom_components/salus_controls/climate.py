@@ -12,10 +12,6 @@ from homeassistant.const import (
     UnitOfTemperature,
 )
 
-from homeassistant.const import (
-    CONF_DEVICE_ID
-)
-
 from custom_components.salus_controls.state import State
 
 from .const import (
@@ -26,26 +22,34 @@ from .const import (
 
 
 from homeassistant.components.climate import ClimateEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.core import callback
 
-PARALLEL_UPDATES = 1
+from .entity import SalusEntity
+
+# No limit: with one, service calls targeting several thermostats wait for
+# the write of each entity in turn, so nothing is left to merge. The write
+# queue of each device serializes and merges the writes instead.
+PARALLEL_UPDATES = 0
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Salus switches from a config entry."""
 
     coordinator = config_entry.runtime_data
-    device_id = config_entry.data[CONF_DEVICE_ID]
 
-    async_add_entities([ThermostatEntity("Salus Thermostat", coordinator, coordinator.get_client, device_id)])
+    async_add_entities([
+        ThermostatEntity(coordinator, coordinator.get_client, device_id)
+        for device_id in coordinator.device_ids])
 
-class ThermostatEntity(CoordinatorEntity, ClimateEntity):
+class ThermostatEntity(SalusEntity, ClimateEntity):
     """Representation of a Salus Thermostat cappabilities."""
+    # Named after its device, the thermostat is the main feature of it
+    _attr_has_entity_name = True
+    _attr_name = None
+    _state_fields = frozenset(
+        ["current_temperature", "target_temperature", "mode", "action"])
 
-    def __init__(self, name, coordinator, client, device_id):
+    def __init__(self, coordinator, client, device_id):
         """Initialize the thermostat."""
         super().__init__(coordinator)
-        self._name = name
         self._device_id = device_id
         self._coordinator = coordinator
         self._client = client
@@ -61,21 +65,11 @@ class ThermostatEntity(CoordinatorEntity, ClimateEntity):
         """Return information to link this entity with the correct device."""
         return {"identifiers": {(DOMAIN, self._device_id)}}
 
-    @property
-    def name(self) -> str:
-        """Return the name of the thermostat."""
-        return self._name
-
     @property
     def unique_id(self) -> str:
         """Return the unique ID for this thermostat."""
         return "_".join([self._device_id, "climate"])
 
-    @property
-    def should_poll(self) -> bool:
-        """Return if polling is required."""
-        return True
-
     @property
     def min_temp(self) -> float:
         """Return the minimum temperature."""
@@ -135,14 +129,13 @@ class ThermostatEntity(CoordinatorEntity, ClimateEntity):
         if temperature is None:
             return
 
-        await self._client.set_temperature(temperature)
-        await self._coordinator.async_request_refresh()
+        await self._coordinator.async_set_attributes(
+            self._device_id, debounce=True, target_temperature=temperature)
 
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Set HVAC mode, via URL commands."""
 
-        await self._client.set_hvac_mode(hvac_mode)
-        await self._coordinator.async_request_refresh()
+        await self._coordinator.async_set_attributes(self._device_id, mode=hvac_mode)
 
     async def async_turn_off(self) -> None:
         await self.async_set_hvac_mode(HVACMode.OFF)
@@ -150,8 +143,6 @@ class ThermostatEntity(CoordinatorEntity, ClimateEntity):
     async def async_turn_on(self) -> None:
         await self.async_set_hvac_mode(HVACMode.HEAT)
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        self._state = self._coordinator.data
-        self.async_write_ha_state()
+    def _update_from_state(self, state: State) -> None:
+        """Copy the fields of the state to the entity."""
+        self._state = state
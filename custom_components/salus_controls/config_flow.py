@@ -1,5 +1,8 @@
 """Config flow to configure Salus iT500 component."""
+import asyncio
 import logging
+import statistics
+import time
 
 import voluptuous as vol
 
@@ -7,46 +10,262 @@ import voluptuous as vol
 from homeassistant.const import (
     CONF_PASSWORD,
     CONF_USERNAME,
-    CONF_DEVICE_ID
+    CONF_DEVICES
 )
 from homeassistant import config_entries
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import UpdateFailed
 
-from .const import DOMAIN
+from .api_client import ApiClient
+from .client import AuthenticationError, CloudClient
+from .const import (
+    BACKEND_API,
+    BACKEND_WEB,
+    CONF_BACKENDS,
+    CONF_FAILOVER,
+    CONF_FEATURES,
+    CONF_LATENCY,
+    CONF_LOGIN_TIMEOUT,
+    CONF_MAX_PARALLEL_FETCHES,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_POLL_INTERVAL,
+    CONF_READ_FRESHNESS,
+    CONF_TRACE_DEVICES,
+    CONF_TRACE_ERRORS,
+    CONF_TRACE_SAMPLE_RATE,
+    CONF_READ_TIMEOUT,
+    CONF_RETRIES,
+    CONF_TOKEN_MAX_AGE,
+    CONF_WRITE_DELAY,
+    CONF_WRITE_TIMEOUT,
+    DOMAIN,
+)
+from .coordinator import DEFAULT_MAX_PARALLEL_FETCHES
+from .polling import (
+    DEFAULT_INTERVAL_SECONDS,
+    DEFAULT_MAX_INTERVAL_SECONDS,
+    DEFAULT_MIN_INTERVAL_SECONDS,
+)
+from .read_cache import DEFAULT_FRESHNESS_SECONDS
+from .transport import (
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUTS,
+    OPERATION_LOGIN,
+    OPERATION_READ,
+    OPERATION_WRITE,
+)
+from .web_client import WebClient
+from .write_queue import DEFAULT_DEBOUNCE_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
 
 GATEWAY_SETTINGS = {
     vol.Required(CONF_USERNAME): str,
     vol.Required(CONF_PASSWORD): str,
-    vol.Required(CONF_DEVICE_ID): str,
+    vol.Required(CONF_DEVICES): str,
+    # Off, the fastest backend serves all requests on its own
+    vol.Optional(CONF_FAILOVER, default=False): bool,
 }
 
+OPTION_DEFAULTS = {
+    CONF_POLL_INTERVAL: DEFAULT_INTERVAL_SECONDS,
+    CONF_MIN_POLL_INTERVAL: DEFAULT_MIN_INTERVAL_SECONDS,
+    CONF_MAX_POLL_INTERVAL: DEFAULT_MAX_INTERVAL_SECONDS,
+    CONF_LOGIN_TIMEOUT: DEFAULT_TIMEOUTS[OPERATION_LOGIN],
+    CONF_READ_TIMEOUT: DEFAULT_TIMEOUTS[OPERATION_READ],
+    CONF_WRITE_TIMEOUT: DEFAULT_TIMEOUTS[OPERATION_WRITE],
+    CONF_RETRIES: DEFAULT_RETRIES,
+    CONF_WRITE_DELAY: DEFAULT_DEBOUNCE_SECONDS,
+    CONF_MAX_PARALLEL_FETCHES: DEFAULT_MAX_PARALLEL_FETCHES,
+    CONF_READ_FRESHNESS: DEFAULT_FRESHNESS_SECONDS,
+    CONF_TRACE_ERRORS: True,
+    CONF_TRACE_SAMPLE_RATE: 0.0,
+}
+
+SECONDS = vol.All(vol.Coerce(float), vol.Range(min=1, max=3600))
+TIMEOUT_SECONDS = vol.All(vol.Coerce(float), vol.Range(min=1, max=120))
+
+
+def options_schema(options) -> vol.Schema:
+    """Returns the schema of the options, filled with the current values."""
+
+    def default(key):
+        return options.get(key, OPTION_DEFAULTS[key])
+
+    return vol.Schema({
+        vol.Required(CONF_POLL_INTERVAL, default=default(CONF_POLL_INTERVAL)): SECONDS,
+        vol.Required(CONF_MIN_POLL_INTERVAL, default=default(CONF_MIN_POLL_INTERVAL)): SECONDS,
+        vol.Required(CONF_MAX_POLL_INTERVAL, default=default(CONF_MAX_POLL_INTERVAL)): SECONDS,
+        vol.Required(CONF_LOGIN_TIMEOUT, default=default(CONF_LOGIN_TIMEOUT)): TIMEOUT_SECONDS,
+        vol.Required(CONF_READ_TIMEOUT, default=default(CONF_READ_TIMEOUT)): TIMEOUT_SECONDS,
+        vol.Required(CONF_WRITE_TIMEOUT, default=default(CONF_WRITE_TIMEOUT)): TIMEOUT_SECONDS,
+        vol.Required(CONF_RETRIES, default=default(CONF_RETRIES)):
+            vol.All(vol.Coerce(int), vol.Range(min=0, max=10)),
+        vol.Required(CONF_WRITE_DELAY, default=default(CONF_WRITE_DELAY)):
+            vol.All(vol.Coerce(float), vol.Range(min=0, max=30)),
+        vol.Required(CONF_MAX_PARALLEL_FETCHES, default=default(CONF_MAX_PARALLEL_FETCHES)):
+            vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+        vol.Required(CONF_READ_FRESHNESS, default=default(CONF_READ_FRESHNESS)):
+            vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+        # Left empty, each backend keeps its own token lifetime
+        vol.Optional(CONF_TOKEN_MAX_AGE, description={
+            "suggested_value": options.get(CONF_TOKEN_MAX_AGE)}): SECONDS,
+        vol.Required(CONF_TRACE_ERRORS, default=default(CONF_TRACE_ERRORS)): bool,
+        vol.Required(CONF_TRACE_SAMPLE_RATE, default=default(CONF_TRACE_SAMPLE_RATE)):
+            vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+        # Exchanges of these devices are always traced
+        vol.Optional(CONF_TRACE_DEVICES, description={
+            "suggested_value": options.get(CONF_TRACE_DEVICES)}): str,
+    })
+
+
 class SalusFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a Salus config flow."""
 
-    VERSION = 1
-    MINOR_VERSION = 1
+    VERSION = 2
+    MINOR_VERSION = 2
     CONNECTION_CLASS = config_entries.CONN_CLASS_CLOUD_POLL
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow of an entry."""
+        return SalusOptionsFlowHandler(config_entry)
+
     async def async_step_user(self, user_input=None):
-        """Handle a flow initialized by the user to configure a gateway."""
+        """Handle a flow initialized by the user to configure an account."""
         errors = {}
         if user_input is not None:
             username = user_input[CONF_USERNAME]
             password = user_input[CONF_PASSWORD]
-            device_id = user_input[CONF_DEVICE_ID]
+            device_ids = parse_device_ids(user_input[CONF_DEVICES])
 
-            # TODO: Try to connect to a Salus Gateway.
-            await self.async_set_unique_id(device_id)
-            self._abort_if_unique_id_configured()
+            if not device_ids:
+                errors[CONF_DEVICES] = "no_devices"
+            else:
+                # An account can be split into several entries, e.g. one per site
+                for entry in self._async_current_entries():
+                    if set(device_ids) & set(entry.data.get(CONF_DEVICES, [])):
+                        return self.async_abort(reason="already_configured")
 
-            return self.async_create_entry(
-                    title="Salus Controls",
-                    data={
-                        CONF_USERNAME: username,
-                        CONF_PASSWORD: password,
-                        CONF_DEVICE_ID: device_id,
-                    },
-                )
+                await self.async_set_unique_id(",".join(sorted(device_ids)))
+                self._abort_if_unique_id_configured()
+
+                try:
+                    backends = await probe_account(
+                        username, password, device_ids, user_input.get(CONF_FAILOVER, False))
+                except AuthenticationError:
+                    errors["base"] = "auth_error"
+                except UpdateFailed:
+                    errors["base"] = "connect_error"
+                else:
+                    return self.async_create_entry(
+                        title=username,
+                        data={
+                            CONF_USERNAME: username,
+                            CONF_PASSWORD: password,
+                            CONF_DEVICES: device_ids,
+                            **backends,
+                        },
+                    )
 
         schema = vol.Schema(GATEWAY_SETTINGS)
 
         return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
+
+
+class SalusOptionsFlowHandler(config_entries.OptionsFlow):
+    """Tune the polling and the requests of an entry."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options, applied without reloading the entry."""
+        errors = {}
+        if user_input is not None:
+            if not (user_input[CONF_MIN_POLL_INTERVAL]
+                    <= user_input[CONF_POLL_INTERVAL]
+                    <= user_input[CONF_MAX_POLL_INTERVAL]):
+                errors["base"] = "invalid_poll_interval"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=options_schema(user_input or self._entry.options),
+            errors=errors)
+
+
+def parse_device_ids(value: str) -> list[str]:
+    """Parses the comma or space separated device IDs."""
+    device_ids = []
+    for device_id in value.replace(",", " ").split():
+        if device_id not in device_ids:
+            device_ids.append(device_id)
+    return device_ids
+
+
+async def probe_account(username: str, password: str, device_ids: list[str],
+                        failover: bool) -> dict:
+    """Probes the backends with the credentials, returning what the entry stores about them.
+
+    The fastest backend serves the requests, with failover the other one
+    backs it up. Raises AuthenticationError when every backend rejects the
+    credentials and UpdateFailed when none of them works otherwise.
+    """
+    clients = {
+        BACKEND_API: ApiClient(username, password),
+        BACKEND_WEB: WebClient(username, password),
+    }
+    try:
+        results = await asyncio.gather(*(
+            probe_backend(client, device_ids) for client in clients.values()),
+            return_exceptions=True)
+    finally:
+        await asyncio.gather(*(client.close() for client in clients.values()))
+
+    latencies = {}
+    for backend, result in zip(clients, results):
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+        if isinstance(result, Exception):
+            _LOGGER.info("Salus %s backend is not available: %s", backend, result)
+        else:
+            latencies[backend] = result
+
+    if not latencies:
+        if all(isinstance(result, AuthenticationError) for result in results):
+            raise AuthenticationError("Every backend rejected the credentials")
+        raise UpdateFailed(f"No backend is available: {results[0]}")
+
+    backends = sorted(latencies, key=lambda backend: latencies[backend]["fetch"])
+    if not failover:
+        backends = backends[:1]
+    features = frozenset().union(*(clients[backend].writable_fields for backend in backends))
+    return {
+        CONF_BACKENDS: backends,
+        CONF_FEATURES: sorted(features),
+        CONF_LATENCY: latencies,
+    }
+
+
+async def probe_backend(client: CloudClient, device_ids: list[str]) -> dict:
+    """Fetches every device through the client, measuring how long it takes.
+
+    The first fetch also logs in, its extra time is the login latency.
+    """
+    started = time.monotonic()
+    await client.fetch_state(device_ids[0])
+    first = time.monotonic() - started
+
+    fetches = []
+    for device_id in device_ids[1:] or device_ids:
+        started = time.monotonic()
+        await client.fetch_state(device_id)
+        fetches.append(time.monotonic() - started)
+
+    fetch = statistics.median(fetches)
+    return {"login": max(first - fetch, 0.0), "fetch": fetch}
@@ -2,6 +2,40 @@
 
 DOMAIN = "salus_controls"
 
+DATA_ACCOUNTS = f"{DOMAIN}_accounts"
+
+# Backends that accepted the credentials, fastest first
+CONF_BACKENDS = "backends"
+# Fields of the state that can be written through those backends
+CONF_FEATURES = "features"
+# Login and fetch latency of each backend measured when configuring the entry
+CONF_LATENCY = "latency"
+# Whether the entry fails over between all backends accepting the credentials
+CONF_FAILOVER = "failover"
+# Backend of entries configured before the backends were probed
+CONF_BACKEND = "backend"
+
+BACKEND_API = "api"
+BACKEND_WEB = "web"
+# Both backends, the best one serving the requests
+BACKEND_AUTO = "auto"
+
+# Options tuning the polling and the requests of an entry
+CONF_POLL_INTERVAL = "poll_interval"
+CONF_MIN_POLL_INTERVAL = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL = "max_poll_interval"
+CONF_LOGIN_TIMEOUT = "login_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_WRITE_TIMEOUT = "write_timeout"
+CONF_RETRIES = "retries"
+CONF_WRITE_DELAY = "write_delay"
+CONF_MAX_PARALLEL_FETCHES = "max_parallel_fetches"
+CONF_TOKEN_MAX_AGE = "token_max_age"
+CONF_READ_FRESHNESS = "read_freshness"
+CONF_TRACE_ERRORS = "trace_errors"
+CONF_TRACE_SAMPLE_RATE = "trace_sample_rate"
+CONF_TRACE_DEVICES = "trace_devices"
+
 MIN_TEMP = 5
 MAX_TEMP = 34.5
 
@@ -1,39 +1,294 @@
 """Example integration using DataUpdateCoordinator."""
 
 from datetime import timedelta
+import asyncio
+import dataclasses
+import functools
 import logging
+import math
 
+from collections.abc import Iterable
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
+    UpdateFailed,
 )
 
-from custom_components.salus_controls.web_client import WebClient
+from custom_components.salus_controls.client import SalusClient
+from custom_components.salus_controls.metrics import (
+    METRIC_DISPATCH,
+    METRIC_POLL,
+    METRIC_WRITE,
+    Metrics,
+)
+from custom_components.salus_controls.polling import AdaptivePolling
+from custom_components.salus_controls.state import STATE_FIELDS, State
+from custom_components.salus_controls.write_queue import (
+    DEFAULT_DEBOUNCE_SECONDS,
+    WriteQueue,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# The cloud applies writes eventually, so a write is confirmed by
+# a few refreshes before the device's value wins over the written one
+CONFIRM_DELAY_SECONDS = 5
+CONFIRM_ATTEMPTS = 3
+
+DEFAULT_MAX_PARALLEL_FETCHES = 4
+
+# Home Assistant schedules polls on whole seconds, so a device due within
+# this margin is polled now rather than a second later
+POLL_MARGIN_SECONDS = 1
+
+
+class SalusDevice:
+    """Book-keeping of one thermostat of the account."""
+
+    def __init__(self, device_id: str, writes: WriteQueue, polling: AdaptivePolling):
+        """Initialize the device."""
+        self.device_id = device_id
+        self.writes = writes
+        self.polling = polling
+        # Loop time the device is polled next at, None when due
+        self.due_at = None
+        # Last state fetched from the cloud
+        self.state = None
+        # Changes queued but not written yet
+        self.optimistic = {}
+        # Changes written but not seen in the state of the device yet
+        self.unconfirmed = {}
+        # Changes the device did not apply, until the field is written again
+        self.rejected_changes = {}
+
+    def overlay(self) -> State | None:
+        """Returns the state of the device with the changes not confirmed yet."""
+        if self.state is None or (not self.unconfirmed and not self.optimistic):
+            return self.state
+
+        changes = {field: value for field, (value, _) in self.unconfirmed.items()}
+        changes.update(self.optimistic)
+        return dataclasses.replace(self.state, **changes)
+
+    def discard_optimistic(self, changes: dict) -> None:
+        """Forgets the queued changes unless they were queued again since."""
+        for field, value in changes.items():
+            if field in self.optimistic and self.optimistic[field] == value:
+                del self.optimistic[field]
+
+    def reconcile(self) -> None:
+        """Confirms the written changes against the state of the device."""
+        for field, (value, attempts) in list(self.unconfirmed.items()):
+            if field in self.optimistic:
+                continue
+
+            actual = getattr(self.state, field)
+            if _matches(value, actual):
+                del self.unconfirmed[field]
+                self.rejected_changes.pop(field, None)
+            elif attempts > 1:
+                self.unconfirmed[field] = (value, attempts - 1)
+            else:
+                del self.unconfirmed[field]
+                self.rejected_changes[field] = value
+                _LOGGER.warning(
+                    "Device %s did not apply %s=%s, reverting to %s",
+                    self.device_id, field, value, actual)
+
+
 class SalusCoordinator(DataUpdateCoordinator):
-    """My custom coordinator."""
+    """Fetches the state of all thermostats of an account.
+
+    The data maps each device ID to its state, or to None when the
+    device could not be fetched. Every device is polled on the schedule
+    of its own polling policy: a scheduled refresh only fetches the
+    devices that are due, and the next one is scheduled for the device
+    due first. Refreshes requested otherwise fetch all devices.
+    """
 
-    def __init__(self, hass, client: WebClient):
-        """Initialize my coordinator."""
+    def __init__(self, hass, client: SalusClient, device_ids: list[str],
+                 write_delay: float = DEFAULT_DEBOUNCE_SECONDS,
+                 max_parallel_fetches: int = DEFAULT_MAX_PARALLEL_FETCHES,
+                 writable_fields: Iterable[str] | None = None):
+        """Initialize my coordinator.
+
+        The writable fields are the features the entry was configured
+        with, all fields the client can write by default.
+        """
+        self.devices = {
+            device_id: SalusDevice(
+                device_id,
+                WriteQueue(functools.partial(self._async_write, device_id), write_delay),
+                AdaptivePolling())
+            for device_id in device_ids}
         super().__init__(
             hass,
             _LOGGER,
             # Name of the data. For logging purposes.
             name="Salus coordinator",
             # Polling interval. Will only be polled if there are subscribers.
-            update_interval=timedelta(seconds=60),
-            # Set always_update to `False` if the data returned from the
-            # api can be compared via `__eq__` to avoid duplicate updates
+            # Adapted after every poll by the polling policy of the devices.
+            update_interval=timedelta(
+                seconds=min(device.polling.interval for device in self.devices.values())),
+            # The state is compared via `__eq__` to avoid duplicate updates
             # being dispatched to listeners
-            always_update=True
+            always_update=False
         )
         self.client = client
+        # Fields of the state the entities may write
+        self.writable_fields = client.writable_fields
+        if writable_fields is not None:
+            self.writable_fields = self.writable_fields & frozenset(writable_fields)
+        self._fetch_semaphore = asyncio.Semaphore(max_parallel_fetches)
+        self._unsub_confirm = None
+        # Fields changed by the last update per device, None when all entities should be written
+        self.changed_fields = None
+        # The data was restored from the cache and not refreshed yet
+        self.stale = False
+        # The refresh in progress was scheduled by the update interval
+        self._scheduled_refresh = False
 
     @property
     def get_client(self):
         return self.client
 
+    @property
+    def metrics(self) -> Metrics:
+        """Returns the timings and counters of the client and of this coordinator."""
+        return self.client.metrics
+
+    @property
+    def device_ids(self) -> list[str]:
+        """Returns the IDs of the thermostats."""
+        return list(self.devices)
+
+    def async_restore(self, states: dict) -> None:
+        """Show the states cached before a restart until the first refresh."""
+        for device_id, device in self.devices.items():
+            device.state = states.get(device_id)
+        self.data = {device_id: device.state for device_id, device in self.devices.items()}
+        self.stale = True
+
+    def configure(self, interval: float | None = None, min_interval: float | None = None,
+                  max_interval: float | None = None, write_delay: float | None = None,
+                  max_parallel_fetches: int | None = None) -> None:
+        """Applies new polling bounds, write delay and concurrency, leaving unset ones as they are."""
+        for device in self.devices.values():
+            if interval is not None:
+                device.polling.interval = interval
+            if min_interval is not None:
+                device.polling.min_interval = min_interval
+            if max_interval is not None:
+                device.polling.max_interval = max_interval
+            if write_delay is not None:
+                device.writes.delay = write_delay
+
+        if max_parallel_fetches is not None:
+            # Fetches in progress release the previous semaphore
+            self._fetch_semaphore = asyncio.Semaphore(max_parallel_fetches)
+
+        # The next poll already respects the new bounds
+        self.update_interval = min(
+            device.polling.clamp(self.update_interval.total_seconds())
+            for device in self.devices.values())
+
+    async def async_set_attributes(self, device_id: str, debounce: bool = False, **changes) -> None:
+        """Write the changes to the device.
+
+        The changes are shown right away and confirmed by a refresh shortly
+        after they are written. Debounced changes wait until no other change
+        is queued within the write delay, so dragging a slider results in
+        a single request.
+        """
+        device = self.devices[device_id]
+        device.optimistic.update(changes)
+        self._async_publish(device)
+        await device.writes.async_enqueue(debounce, **changes)
+
+    async def async_shutdown(self) -> None:
+        """Write the queued changes and stop refreshing."""
+        await asyncio.gather(*(device.writes.async_close() for device in self.devices.values()))
+        if self._unsub_confirm is not None:
+            self._unsub_confirm()
+            self._unsub_confirm = None
+        await super().async_shutdown()
+
+    async def _async_write(self, device_id: str, **changes) -> None:
+        device = self.devices[device_id]
+        try:
+            with self.metrics.time(METRIC_WRITE, device_id):
+                await self.client.set_attributes(device_id, **changes)
+        except Exception:
+            device.discard_optimistic(changes)
+            self._async_publish(device)
+            raise
+
+        device.discard_optimistic(changes)
+        device.polling.notify_activity(self.hass.loop.time())
+        for field, value in changes.items():
+            device.unconfirmed[field] = (value, CONFIRM_ATTEMPTS)
+            device.rejected_changes.pop(field, None)
+        self._schedule_confirmation()
+
+    def _schedule_confirmation(self) -> None:
+        if self._unsub_confirm is None:
+            self._unsub_confirm = async_call_later(
+                self.hass, CONFIRM_DELAY_SECONDS, self._async_confirm)
+
+    async def _async_confirm(self, _now) -> None:
+        """Fetches the devices with written changes to confirm them."""
+        self._unsub_confirm = None
+        devices = [device for device in self.devices.values() if device.unconfirmed]
+        if not devices or self.data is None:
+            return
+
+        results = await self._async_fetch([device.device_id for device in devices])
+
+        data = dict(self.data)
+        for device, result in zip(devices, results):
+            if isinstance(result, Exception):
+                _LOGGER.debug("Could not confirm changes of %s: %s", device.device_id, result)
+                continue
+            device.state = result
+            device.reconcile()
+            data[device.device_id] = device.overlay()
+
+        if any(device.unconfirmed for device in self.devices.values()):
+            self._schedule_confirmation()
+
+        self.changed_fields = _diff(data, self.data)
+        if any(self.changed_fields.values()):
+            # Also pushes back the scheduled poll by a full interval
+            self.async_set_updated_data(data)
+
+    def _async_publish(self, device: SalusDevice) -> None:
+        """Show the device state with the changes not confirmed yet."""
+        if self.data is None or device.state is None:
+            return
+        state = device.overlay()
+        changed = state.diff(self.data.get(device.device_id))
+        if not changed:
+            return
+        self.changed_fields = {device.device_id: changed}
+        self.data = {**self.data, device.device_id: state}
+        self.async_update_listeners()
+
+    async def _async_fetch(self, device_ids: list[str]) -> list:
+        """Fetches the devices concurrently, returning the state or error of each."""
+
+        async def fetch(device_id: str) -> State:
+            async with self._fetch_semaphore:
+                return await self.client.get_state(device_id)
+
+        results = await asyncio.gather(
+            *(fetch(device_id) for device_id in device_ids), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        return results
+
     async def _async_setup(self):
         """Set up the coordinator
 
@@ -45,10 +300,95 @@ class SalusCoordinator(DataUpdateCoordinator):
         """
         #self._device = await self.my_api.get_device()
 
+    async def _handle_refresh_interval(self, _now=None) -> None:
+        """Refreshes the devices that are due."""
+        self._scheduled_refresh = True
+        try:
+            await super()._handle_refresh_interval(_now)
+        finally:
+            self._scheduled_refresh = False
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners, timing how long the entities take."""
+        with self.metrics.time(METRIC_DISPATCH):
+            super().async_update_listeners()
+
     async def _async_update_data(self):
         """Fetch data from API endpoint.
 
         This is the place to pre-process the data to lookup tables
         so entities can quickly look up their data.
         """
-        return await self.client.get_state()
+        with self.metrics.time(METRIC_POLL):
+            return await self._async_poll()
+
+    async def _async_poll(self) -> dict:
+        self.changed_fields = None
+        now = self.hass.loop.time()
+        previous = self.data or {}
+        polled = [
+            device for device in self.devices.values()
+            if not self._scheduled_refresh or device.due_at is None
+            or device.due_at <= now + POLL_MARGIN_SECONDS]
+        results = await self._async_fetch([device.device_id for device in polled])
+
+        # Devices not due keep their last data
+        data = {device_id: previous.get(device_id) for device_id in self.devices}
+        errors = []
+        for device, result in zip(polled, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning("Could not update %s: %s", device.device_id, result)
+                interval = device.polling.next_interval(device.state, None, now)
+                errors.append(result)
+                data[device.device_id] = None
+            else:
+                interval = device.polling.next_interval(device.state, result, now)
+                device.state = result
+                device.reconcile()
+                data[device.device_id] = device.overlay()
+            device.due_at = now + interval.total_seconds()
+
+        self.update_interval = timedelta(seconds=max(
+            POLL_MARGIN_SECONDS,
+            min(device.due_at for device in self.devices.values()) - now))
+        retry_after = self.client.retry_after
+        if retry_after is not None:
+            # Polls would fail without reaching the cloud, so the next one
+            # is scheduled for when the breaker lets a probe through
+            self.update_interval = timedelta(seconds=max(retry_after, 1))
+
+        if any(device.unconfirmed for device in self.devices.values()):
+            self._schedule_confirmation()
+
+        if errors and len(errors) == len(results):
+            if isinstance(errors[0], UpdateFailed):
+                raise errors[0]
+            raise UpdateFailed(f"Error during communication with the API: {errors[0]}") from errors[0]
+
+        if self.stale:
+            # Entities show they are no longer stale even if nothing changed
+            self.stale = False
+            if data == self.data:
+                self.hass.loop.call_soon(self.async_update_listeners)
+        elif self.last_update_success and self.data is not None:
+            self.changed_fields = _diff(data, self.data)
+        return data
+
+
+def _diff(data: dict, previous: dict) -> dict:
+    """Returns the changed fields of each device."""
+    changed = {}
+    for device_id, state in data.items():
+        old = previous.get(device_id)
+        if state is None or old is None:
+            changed[device_id] = frozenset() if state is old else STATE_FIELDS
+        else:
+            changed[device_id] = state.diff(old)
+    return changed
+
+
+def _matches(expected, actual) -> bool:
+    if isinstance(expected, float) or isinstance(actual, float):
+        return actual is not None and math.isclose(expected, actual, abs_tol=0.01)
+    return expected == actual
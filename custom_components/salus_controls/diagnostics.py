@@ -0,0 +1,33 @@
+"""Diagnostics support for Salus Controls."""
+
+import dataclasses
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME}
+
+
+async def async_get_config_entry_diagnostics(hass, entry) -> dict:
+    """Return the settings, device states, rejected changes, request metrics and traced exchanges of the entry."""
+    coordinator = entry.runtime_data
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "last_update_success": coordinator.last_update_success,
+        "update_interval": coordinator.update_interval.total_seconds(),
+        "devices": {
+            device_id: dataclasses.asdict(state) if state is not None else None
+            for device_id, state in (coordinator.data or {}).items()
+        },
+        "rejected_changes": {
+            device_id: dict(device.rejected_changes)
+            for device_id, device in coordinator.devices.items()
+            if device.rejected_changes
+        },
+        "metrics": coordinator.metrics.as_dict(),
+        "exchanges": [exchange.as_dict() for exchange in coordinator.client.tracer.exchanges],
+    }
@@ -0,0 +1,65 @@
+"""Base entity for the Salus Controls device."""
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import SalusCoordinator
+from .state import State
+
+
+class SalusEntity(CoordinatorEntity[SalusCoordinator]):
+    """Entity showing some of the fields of a thermostat's state.
+
+    The entity is written to Home Assistant only when one of its fields
+    changed or the availability of its thermostat did.
+    """
+
+    _device_id: str
+    # Fields of the state shown by the entity
+    _state_fields: frozenset[str] = frozenset()
+
+    @property
+    def available(self) -> bool:
+        """Return if the state of the thermostat is known."""
+        return super().available and self._device_state is not None
+
+    @property
+    def assumed_state(self) -> bool:
+        """Return if the state was cached before a restart and not refreshed yet."""
+        return self.coordinator.stale
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Return the changes of the entity's fields the thermostat did not apply."""
+        device = self.coordinator.devices[self._device_id]
+        rejected = {
+            field: value for field, value in device.rejected_changes.items()
+            if field in self._state_fields}
+        return {"rejected_changes": rejected} if rejected else None
+
+    @property
+    def _device_state(self) -> State | None:
+        if self.coordinator.data is None:
+            return None
+        return self.coordinator.data.get(self._device_id)
+
+    async def async_added_to_hass(self) -> None:
+        """Show the data fetched before the entity was added."""
+        await super().async_added_to_hass()
+        if self._device_state is not None:
+            self._update_from_state(self._device_state)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        changed = self.coordinator.changed_fields
+        if changed is not None and changed.get(self._device_id, frozenset()).isdisjoint(self._state_fields):
+            return
+
+        if self._device_state is not None:
+            self._update_from_state(self._device_state)
+        self.async_write_ha_state()
+
+    def _update_from_state(self, state: State) -> None:
+        """Copy the fields of the state to the entity."""
+        raise NotImplementedError()
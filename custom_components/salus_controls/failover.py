@@ -0,0 +1,239 @@
+"""
+Reads and writes through whichever Salus backend currently performs best.
+"""
+import asyncio
+import collections
+import dataclasses
+import logging
+import math
+import time
+
+from collections.abc import Iterable
+
+from homeassistant.helpers.update_coordinator import (
+    UpdateFailed,
+)
+
+from .client import CloudClient, SalusClient
+from .metrics import Metrics
+from .read_cache import ReadCache
+from .state import State
+from .trace import PayloadTracer
+
+# Number of recent requests the latency of a backend is estimated from
+LATENCY_WINDOW = 50
+HEDGE_PERCENTILE = 0.95
+# Hedge delay until a backend has enough latency samples
+DEFAULT_HEDGE_DELAY_SECONDS = 2.0
+MIN_HEDGE_SAMPLES = 5
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Backend:
+    """One client of the failover client with its recent latency and failures."""
+
+    def __init__(self, name: str, client: CloudClient, latency: float | None = None):
+        """Initialize the backend, seeded with a latency measured earlier if known."""
+        self.name = name
+        self.client = client
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        if latency is not None:
+            self.latencies.append(latency)
+        self.failures = 0
+
+    def percentile(self, fraction: float) -> float | None:
+        """Returns the latency below which the given fraction of requests completed."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        """Returns how long a read may take before it is hedged."""
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return DEFAULT_HEDGE_DELAY_SECONDS
+        return self.percentile(HEDGE_PERCENTILE)
+
+    def rank(self) -> tuple:
+        """Returns the sort key of the backend, the best backend first."""
+        paused = self.client.retry_after is not None
+        median = self.percentile(0.5)
+        # A backend never measured ranks behind the measured ones
+        return (paused, self.failures, median if median is not None else math.inf)
+
+    def record(self, elapsed: float, success: bool) -> None:
+        """Adds the outcome of a request."""
+        self.latencies.append(elapsed)
+        self.failures = 0 if success else self.failures + 1
+
+
+class FailoverClient(SalusClient):
+    """Spreads the requests of an account over several backends.
+
+    The healthiest and fastest backend serves the requests. When a read
+    takes longer than the recent 95th percentile of that backend, the
+    same read is sent to the next backend and the first answer wins.
+    Writes go to the best backend supporting all changed fields and fail
+    over to the next one on errors. The token of the first backend is the
+    one persisted across restarts.
+    """
+
+    def __init__(self, clients: dict[str, CloudClient], latencies: dict[str, float] | None = None):
+        """Initialize the client with the backends in order of preference.
+
+        The fetch latency of each backend measured when configuring the
+        entry ranks the backends until they served requests themselves.
+        """
+        latencies = latencies or {}
+        self.backends = [Backend(name, client, latencies.get(name)) for name, client in clients.items()]
+        # Last state read of each device and the state completed from it,
+        # completing the fields a backend cannot read
+        self._states = {}
+        self._reads = ReadCache(self.fetch_state)
+        # The backends record into the same metrics and traces
+        self._metrics = Metrics()
+        self._tracer = PayloadTracer()
+        for backend in self.backends:
+            backend.client.metrics = self._metrics
+            backend.client.tracer = self._tracer
+
+    @property
+    def metrics(self) -> Metrics:
+        """Returns the timings and counters of the requests of all backends."""
+        return self._metrics
+
+    @property
+    def tracer(self) -> PayloadTracer:
+        """Returns the exchanges traced from all backends."""
+        return self._tracer
+
+    @property
+    def writable_fields(self) -> frozenset:
+        """Returns the fields of `State` any of the backends can write."""
+        return frozenset().union(*(backend.client.writable_fields for backend in self.backends))
+
+    @property
+    def retry_after(self) -> float | None:
+        """Returns the seconds until one of the backends accepts requests again."""
+        delays = [backend.client.retry_after for backend in self.backends]
+        if None in delays:
+            return None
+        return min(delays)
+
+    @property
+    def token(self) -> tuple[str | None, float | None]:
+        """Returns the token of the first backend."""
+        return self.backends[0].client.token
+
+    def restore_token(self, token: str, retrieved_at: float) -> None:
+        """Reuses a token of the first backend retrieved earlier."""
+        self.backends[0].client.restore_token(token, retrieved_at)
+
+    def configure(self, timeouts: dict | None = None, retries: int | None = None,
+                  token_max_age: float | None = None, freshness: float | None = None,
+                  trace_errors: bool | None = None, trace_sample_rate: float | None = None,
+                  trace_devices: Iterable[str] | None = None) -> None:
+        """Applies the settings to the clients of all backends."""
+        if freshness is not None:
+            self._reads.freshness = freshness
+        for backend in self.backends:
+            backend.client.configure(
+                timeouts, retries, token_max_age, freshness,
+                trace_errors, trace_sample_rate, trace_devices)
+
+    async def get_state(self, device_id: str) -> State:
+        """Retrieves the state of the device, sharing concurrent and just completed reads."""
+        return await self._reads.async_get(device_id)
+
+    async def fetch_state(self, device_id: str) -> State:
+        """Reads the state from the best backend, hedged by the next one."""
+
+        ranked = self._ranked()
+        primary = asyncio.ensure_future(self._async_read(ranked[0], device_id))
+        pending = {primary}
+        try:
+            if len(ranked) > 1:
+                done, _ = await asyncio.wait(pending, timeout=ranked[0].hedge_delay())
+                if not done or primary.exception() is not None:
+                    _LOGGER.debug("Hedging the read of %s with the %s backend",
+                                  device_id, ranked[1].name)
+                    pending.add(asyncio.ensure_future(self._async_read(ranked[1], device_id)))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return self._complete(device_id, task.result())
+                    error = error or task.exception()
+            raise primary.exception() or error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        """Writes the changes through the best backend supporting them."""
+
+        backends = [
+            backend for backend in self._ranked()
+            if backend.client.writable_fields.issuperset(changes)]
+        if not backends:
+            raise NotImplementedError(
+                f"No backend supports setting {', '.join(changes)}")
+
+        self._reads.invalidate(device_id)
+
+        for backend in backends:
+            started = time.monotonic()
+            try:
+                await backend.client.set_attributes(device_id, **changes)
+            except UpdateFailed as err:
+                backend.record(time.monotonic() - started, False)
+                if backend is backends[-1]:
+                    raise
+                _LOGGER.warning("Could not write through the %s backend, failing over: %s",
+                                backend.name, err)
+            else:
+                backend.record(time.monotonic() - started, True)
+                return
+
+    async def close(self) -> None:
+        """Closes the clients of all backends."""
+        await self._reads.async_close()
+        await asyncio.gather(*(backend.client.close() for backend in self.backends))
+
+    def _ranked(self) -> list[Backend]:
+        # Sorting is stable, so equal backends keep their order of preference
+        return sorted(self.backends, key=Backend.rank)
+
+    async def _async_read(self, backend: Backend, device_id: str) -> State:
+        started = time.monotonic()
+        try:
+            state = await backend.client.get_state(device_id)
+        except asyncio.CancelledError:
+            # The hedged read won, the time spent is still a lower bound of the latency
+            backend.latencies.append(time.monotonic() - started)
+            raise
+        except Exception:
+            backend.record(time.monotonic() - started, False)
+            raise
+        backend.record(time.monotonic() - started, True)
+        return state
+
+    def _complete(self, device_id: str, state: State) -> State:
+        read, previous = self._states.get(device_id, (None, None))
+        if state is read:
+            # The backend reported the same state, keep reporting it unchanged
+            return previous
+
+        completed = state
+        if previous is not None:
+            missing = {
+                field.name: getattr(previous, field.name)
+                for field in dataclasses.fields(State)
+                if getattr(state, field.name) is None}
+            if missing:
+                completed = dataclasses.replace(state, **missing)
+        self._states[device_id] = (state, completed)
+        return completed
@@ -0,0 +1,152 @@
+"""
+Rolling timings and counters of the hot paths of the clients and the coordinator.
+"""
+import collections
+import contextlib
+import time
+
+from collections.abc import Callable, Iterator
+
+# Timings, per device where the work is done for one device
+METRIC_LOGIN = "login"
+METRIC_FETCH = "fetch"
+METRIC_PARSE = "parse"
+METRIC_WRITE = "write"
+METRIC_POLL = "poll"
+METRIC_DISPATCH = "dispatch"
+
+# Events counted per hour
+COUNTER_REQUESTS = "requests"
+COUNTER_ERRORS = "errors"
+COUNTER_TOKEN_REFRESHES = "token_refreshes"
+
+HISTOGRAM_SIZE = 100
+COUNTER_WINDOW_SECONDS = 3600
+# Rates are not extrapolated from less than this, a single login right
+# after starting would otherwise read as thousands per hour
+MIN_RATE_SECONDS = 300
+
+
+class RollingHistogram:
+    """Keeps the most recent samples of a timing."""
+
+    def __init__(self, size: int = HISTOGRAM_SIZE):
+        """Initialize the histogram."""
+        self._samples = collections.deque(maxlen=size)
+
+    def observe(self, value: float) -> None:
+        """Adds a sample, dropping the oldest one once full."""
+        self._samples.append(value)
+
+    @property
+    def last(self) -> float | None:
+        """Returns the most recent sample."""
+        return self._samples[-1] if self._samples else None
+
+    def percentile(self, fraction: float) -> float | None:
+        """Returns the sample below which the given fraction of the samples lies."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def as_dict(self) -> dict:
+        """Returns a summary of the samples."""
+        return {
+            "count": len(self._samples),
+            "last": self.last,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": max(self._samples, default=None),
+        }
+
+
+class RollingCounter:
+    """Counts the events within a time window."""
+
+    def __init__(self, window: float = COUNTER_WINDOW_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the counter."""
+        self.window = window
+        self._clock = clock
+        self._started_at = clock()
+        self._events = collections.deque()
+
+    def increment(self) -> None:
+        """Counts an event now."""
+        self._events.append(self._clock())
+
+    def count(self) -> int:
+        """Returns the number of events within the window."""
+        horizon = self._clock() - self.window
+        while self._events and self._events[0] <= horizon:
+            self._events.popleft()
+        return len(self._events)
+
+    def per_hour(self) -> float:
+        """Returns the rate of the events, extrapolated while the window is not full yet."""
+        count = self.count()
+        elapsed = min(self.window, max(MIN_RATE_SECONDS, self._clock() - self._started_at))
+        return count * 3600 / elapsed
+
+
+class Metrics:
+    """Timings and counters of one client and the coordinators using it.
+
+    Recording a sample costs an append to a bounded deque, so the hooks
+    stay on all the time.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """Initialize the metrics."""
+        self._clock = clock
+        self._histograms = collections.defaultdict(RollingHistogram)
+        self._counters = collections.defaultdict(lambda: RollingCounter(clock=self._clock))
+        # Rates count from now rather than from the first event
+        for name in (COUNTER_REQUESTS, COUNTER_ERRORS, COUNTER_TOKEN_REFRESHES):
+            self._counters[name] = RollingCounter(clock=clock)
+
+    def observe(self, name: str, seconds: float, device_id: str | None = None) -> None:
+        """Records a timing, of the device if given."""
+        self._histograms[(name, device_id)].observe(seconds)
+
+    @contextlib.contextmanager
+    def time(self, name: str, device_id: str | None = None) -> Iterator[None]:
+        """Records how long the block took, whether or not it raised."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self._clock() - started, device_id)
+
+    def increment(self, name: str) -> None:
+        """Counts an event."""
+        self._counters[name].increment()
+
+    def histogram(self, name: str, device_id: str | None = None) -> RollingHistogram:
+        """Returns the timings recorded under the name, empty when there are none."""
+        return self._histograms.get((name, device_id)) or RollingHistogram()
+
+    def per_hour(self, name: str) -> float:
+        """Returns the events counted under the name per hour."""
+        return self._counters[name].per_hour()
+
+    def error_rate(self) -> float | None:
+        """Returns the share of the requests of the last hour that failed."""
+        requests = self._counters[COUNTER_REQUESTS].count()
+        if not requests:
+            return None
+        return self._counters[COUNTER_ERRORS].count() / requests
+
+    def as_dict(self) -> dict:
+        """Returns all timings in seconds and counters per hour, e.g. for the diagnostics."""
+        timings = {}
+        for (name, device_id), histogram in sorted(
+                self._histograms.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+            key = name if device_id is None else f"{name} {device_id}"
+            timings[key] = histogram.as_dict()
+        return {
+            "timings": timings,
+            "per_hour": {name: counter.per_hour() for name, counter in sorted(self._counters.items())},
+            "error_rate": self.error_rate(),
+        }
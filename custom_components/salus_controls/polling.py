@@ -0,0 +1,97 @@
+"""
+Adapts the polling interval to what the thermostat is doing.
+"""
+from datetime import timedelta
+
+from .state import State
+
+DEFAULT_INTERVAL_SECONDS = 60
+DEFAULT_MIN_INTERVAL_SECONDS = 20
+DEFAULT_MAX_INTERVAL_SECONDS = 5 * 60
+
+# How long the thermostat is polled quickly after a transition
+ACTIVE_WINDOW_SECONDS = 2 * 60
+# The room temperature wanders by a tenth of a degree all the time, smaller
+# moves since the last reference temperature do not count as a change
+TEMPERATURE_DEADBAND = 0.5
+# Number of polls without any change before polling slows down
+IDLE_POLLS = 3
+# Backoff doubles the interval at most this many times, the interval is
+# clamped anyway and a float power overflows after about a thousand
+MAX_BACKOFF_EXPONENT = 10
+
+TRANSITION_FIELDS = ("action", "mode", "target_temperature", "hot_water_enabled")
+
+
+class AdaptivePolling:
+    """Chooses the delay before the next poll.
+
+    Polls quickly for a short window after a transition (the relay
+    switching, a new setpoint), and backs off exponentially while neither
+    the transition fields nor the room temperature change or the cloud
+    keeps failing. The interval always stays within the configured bounds.
+    """
+
+    def __init__(self,
+                 interval: float = DEFAULT_INTERVAL_SECONDS,
+                 min_interval: float = DEFAULT_MIN_INTERVAL_SECONDS,
+                 max_interval: float = DEFAULT_MAX_INTERVAL_SECONDS):
+        """Initialize the policy."""
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._active_until = None
+        self._idle_polls = 0
+        self._failures = 0
+        # Room temperature when the thermostat was last considered changed
+        self._reference_temperature = None
+
+    def notify_activity(self, now: float) -> None:
+        """Polls quickly for a while, e.g. after a write."""
+        self._active_until = now + ACTIVE_WINDOW_SECONDS
+
+    def next_interval(self, previous: State | None, current: State | None, now: float) -> timedelta:
+        """Returns the delay before the next poll.
+
+        The current state is None when the poll failed.
+        """
+
+        if current is None:
+            self._failures += 1
+            return self.clamp(self.interval * 2 ** min(self._failures, MAX_BACKOFF_EXPONENT))
+
+        self._failures = 0
+
+        if previous is not None and _changed(previous, current, TRANSITION_FIELDS):
+            self.notify_activity(now)
+
+        if self._active_until is not None and now < self._active_until:
+            self._idle_polls = 0
+            self._reference_temperature = current.current_temperature
+            return self.clamp(self.min_interval)
+
+        if previous is not None and not self._temperature_moved(current):
+            self._idle_polls += 1
+        else:
+            self._idle_polls = 0
+            self._reference_temperature = current.current_temperature
+
+        if self._idle_polls < IDLE_POLLS:
+            return self.clamp(self.interval)
+
+        exponent = min(self._idle_polls - IDLE_POLLS + 1, MAX_BACKOFF_EXPONENT)
+        return self.clamp(self.interval * 2 ** exponent)
+
+    def _temperature_moved(self, current: State) -> bool:
+        reference = self._reference_temperature
+        if reference is None or current.current_temperature is None:
+            return reference != current.current_temperature
+        return abs(current.current_temperature - reference) >= TEMPERATURE_DEADBAND
+
+    def clamp(self, seconds: float) -> timedelta:
+        """Returns the interval within the configured bounds."""
+        return timedelta(seconds=min(max(seconds, self.min_interval), self.max_interval))
+
+
+def _changed(previous: State, current: State, fields: tuple) -> bool:
+    return any(getattr(previous, field) != getattr(current, field) for field in fields)
@@ -0,0 +1,90 @@
+"""
+Shares concurrent reads of a device and reuses a state fetched moments ago.
+"""
+import asyncio
+import functools
+import logging
+import time
+
+from collections.abc import Awaitable, Callable
+
+from .state import State
+
+DEFAULT_FRESHNESS_SECONDS = 2.0
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReadCache:
+    """Fetches the state of a device at most once at a time.
+
+    Concurrent callers share the request in flight, and callers within
+    the freshness window after it completed get its state without any
+    request. A write invalidates both, so the next read sees it. The
+    request is cancelled once every caller waiting for it is.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[State]],
+                 freshness: float = DEFAULT_FRESHNESS_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache."""
+        self._fetch = fetch
+        self._clock = clock
+        self.freshness = freshness
+        self._reads = {}
+        self._states = {}
+        # Number of callers waiting for each read in flight
+        self._waiters = {}
+
+    async def async_get(self, device_id: str) -> State:
+        """Returns the state of the device, fetching it when it is not fresh."""
+
+        cached = self._states.get(device_id)
+        if cached is not None and self._clock() - cached[1] < self.freshness:
+            return cached[0]
+
+        read = self._reads.get(device_id)
+        if read is None:
+            read = asyncio.get_running_loop().create_task(self._async_read(device_id))
+            read.add_done_callback(functools.partial(self._read_done, device_id))
+            self._reads[device_id] = read
+        else:
+            _LOGGER.debug("Sharing the read of %s in progress", device_id)
+
+        self._waiters[read] = self._waiters.get(read, 0) + 1
+        try:
+            return await asyncio.shield(read)
+        except asyncio.CancelledError:
+            if self._waiters[read] == 1 and not read.done():
+                _LOGGER.debug("Cancelling the read of %s nobody waits for", device_id)
+                read.cancel()
+            raise
+        finally:
+            self._waiters[read] -= 1
+            if not self._waiters[read]:
+                del self._waiters[read]
+
+    def invalidate(self, device_id: str) -> None:
+        """Forgets the state of the device, e.g. after writing to it."""
+        self._states.pop(device_id, None)
+        # Reads started before the write complete for their callers only
+        self._reads.pop(device_id, None)
+
+    async def async_close(self) -> None:
+        """Cancels the reads still in progress."""
+        for read in self._reads.values():
+            read.cancel()
+        self._reads.clear()
+        self._states.clear()
+
+    async def _async_read(self, device_id: str) -> State:
+        state = await self._fetch(device_id)
+        if self._reads.get(device_id) is asyncio.current_task():
+            self._states[device_id] = (state, self._clock())
+        return state
+
+    def _read_done(self, device_id: str, task: asyncio.Task) -> None:
+        if self._reads.get(device_id) is task:
+            del self._reads[device_id]
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.debug("Reading %s failed: %s", device_id, task.exception())
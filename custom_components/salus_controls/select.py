@@ -1,60 +1,49 @@
 """Select entities for the Salus Controls device."""
 
 from homeassistant.components.select import (
-    SelectEntity
-)
-from homeassistant.const import EntityCategory
-
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.core import callback
-
-from homeassistant.const import (
-    CONF_DEVICE_ID
+    SelectEntity,
 )
+from homeassistant.const import Platform
 
+from .attributes import Attribute, entity_attributes
 from .const import (
     DOMAIN,
 )
-
-SPAN_VALUES = [
-    "Hysteresis ±0.25°C",
-    "Hysteresis ±0.5°C",
-    "Hysteresis ±1.0°C",
-    "Hysteresis ±1.5°C",
-    "Hysteresis ±2.0°C"]
+from .entity import SalusEntity
+from .state import State
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Salus selects from a config entry."""
 
     coordinator = config_entry.runtime_data
-    device_id = config_entry.data[CONF_DEVICE_ID]
 
+    # Only attributes the backends of the entry can write, e.g. only the
+    # mobile application API can set the temperature span
     async_add_entities([
-        TemperatureSpanEntity(
-            "Temperature span", coordinator, coordinator.get_client, device_id)
-    ])
+        SalusSelectEntity(coordinator, device_id, attribute)
+        for device_id in coordinator.device_ids
+        for attribute in entity_attributes(Platform.SELECT)
+        if attribute.field in coordinator.writable_fields])
 
 
-class TemperatureSpanEntity(CoordinatorEntity, SelectEntity):
-    """Select entity for temperature span."""
+class SalusSelectEntity(SalusEntity, SelectEntity):
+    """Select entity for an enumerated attribute of the thermostat."""
     _attr_has_entity_name = True
-    _attr_entity_category = EntityCategory.CONFIG
-    _attr_options = SPAN_VALUES
 
-    def __init__(self, name, coordinator, client, device_id):
+    def __init__(self, coordinator, device_id, attribute: Attribute):
         """Initialize the select."""
         super().__init__(coordinator)
-        self._name = name
+        self.entity_description = attribute.entity
+        self._attribute = attribute
+        self._state_fields = frozenset([attribute.field])
         self._device_id = device_id
         self._coordinator = coordinator
-        self._client = client
-        self._attr_unique_id = "_".join([self._device_id, "temperature_span"])
-
-    @property
-    def name(self):
-        """Name of the entity."""
-        return self._name
+        # Options in the order of the labels rather than of the values
+        self._values = {label: value for value, label in attribute.labels.items()}
+        self._attr_options = list(self._values)
+        self._attr_current_option = None
+        self._attr_unique_id = "_".join([self._device_id, attribute.entity.key])
 
     @property
     def device_info(self):
@@ -63,29 +52,10 @@ class TemperatureSpanEntity(CoordinatorEntity, SelectEntity):
 
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
-        value = self.map_value(SPAN_VALUES.index(option))
-        await self._client.set_temperature_span(value)
-        await self._coordinator.async_request_refresh()
-
-    @property
-    def current_option(self) -> str | None:
-        """Get the current status of the select entity from device_status."""
-        if not isinstance(self.selected_value, int):
-            return None
-        else:
-            return SPAN_VALUES[self.map_value(self.selected_value)]
-
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        self.selected_value = self._coordinator.data.temperature_span
-        self.async_write_ha_state()
+        await self._coordinator.async_set_attributes(
+            self._device_id, **{self._attribute.field: self._values[option]})
 
-    def map_value(self, value: int) -> int:
-        """API uses different value than index in the select list"""
-        if value == 1:
-            return 0
-        elif value == 0:
-            return 1
-        else:
-            return value
+    def _update_from_state(self, state: State) -> None:
+        """Copy the fields of the state to the entity."""
+        self._attr_current_option = self._attribute.labels.get(
+            getattr(state, self._attribute.field))
@@ -0,0 +1,115 @@
+"""Diagnostic sensors showing how the Salus cloud performs."""
+
+from collections.abc import Callable
+from datetime import timedelta
+import dataclasses
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+
+from .const import (
+    DOMAIN,
+)
+from .metrics import (
+    COUNTER_REQUESTS,
+    COUNTER_TOKEN_REFRESHES,
+    METRIC_FETCH,
+    METRIC_POLL,
+    Metrics,
+)
+
+# The sensors read the metrics kept in memory, polling them costs no request
+SCAN_INTERVAL = timedelta(seconds=60)
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class SalusSensorEntityDescription(SensorEntityDescription):
+    """Describes a diagnostic sensor and how its value is read from the metrics."""
+
+    value: Callable[[Metrics, str], float | None]
+    # Shown for every device, the others only for the first device of the entry
+    per_device: bool = False
+
+
+SENSORS = (
+    SalusSensorEntityDescription(
+        key="fetch_latency",
+        name="Fetch latency (p95)",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value=lambda metrics, device_id: _milliseconds(
+            metrics.histogram(METRIC_FETCH, device_id).percentile(0.95)),
+        per_device=True),
+    SalusSensorEntityDescription(
+        key="poll_latency",
+        name="Last poll latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value=lambda metrics, _: _milliseconds(metrics.histogram(METRIC_POLL).last)),
+    SalusSensorEntityDescription(
+        key="token_refreshes",
+        name="Token refreshes",
+        icon="mdi:key-chain",
+        native_unit_of_measurement="refreshes/h",
+        value=lambda metrics, _: round(metrics.per_hour(COUNTER_TOKEN_REFRESHES), 1)),
+    SalusSensorEntityDescription(
+        key="error_rate",
+        name="Error rate",
+        icon="mdi:alert-circle-outline",
+        native_unit_of_measurement=PERCENTAGE,
+        value=lambda metrics, _: (
+            None if metrics.error_rate() is None else round(metrics.error_rate() * 100, 1))),
+    SalusSensorEntityDescription(
+        key="requests",
+        name="Requests",
+        icon="mdi:cloud-sync",
+        native_unit_of_measurement="requests/h",
+        value=lambda metrics, _: round(metrics.per_hour(COUNTER_REQUESTS), 1)),
+)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up Salus diagnostic sensors from a config entry."""
+
+    coordinator = config_entry.runtime_data
+
+    async_add_entities([
+        SalusDiagnosticSensor(coordinator, device_id, description)
+        for index, device_id in enumerate(coordinator.device_ids)
+        for description in SENSORS
+        if description.per_device or index == 0])
+
+
+class SalusDiagnosticSensor(SensorEntity):
+    """Sensor showing a timing or rate of the requests to the Salus cloud."""
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    entity_description: SalusSensorEntityDescription
+
+    def __init__(self, coordinator, device_id, description: SalusSensorEntityDescription):
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._device_id = device_id
+        self._coordinator = coordinator
+        self._attr_unique_id = "_".join([self._device_id, description.key])
+
+    @property
+    def device_info(self):
+        """Return information to link this entity with the correct device."""
+        return {"identifiers": {(DOMAIN, self._device_id)}}
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the value read from the metrics."""
+        return self.entity_description.value(self._coordinator.metrics, self._device_id)
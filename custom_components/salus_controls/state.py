@@ -2,15 +2,46 @@
 
 import dataclasses
 
+from homeassistant.components.climate.const import (
+    HVACAction,
+    HVACMode,
+)
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True)
 class State:
     """The state of the thermostat."""
-    current_temperature = None
-    target_temperature = None
-    frost = None
-    action = None
-    mode = None
-    hot_water_enabled = None
-    temperature_span = None
-    temperature_offset = None
+    current_temperature: float | None = None
+    target_temperature: float | None = None
+    frost: float | None = None
+    action: HVACAction | None = None
+    mode: HVACMode | None = None
+    hot_water_enabled: bool | None = None
+    temperature_span: int | None = None
+    temperature_offset: float | None = None
+
+    def diff(self, other: "State | None") -> frozenset[str]:
+        """Returns the names of the fields that differ from the other state."""
+        if other is None:
+            return STATE_FIELDS
+        if other is self:
+            return frozenset()
+        return frozenset(
+            field for field in STATE_FIELDS if getattr(self, field) != getattr(other, field))
+
+    def as_dict(self) -> dict:
+        """Returns the fields as a JSON serializable dictionary."""
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "State":
+        """Creates the state from a dictionary returned by `as_dict`."""
+        state = cls(**{field: value for field, value in data.items() if field in STATE_FIELDS})
+        if state.action is not None:
+            state.action = HVACAction(state.action)
+        if state.mode is not None:
+            state.mode = HVACMode(state.mode)
+        return state
+
+
+STATE_FIELDS = frozenset(field.name for field in dataclasses.fields(State))
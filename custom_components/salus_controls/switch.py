@@ -1,74 +1,60 @@
 """Hot water pump entity for the Salus Controls device."""
 
-from homeassistant.components.switch import SwitchEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.core import callback
-
-from homeassistant.const import (
-    CONF_DEVICE_ID
+from homeassistant.components.switch import (
+    SwitchEntity,
 )
+from homeassistant.const import Platform
 
+from .attributes import Attribute, entity_attributes
 from .const import (
     DOMAIN,
 )
+from .entity import SalusEntity
+from .state import State
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Salus switches from a config entry."""
 
     coordinator = config_entry.runtime_data
-    device_id = config_entry.data[CONF_DEVICE_ID]
 
     async_add_entities([
-        HotWaterEntity("Hot Water Valve", coordinator, coordinator.get_client, device_id)])
+        SalusSwitchEntity(coordinator, device_id, attribute)
+        for device_id in coordinator.device_ids
+        for attribute in entity_attributes(Platform.SWITCH)
+        if attribute.field in coordinator.writable_fields])
 
 
-class HotWaterEntity(CoordinatorEntity, SwitchEntity):
-    """Representation of a hot water."""
+class SalusSwitchEntity(SalusEntity, SwitchEntity):
+    """Switch entity for an on/off attribute of the thermostat, e.g. the hot water."""
     _attr_has_entity_name = True
-    _attr_icon = "mdi:water-thermometer"
 
-    def __init__(self, name, coordinator, client, device_id):
+    def __init__(self, coordinator, device_id, attribute: Attribute):
         """Initialize the switch."""
         super().__init__(coordinator)
-        self._name = name
+        self.entity_description = attribute.entity
+        self._attribute = attribute
+        self._state_fields = frozenset([attribute.field])
         self._device_id = device_id
         self._coordinator = coordinator
-        self._client = client
-        self._is_on = None
-
-    @property
-    def name(self):
-        """Name of the entity."""
-        return self._name
+        self._attr_is_on = None
+        self._attr_unique_id = "_".join([self._device_id, attribute.entity.key])
 
     @property
     def device_info(self):
         """Return information to link this entity with the correct device."""
         return {"identifiers": {(DOMAIN, self._device_id)}}
 
-    @property
-    def unique_id(self) -> str:
-        """Return the unique ID for this switch."""
-        return "_".join([self._device_id, "hot_water_valve"])
-
-    @property
-    def is_on(self):
-        """If the switch is currently on or off."""
-        return self._is_on
-
     async def async_turn_on(self, **kwargs):
         """Turn the switch on."""
-        await self._client.set_hot_water_mode(True)
-        await self._coordinator.async_request_refresh()
+        await self._coordinator.async_set_attributes(
+            self._device_id, **{self._attribute.field: True})
 
     async def async_turn_off(self, **kwargs):
         """Turn the switch off."""
-        await self._client.set_hot_water_mode(False)
-        await self._coordinator.async_request_refresh()
+        await self._coordinator.async_set_attributes(
+            self._device_id, **{self._attribute.field: False})
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        self._is_on = self._coordinator.data.hot_water_enabled
-        self.async_write_ha_state()
+    def _update_from_state(self, state: State) -> None:
+        """Copy the fields of the state to the entity."""
+        self._attr_is_on = getattr(state, self._attribute.field)
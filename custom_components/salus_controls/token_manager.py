@@ -0,0 +1,100 @@
+"""
+Keeps the session token of a Salus client fresh.
+"""
+import asyncio
+import logging
+import time
+
+from collections.abc import Awaitable, Callable
+
+REFRESH_MARGIN_SECONDS = 5 * 60
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TokenManager:
+    """Hands out a valid session token, logging in at most once at a time.
+
+    Concurrent callers share a single in-flight login. Once the token gets
+    within the refresh margin of its maximum age, a new one is fetched in
+    the background while callers keep using the current one.
+    """
+
+    def __init__(self, login: Callable[[], Awaitable[str]], max_age: float,
+                 refresh_margin: float = REFRESH_MARGIN_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        """Initialize the manager."""
+        self._login = login
+        self._clock = clock
+        self.max_age = max_age
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._retrieved_at = None
+        self._refresh = None
+
+    @property
+    def token(self) -> str | None:
+        """Returns the current token without checking its age."""
+        return self._token
+
+    @property
+    def retrieved_at(self) -> float | None:
+        """Returns the time when the current token was retrieved."""
+        return self._retrieved_at
+
+    async def async_get_token(self) -> str:
+        """Returns a valid token, logging in when there is none."""
+
+        if self._token is None:
+            _LOGGER.info("Retrieving token for the first time this session...")
+            return await self._async_refresh()
+
+        age = self._clock() - self._retrieved_at
+        if age >= self.max_age:
+            _LOGGER.info("Token has expired, getting new one...")
+            return await self._async_refresh()
+
+        if age >= self.max_age - min(self.refresh_margin, self.max_age / 2) and self._refresh is None:
+            _LOGGER.debug("Token is about to expire, refreshing it in the background...")
+            self._start_refresh()
+
+        return self._token
+
+    def invalidate(self, token: str) -> None:
+        """Forgets the token after it has been rejected by the server."""
+        if token is not None and token == self._token:
+            self._token = None
+            self._retrieved_at = None
+
+    def restore(self, token: str, retrieved_at: float) -> None:
+        """Reuses a token retrieved earlier, unless there is a newer one."""
+        if self._token is None or self._retrieved_at < retrieved_at:
+            self._token = token
+            self._retrieved_at = retrieved_at
+
+    async def async_close(self) -> None:
+        """Cancels a background refresh still in progress."""
+        if self._refresh is not None:
+            self._refresh.cancel()
+            self._refresh = None
+
+    async def _async_refresh(self) -> str:
+        refresh = self._refresh or self._start_refresh()
+        return await asyncio.shield(refresh)
+
+    def _start_refresh(self) -> asyncio.Task:
+        self._refresh = asyncio.get_running_loop().create_task(self._async_login())
+        self._refresh.add_done_callback(self._refresh_done)
+        return self._refresh
+
+    async def _async_login(self) -> str:
+        token = await self._login()
+        self._token = token
+        self._retrieved_at = self._clock()
+        return token
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        if self._refresh is task:
+            self._refresh = None
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.debug("Token refresh failed: %s", task.exception())
@@ -0,0 +1,161 @@
+"""
+Records the payloads of sampled and failed exchanges with the Salus cloud.
+"""
+import collections
+import dataclasses
+import logging
+import random
+import re
+import time
+
+from collections.abc import Callable, Iterable
+
+# Exchanges kept for the diagnostics
+DEFAULT_TRACE_SIZE = 50
+# Longer bodies are cut, the state of a device takes a few kilobytes
+MAX_BODY_CHARS = 8192
+# Recent tokens still redacted from the bodies
+TOKEN_HISTORY = 8
+
+REDACTED = "**REDACTED**"
+
+# Parameters and form fields carrying credentials or tokens
+SECRET_KEYS = frozenset(
+    ("username", "password", "IDemail", "token", "secToken", "securityToken"))
+
+# Tokens within the bodies, issued before the client knows them
+SECRET_PATTERNS = (
+    re.compile(r'("(?:securityToken|token|password)"\s*:\s*")[^"]*(")'),
+    re.compile(r'(<input id="token" type="hidden" value=")[^"]*(")'),
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(slots=True)
+class Exchange:
+    """A request to the Salus cloud and its response, with the secrets redacted."""
+    time: float
+    operation: str
+    method: str
+    url: str
+    params: dict | None
+    status: int | None
+    seconds: float
+    body: str | None
+    error: str | None = None
+
+    def as_dict(self) -> dict:
+        """Returns the exchange, e.g. for the diagnostics."""
+        return dataclasses.asdict(self)
+
+    def __str__(self) -> str:
+        outcome = self.error or self.status
+        return (f"{self.method} {self.url} {self.params} -> {outcome} "
+                f"in {self.seconds * 1000:.0f} ms: {self.body}")
+
+
+class PayloadTracer:
+    """Keeps the most recent exchanges worth looking into.
+
+    An exchange is recorded when it failed, when it was sampled or when it
+    concerns one of the traced devices. Everything else is left alone, so
+    apart from the sampling decision tracing costs nothing. Credentials
+    and tokens are redacted when recording, the exchanges are only
+    formatted when read or logged at debug level.
+    """
+
+    def __init__(self, errors: bool = True, sample_rate: float = 0.0,
+                 devices: Iterable[str] = (), size: int = DEFAULT_TRACE_SIZE,
+                 clock: Callable[[], float] = time.monotonic,
+                 rng: Callable[[], float] = random.random):
+        """Initialize the tracer."""
+        self.errors = errors
+        self.sample_rate = sample_rate
+        self.devices = frozenset(devices)
+        self.clock = clock
+        self._rng = rng
+        self._exchanges = collections.deque(maxlen=size)
+        self._credentials = set()
+        self._tokens = collections.deque(maxlen=TOKEN_HISTORY)
+
+    @property
+    def enabled(self) -> bool:
+        """Returns whether any exchange may be recorded."""
+        return self.errors or self.sample_rate > 0 or bool(self.devices)
+
+    @property
+    def exchanges(self) -> list[Exchange]:
+        """Returns the recorded exchanges, the oldest first."""
+        return list(self._exchanges)
+
+    def add_credentials(self, *values: str) -> None:
+        """Redacts the values, e.g. the password, from the recorded bodies."""
+        self._credentials.update(value for value in values if value)
+
+    def add_token(self, token: str) -> None:
+        """Redacts the token from the bodies recorded from now on."""
+        if token and token not in self._tokens:
+            self._tokens.append(token)
+
+    def adopt(self, other: "PayloadTracer") -> None:
+        """Takes over the secrets of a tracer this one replaces."""
+        self._credentials.update(other._credentials)
+        for token in other._tokens:
+            self.add_token(token)
+
+    def wants(self, request) -> bool:
+        """Returns whether the successful exchange of the request is recorded."""
+        if self.devices and _device_of(request.kwargs) in self.devices:
+            return True
+        return self.sample_rate > 0 and self._rng() < self.sample_rate
+
+    def record(self, request, status: int | None, body: bytes | None,
+               error: str | None = None) -> Exchange:
+        """Records the exchange of the request."""
+        exchange = Exchange(
+            time=time.time(),
+            operation=request.operation,
+            method=request.method,
+            url=request.url,
+            params=self.redact_params(request.kwargs),
+            status=status,
+            seconds=request.seconds,
+            body=None if body is None else self.redact_body(body),
+            error=error)
+        self._exchanges.append(exchange)
+        _LOGGER.debug("Traced %s", exchange)
+        return exchange
+
+    def record_failure(self, response, error: Exception) -> None:
+        """Records the exchange of a response that could not be handled."""
+        request = response.request
+        message = str(error) or type(error).__name__
+        if request.exchange is not None:
+            # Already recorded when it was sampled
+            request.exchange.error = message
+        elif self.errors:
+            request.exchange = self.record(request, response.status, response.body, message)
+
+    def redact_params(self, kwargs: dict) -> dict | None:
+        """Returns the parameters or form fields of a request with the secrets redacted."""
+        params = kwargs.get("params") or kwargs.get("data") or kwargs.get("json")
+        if not isinstance(params, dict):
+            return None
+        return {key: REDACTED if key in SECRET_KEYS else value for key, value in params.items()}
+
+    def redact_body(self, body: bytes, limit: int | None = MAX_BODY_CHARS) -> str:
+        """Returns the body as text with the secrets redacted, cut after the limit."""
+        text = body[:limit].decode("utf-8", errors="replace")
+        for pattern in SECRET_PATTERNS:
+            text = pattern.sub(rf"\g<1>{REDACTED}\g<2>", text)
+        for secret in (*self._credentials, *self._tokens):
+            text = text.replace(secret, REDACTED)
+        if limit is not None and len(body) > limit:
+            text += f"... ({len(body)} bytes)"
+        return text
+
+
+def _device_of(kwargs: dict) -> str | None:
+    params = kwargs.get("params") or kwargs.get("data")
+    return params.get("devId") if isinstance(params, dict) else None
@@ -0,0 +1,223 @@
+"""
+Sends the requests of the clients with deadlines, retries and a circuit breaker.
+"""
+import asyncio
+import dataclasses
+import logging
+import random
+import time
+import aiohttp
+
+from collections.abc import Callable
+
+from homeassistant.helpers.update_coordinator import (
+    UpdateFailed,
+)
+
+from .metrics import COUNTER_ERRORS, COUNTER_REQUESTS, Metrics
+from .trace import Exchange, PayloadTracer
+
+OPERATION_LOGIN = "login"
+OPERATION_READ = "read"
+OPERATION_WRITE = "write"
+
+DEFAULT_TIMEOUTS = {
+    OPERATION_LOGIN: 15,
+    OPERATION_READ: 10,
+    OPERATION_WRITE: 10,
+}
+DEFAULT_RETRIES = 2
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8
+
+# Consecutive failures after which requests are paused
+BREAKER_THRESHOLD = 5
+# Pause after which a single request probes whether the cloud recovered
+BREAKER_RESET_SECONDS = 60
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CircuitOpenError(UpdateFailed):
+    """The cloud failed repeatedly and requests are paused."""
+
+    def __init__(self, retry_after: float):
+        """Initialize the error."""
+        super().__init__(
+            f"Salus cloud is unavailable, requests are paused for {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Pauses requests after consecutive failures.
+
+    Once the pause is over, a single probe request is let through. Its
+    success closes the circuit, its failure starts another pause.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the breaker."""
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Returns whether requests are paused."""
+        return self._opened_at is not None
+
+    @property
+    def retry_after(self) -> float:
+        """Returns the seconds until the next probe is let through."""
+        if self._opened_at is None:
+            return 0
+        return max(0, self._opened_at + self.reset_seconds - self._clock())
+
+    def before_request(self) -> None:
+        """Raises when the request should not be sent."""
+        if self._opened_at is None:
+            return
+        if self._probing or self.retry_after > 0:
+            raise CircuitOpenError(self.retry_after or self.reset_seconds)
+
+        _LOGGER.info("Probing whether the Salus cloud recovered...")
+        self._probing = True
+
+    def record_success(self) -> None:
+        """Closes the circuit."""
+        if self._opened_at is not None:
+            _LOGGER.info("Salus cloud recovered, resuming requests")
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_cancelled(self) -> None:
+        """Lets the next request probe when the probe was cancelled."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Opens the circuit after too many consecutive failures."""
+        self._failures += 1
+        if self._probing or (self._opened_at is None and self._failures >= self.threshold):
+            _LOGGER.warning(
+                "Salus cloud failed %d times in a row, pausing requests for %d s",
+                self._failures, self.reset_seconds)
+            self._opened_at = self._clock()
+        self._probing = False
+
+
+@dataclasses.dataclass(slots=True)
+class Request:
+    """Request sent to the Salus cloud, kept while tracing to record its exchange."""
+    method: str
+    url: str
+    operation: str
+    kwargs: dict
+    seconds: float = 0.0
+    # Set once the exchange is recorded
+    exchange: Exchange | None = None
+
+
+@dataclasses.dataclass(slots=True)
+class Response:
+    """Response of the Salus cloud, read completely."""
+    status: int
+    body: bytes
+    # The request, only while tracing
+    request: Request | None = None
+
+    def text(self) -> str:
+        """Returns the body as text."""
+        return self.body.decode("utf-8", errors="replace")
+
+
+class Transport:
+    """Sends the requests of a client over its session.
+
+    Every request has a deadline depending on its operation. Idempotent
+    requests are retried with jittered exponential backoff on connection
+    errors, timeouts, throttling and server errors.
+    """
+
+    def __init__(self, session: Callable[[], aiohttp.ClientSession],
+                 retries: int = DEFAULT_RETRIES,
+                 breaker: CircuitBreaker | None = None,
+                 metrics: Metrics | None = None,
+                 tracer: PayloadTracer | None = None):
+        """Initialize the transport.
+
+        While a capture is set, every exchange is recorded to it.
+        """
+        self._session = session
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or Metrics()
+        self.tracer = tracer or PayloadTracer()
+        self.capture = None
+
+    async def request(self, method: str, url: str, operation: str,
+                      idempotent: bool = False, **kwargs) -> Response:
+        """Sends the request and reads the whole response."""
+
+        # Requests are only kept while they may be traced or captured
+        observed = self.tracer.enabled or self.capture is not None
+        attempt = 0
+        while True:
+            self.breaker.before_request()
+            self.metrics.increment(COUNTER_REQUESTS)
+            if observed:
+                request = Request(method, url, operation, kwargs)
+                started = self.tracer.clock()
+            try:
+                response = await self._send(method, url, operation, **kwargs)
+            except asyncio.CancelledError:
+                # E.g. the losing read of a hedge, which says nothing about the cloud
+                self.breaker.record_cancelled()
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                error = str(err) or type(err).__name__
+                if observed:
+                    request.seconds = self.tracer.clock() - started
+                    self._observe(request, None, None, error)
+            else:
+                if observed:
+                    request.seconds = self.tracer.clock() - started
+                    response.request = request
+                    self._observe(request, response.status, response.body)
+                if response.status < 500 and response.status != 429:
+                    self.breaker.record_success()
+                    return response
+                # Throttled requests are retried after a backoff like server errors
+                error = f"server returned {response.status}"
+
+            self.breaker.record_failure()
+            self.metrics.increment(COUNTER_ERRORS)
+            if not idempotent or attempt >= self.retries or self.breaker.is_open:
+                _LOGGER.error("Error during communication with Salus: %s", error)
+                raise UpdateFailed(f"Error during communication with the API: {error}")
+
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            _LOGGER.debug("Request failed (%s), retrying in %.1f s...", error, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _observe(self, request: Request, status: int | None, body: bytes | None,
+                 error: str | None = None) -> None:
+        if self.capture is not None:
+            self.capture.record(request, status, body, error)
+        tracer = self.tracer
+        if not tracer.enabled:
+            return
+        if (tracer.errors and (error is not None or status >= 400)) or tracer.wants(request):
+            request.exchange = tracer.record(request, status, body, error)
+
+    async def _send(self, method: str, url: str, operation: str, **kwargs) -> Response:
+        timeout = aiohttp.ClientTimeout(total=self.timeouts[operation])
+        async with self._session().request(method, url, timeout=timeout, **kwargs) as response:
+            return Response(response.status, await response.read())
@@ -7,6 +7,8 @@ import re
 import json
 import aiohttp
 
+from collections.abc import Callable
+
 from homeassistant.components.climate.const import (
     HVACMode,
     HVACAction,
@@ -16,46 +18,77 @@ from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 
+from .client import AuthenticationError, CloudClient
 from .state import State
+from .transport import OPERATION_LOGIN, OPERATION_READ, OPERATION_WRITE
 
 MAX_TOKEN_AGE_SECONDS = 60 * 10
 
-URL_LOGIN = "https://salus-it500.com/public/login.php"
-URL_GET_TOKEN = "https://salus-it500.com/public/control.php"
-URL_GET_DATA = "https://salus-it500.com/public/ajax_device_values.php"
-URL_SET_DATA = "https://salus-it500.com/includes/set.php"
+BASE_URL = "https://salus-it500.com"
+URL_LOGIN = "/public/login.php"
+URL_GET_TOKEN = "/public/control.php"
+URL_GET_DATA = "/public/ajax_device_values.php"
+URL_SET_DATA = "/includes/set.php"
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class WebClient:
-    """Adapter around Salus IT500 web application."""
+def parse_response(status: int, body: str):
+    """Parses the JSON response, which is replaced by the login page once the session expires."""
+
+    if status in (401, 403):
+        raise AuthenticationError(f"Server rejected the session token ({status})")
+    try:
+        return json.loads(body)
+    except ValueError as err:
+        raise AuthenticationError(
+            f"Server did not return any data, the session is no longer valid: {err}")
+
+
+class WebClient(CloudClient):
+    """Adapter around Salus IT500 web application.
 
-    def __init__(self, username: str, password: str, device_id: str):
-        """Initialize the client."""
+    The web application keeps the login in a cookie, so the client should
+    own its session rather than share one with other integrations. A single
+    client serves all devices of the account.
+    """
+
+    writable_fields = frozenset(
+        ("target_temperature", "mode", "hot_water_enabled", "frost"))
+
+    def __init__(self, username: str, password: str,
+                 session: aiohttp.ClientSession | None = None,
+                 base_url: str = BASE_URL,
+                 clock: Callable[[], float] | None = None):
+        """Initialize the client.
+
+        The base URL can point to a stand-in of the Salus cloud, e.g. the emulator.
+        """
+        super().__init__(MAX_TOKEN_AGE_SECONDS, session, clock)
+        self._base_url = base_url
         self._username = username
         self._password = password
-        self._id = device_id
-        self._token = None
-        self._token_retrieved_at = None
+        self.tracer.add_credentials(username, password)
+        # The token is read from the control page of any of the devices
+        self._token_device_id = None
 
-    async def set_temperature(self, temperature: float) -> None:
+    async def set_temperature(self, device_id: str, temperature: float) -> None:
         """Set new target temperature, via URL commands."""
 
         _LOGGER.info("Setting the temperature to %.1f...", temperature)
 
         options = {"tempUnit": "0", "current_tempZ1_set": "1",
                    "current_tempZ1": temperature}
-        data = await self.set_data(options)
+        data = await self.set_data(device_id, options)
 
         if 'retCode' in data:
             _LOGGER.info("Sucessfully set temperature to %.1f", temperature)
         elif 'errorMsg' in data:
-            raise UpdateFailed(f"Server returned: {data["errorMsg"]}")
+            raise UpdateFailed(f"Server returned: {data['errorMsg']}")
         else:
             raise UpdateFailed("Server returned unknown error")
 
-    async def set_hvac_mode(self, hvac_mode: HVACMode) -> None:
+    async def set_hvac_mode(self, device_id: str, hvac_mode: HVACMode) -> None:
         """Set HVAC mode, via URL commands."""
 
         _LOGGER.info("Setting the HVAC mode to %s...", hvac_mode)
@@ -67,21 +100,21 @@ class WebClient:
             auto = "0"
 
         options = {"auto": auto, "auto_setZ1": "1"}
-        data = await self.set_data(options)
+        data = await self.set_data(device_id, options)
 
         if data == "1":
             _LOGGER.info("Sucessfully set the HVAC mode to %s", hvac_mode)
         else:
             raise UpdateFailed("Could not set the HVAC mode")
 
-    async def set_hot_water_mode(self, enabled: bool) -> None:
+    async def set_hot_water_mode(self, device_id: str, enabled: bool) -> None:
         """Set HVAC mode, via URL commands."""
 
         _LOGGER.info("Setting the hot water mode to %s...", str(enabled))
 
         options = {"hwmode_cont": "1"} if enabled else {"hwmode_off": "1"}
 
-        data = await self.set_data(options)
+        data = await self.set_data(device_id, options)
 
         if data == "2" or data == "3":
             _LOGGER.info(
@@ -89,7 +122,7 @@ class WebClient:
         else:
             raise UpdateFailed("Could not set the hot water mode")
 
-    async def set_freeze_protection_temperature(self, temperature: float) -> None:
+    async def set_freeze_protection_temperature(self, device_id: str, temperature: float) -> None:
         """Set freeze protection temperature."""
 
         _LOGGER.info(
@@ -98,7 +131,7 @@ class WebClient:
         options = {"tempUnit": "0", "frost_temp_set": "1",
                    "frost_temp": temperature}
 
-        data = await self.set_data(options)
+        data = await self.set_data(device_id, options)
 
         if temperature == float(data):
             _LOGGER.info(
@@ -107,31 +140,33 @@ class WebClient:
             raise UpdateFailed(
                 "Could not set the freeze protection temperature")
 
-    def set_temperature_offset(self, temperature: float) -> None:
+    def set_temperature_offset(self, device_id: str, temperature: float) -> None:
         raise NotImplementedError(
             "Web client does not support setting temperature offset")
     
-    def set_temperature_span(self, value: int) -> None:
+    def set_temperature_span(self, device_id: str, value: int) -> None:
         raise NotImplementedError(
             "Web client does not support setting temperature offset")
     
-    async def obtain_token(self, session: aiohttp.ClientSession) -> str:
-        """Gets the existing session token of the thermostat or retrieves a new one if expired."""
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        """Set several attributes, one request each as the web application cannot batch them."""
 
-        if self._token is None:
-            _LOGGER.info("Retrieving token for the first time this session...")
-            await self.get_token(session)
-            return self._token
+        setters = {
+            "target_temperature": self.set_temperature,
+            "mode": self.set_hvac_mode,
+            "hot_water_enabled": self.set_hot_water_mode,
+            "frost": self.set_freeze_protection_temperature,
+        }
 
-        if self._token_retrieved_at > time.time() - MAX_TOKEN_AGE_SECONDS:
-            _LOGGER.debug("Using cached token...")
-            return self._token
+        for field in changes:
+            if field not in self.writable_fields:
+                raise NotImplementedError(
+                    f"Web client does not support setting {field}")
 
-        _LOGGER.info("Token has expired, getting new one...")
-        await self.get_token(session)
-        return self._token
+        for field, value in changes.items():
+            await setters[field](device_id, value)
 
-    async def get_token(self, session: aiohttp.ClientSession) -> None:
+    async def get_token(self) -> str:
         """Get the Session Token of the Thermostat."""
 
         _LOGGER.info("Getting token from Salus Gateway...")
@@ -143,77 +178,65 @@ class WebClient:
             "keep_logged_in": "1"}
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        try:
-            await session.post(URL_LOGIN, data=payload, headers=headers)
-            params = {"devId": self._id}
-            token_response = await session.get(URL_GET_TOKEN, params=params)
-            body = await token_response.text()
+        await self.transport.request(
+            "POST", self._base_url + URL_LOGIN, OPERATION_LOGIN, idempotent=True, data=payload, headers=headers)
+        params = {"devId": self._token_device_id}
+        response = await self.transport.request(
+            "GET", self._base_url + URL_GET_TOKEN, OPERATION_LOGIN, idempotent=True, params=params)
+        with self.traced(response):
             result = re.search(
-                '<input id="token" type="hidden" value="(.*)" />', body)
-            _LOGGER.info("Sucessfully retrieved token")
-            self._token = result.group(1)
-            self._token_retrieved_at = time.time()
-        except Exception as err:
-            self._token = None
-            self._token_retrieved_at = None
-            _LOGGER.error("Error getting the session token: %s", str(err))
-
-    async def get_state(self) -> dict:
-        """Retrieves the raw state from the Salus gateway"""
+                '<input id="token" type="hidden" value="(.*)" />', response.text())
+            if result is None:
+                # The control page redirects to the login page when the login failed
+                raise AuthenticationError("Server did not return a session token, check the credentials")
+
+        _LOGGER.info("Sucessfully retrieved token")
+        return result.group(1)
 
-        _LOGGER.debug("Retrieving the device state...")
+    async def fetch_state(self, device_id: str) -> State:
+        """Retrieves the raw state from the Salus gateway"""
 
-        async with aiohttp.ClientSession() as session:
-            token = await self.obtain_token(session)
+        _LOGGER.debug("Retrieving the state of %s...", device_id)
 
-            params = {"devId": self._id, "token": token,
-                      "&_": str(int(round(time.time() * 1000)))}
-            try:
-                r = await session.get(url=URL_GET_DATA, params=params)
-                if not r:
-                    _LOGGER.error("Could not get the data")
-                    return None
-            except BaseException as err:
-                _LOGGER.error(
-                    "Error Getting the data from Salus. Check the connection to salus-it500.com.")
-                raise UpdateFailed(
-                    f"Error during communication with the API: {err}")
+        self._token_device_id = self._token_device_id or device_id
+        return await self.with_token(
+            lambda token: self._get_device_state(token, device_id))
 
-            body = await r.text()
-            _LOGGER.debug("Sucessfully retrieved the device state: %s", body)
-            data = json.loads(body)
+    async def _get_device_state(self, token: str, device_id: str) -> State:
+        params = {"devId": device_id, "token": token,
+                  "&_": str(int(round(time.time() * 1000)))}
+        response = await self.transport.request(
+            "GET", self._base_url + URL_GET_DATA, OPERATION_READ, idempotent=True, params=params)
 
-            return WebClient.convert_to_state(data)
+        with self.traced(response):
+            return self.decode_state(
+                device_id, response,
+                lambda response: WebClient.convert_to_state(parse_response(response.status, response.text())))
 
-    async def set_data(self, options: dict) -> dict:
+    async def set_data(self, device_id: str, options: dict) -> dict:
         """Send POST request with token"""
 
+        self._token_device_id = self._token_device_id or device_id
+        try:
+            return await self.with_token(
+                lambda token: self._set_device_values(token, device_id, options))
+        finally:
+            # Even a failed write may have been applied
+            self._reads.invalidate(device_id)
+
+    async def _set_device_values(self, token: str, device_id: str, options: dict) -> dict:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        async with aiohttp.ClientSession() as session:
-            token = await self.obtain_token(session)
-
-            payload = {
-                **options,
-                "token": token,
-                "devId": self._id}
-
-            try:
-                response = await session.post(URL_SET_DATA, data=payload, headers=headers)
-                if not response:
-                    _LOGGER.error("Could not get data from Salus.")
-                    return None
-            except BaseException as err:
-                _LOGGER.error(
-                    "Error during communication with Salus.")
-                raise UpdateFailed(
-                    f"Error during communication with the API: {err}")
-
-            body = await response.text()
-            _LOGGER.debug(
-                "Sucessfully retrieved response from action: %s", body)
-            data = json.loads(body)
-            return data
+        payload = {
+            **options,
+            "token": token,
+            "devId": device_id}
+
+        response = await self.transport.request(
+            "POST", self._base_url + URL_SET_DATA, OPERATION_WRITE, data=payload, headers=headers)
+
+        with self.traced(response):
+            return parse_response(response.status, response.text())
 
     @classmethod
     def convert_to_state(cls, data: dict) -> State:
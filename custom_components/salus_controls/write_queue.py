@@ -0,0 +1,95 @@
+"""
+Merges bursts of writes to the thermostat into a single request.
+"""
+import asyncio
+import logging
+
+from collections.abc import Awaitable, Callable
+
+DEFAULT_DEBOUNCE_SECONDS = 1.0
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    """Debounces the attribute writes of one device.
+
+    Changes queued within the debounce window of each other are merged, the
+    last value of each attribute winning, and written once the window
+    passes without new changes. Writes are sent one at a time, so they
+    reach the device in the order they were queued.
+    """
+
+    def __init__(self, write: Callable[..., Awaitable[None]],
+                 delay: float = DEFAULT_DEBOUNCE_SECONDS):
+        """Initialize the queue."""
+        self._write = write
+        self.delay = delay
+        self._pending = {}
+        self._pending_future = None
+        self._timer = None
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+
+    async def async_enqueue(self, debounce: bool = True, **changes) -> None:
+        """Queues the changes and waits until they are written.
+
+        Without debouncing, the changes are written immediately together
+        with everything still waiting in the queue.
+        """
+
+        loop = asyncio.get_running_loop()
+        self._pending.update(changes)
+        if self._pending_future is None:
+            self._pending_future = loop.create_future()
+            self._pending_future.add_done_callback(_consume_exception)
+        future = self._pending_future
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if debounce and self.delay > 0:
+            self._timer = loop.call_later(self.delay, self._flush)
+        else:
+            self._flush()
+
+        await asyncio.shield(future)
+
+    async def async_close(self) -> None:
+        """Writes the pending changes and waits for all writes to finish."""
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._flush()
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        self._timer = None
+        changes, future = self._pending, self._pending_future
+        self._pending, self._pending_future = {}, None
+
+        _LOGGER.debug("Writing queued changes %s", changes)
+        task = asyncio.get_running_loop().create_task(self._async_write(changes, future))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_write(self, changes: dict, future: asyncio.Future) -> None:
+        async with self._lock:
+            try:
+                await self._write(**changes)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as err:
+                future.set_exception(err)
+            else:
+                future.set_result(None)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    """Marks the error as retrieved in case every waiter was cancelled."""
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,26 @@
+"""
+Local stand-in of the Salus cloud for tests, benchmarks and load tests.
+
+The emulator serves the endpoints of both the mobile application API and
+the salus-it500.com web application, backed by simulated thermostats:
+
+    cloud = SalusCloud(Faults(latency=0.05, error_rate=0.01))
+    cloud.add_account("user@example.com", "secret")
+    cloud.add_device("user@example.com", "12345")
+    async with EmulatorServer(cloud) as server:
+        client = ApiClient("user@example.com", "secret", base_url=server.base_url)
+"""
+from .cloud import CloudError, Faults, SalusCloud, TokenError
+from .server import EmulatorServer, attributes_xml, create_app
+from .thermostat import Thermostat
+
+__all__ = [
+    "CloudError",
+    "EmulatorServer",
+    "Faults",
+    "SalusCloud",
+    "Thermostat",
+    "TokenError",
+    "attributes_xml",
+    "create_app",
+]
@@ -0,0 +1,49 @@
+"""Runs the Salus cloud emulator until interrupted."""
+import argparse
+import asyncio
+import logging
+
+from .cloud import Faults, SalusCloud
+from .server import EmulatorServer
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Serves the accounts and devices given on the command line."""
+    cloud = SalusCloud(Faults(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        token_lifetime=args.token_lifetime,
+        rate_limit=args.rate_limit))
+
+    for account in range(args.accounts):
+        username = f"user{account}@example.com"
+        cloud.add_account(username, args.password)
+        for device in range(args.devices):
+            cloud.add_device(username, f"{account}{device:04d}")
+
+    async with EmulatorServer(cloud, args.host, args.port) as server:
+        print(f"Serving {args.accounts} account(s) with {args.devices} device(s) each on {server.base_url}")
+        for username, account in cloud.accounts.items():
+            print(f"  {username} / {args.password}: {', '.join(account.devices)}")
+        await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("python -m emulator", description="Salus cloud emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=8080, type=int)
+    parser.add_argument("--accounts", default=1, type=int)
+    parser.add_argument("--devices", default=1, type=int, help="Devices per account")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--latency", default=0.0, type=float, help="Seconds added to every request")
+    parser.add_argument("--jitter", default=0.0, type=float, help="Random extra seconds per request")
+    parser.add_argument("--error-rate", default=0.0, type=float, help="Share of requests failing with 503")
+    parser.add_argument("--token-lifetime", default=3600.0, type=float, help="Seconds until a token expires")
+    parser.add_argument("--rate-limit", default=None, type=int, help="Requests per account and minute")
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.INFO)
+
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,148 @@
+"""
+State of the emulated Salus cloud: accounts, thermostats, tokens and faults.
+
+The cloud knows nothing about HTTP, the web application in `server.py`
+translates the requests of both Salus backends into calls of the cloud.
+"""
+import asyncio
+import collections
+import dataclasses
+import hashlib
+import random
+import secrets
+import time
+
+from collections.abc import Callable
+
+from .thermostat import Thermostat
+
+OPERATION_LOGIN = "login"
+OPERATION_READ = "read"
+OPERATION_WRITE = "write"
+
+
+@dataclasses.dataclass
+class Faults:
+    """Misbehaviour of the emulated cloud."""
+
+    # Seconds added to every request, plus a random share of the jitter
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Share of the requests answered with a server error
+    error_rate: float = 0.0
+    # Seconds after which a token is rejected
+    token_lifetime: float = 3600.0
+    # Requests an account may send within the rate window before being throttled
+    rate_limit: int | None = None
+    rate_window: float = 60.0
+
+
+class CloudError(Exception):
+    """The cloud refuses the request with the given HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        """Initialize the error."""
+        super().__init__(message)
+        self.status = status
+
+
+class TokenError(CloudError):
+    """The token is unknown or has expired."""
+
+    def __init__(self, message: str = "Invalid security token"):
+        """Initialize the error."""
+        super().__init__(401, message)
+
+
+@dataclasses.dataclass
+class Account:
+    """Salus account with its thermostats."""
+
+    username: str
+    password: str
+    devices: dict[str, Thermostat] = dataclasses.field(default_factory=dict)
+    requests: collections.deque = dataclasses.field(default_factory=collections.deque)
+
+
+class SalusCloud:
+    """Accounts and thermostats of the emulated cloud, shared by both backends."""
+
+    def __init__(self, faults: Faults | None = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 seed: int | None = None):
+        """Initialize the cloud."""
+        self.faults = faults or Faults()
+        self.clock = clock
+        self.accounts = {}
+        self._random = random.Random(seed)
+        self._tokens = {}
+        # Requests per operation, logins included
+        self.stats = collections.Counter()
+
+    def add_account(self, username: str, password: str) -> Account:
+        """Registers an account."""
+        account = Account(username, password)
+        self.accounts[username.lower()] = account
+        return account
+
+    def add_device(self, username: str, device_id: str, **kwargs) -> Thermostat:
+        """Adds a thermostat to the account, the arguments are passed to `Thermostat`."""
+        thermostat = Thermostat(self.clock, **kwargs)
+        self.accounts[username.lower()].devices[device_id] = thermostat
+        return thermostat
+
+    def device(self, account: Account, device_id: str) -> Thermostat:
+        """Returns the thermostat of the account."""
+        try:
+            return account.devices[device_id]
+        except KeyError:
+            raise CloudError(404, f"Device {device_id} not found") from None
+
+    async def login(self, username: str, password: str, hashed: bool = False) -> str:
+        """Checks the credentials and issues a new token.
+
+        The mobile application sends the MD5 hash of the password.
+        """
+        await self._async_handle(OPERATION_LOGIN)
+        account = self.accounts.get(username.lower())
+        expected = None if account is None else account.password
+        if hashed and expected is not None:
+            expected = hashlib.md5(expected.encode()).hexdigest()
+        if account is None or password != expected:
+            raise CloudError(401, "Invalid username or password")
+        self._throttle(account)
+
+        token = secrets.token_hex(16)
+        self._tokens[token] = (account, self.clock())
+        return token
+
+    async def authorize(self, operation: str, token: str | None) -> Account:
+        """Returns the account of the token, applying the faults of the request."""
+        await self._async_handle(operation)
+        account, issued_at = self._tokens.get(token, (None, None))
+        if account is None:
+            raise TokenError()
+        if self.clock() - issued_at >= self.faults.token_lifetime:
+            del self._tokens[token]
+            raise TokenError("Security token has expired")
+        self._throttle(account)
+        return account
+
+    async def _async_handle(self, operation: str) -> None:
+        self.stats[operation] += 1
+        delay = self.faults.latency + self._random.random() * self.faults.jitter
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.faults.error_rate:
+            raise CloudError(503, "Service unavailable")
+
+    def _throttle(self, account: Account) -> None:
+        if self.faults.rate_limit is None:
+            return
+        now = self.clock()
+        while account.requests and account.requests[0] <= now - self.faults.rate_window:
+            account.requests.popleft()
+        if len(account.requests) >= self.faults.rate_limit:
+            self.stats["throttled"] += 1
+            raise CloudError(429, "Too many requests")
+        account.requests.append(now)
@@ -0,0 +1,248 @@
+"""
+HTTP endpoints of the emulated Salus cloud.
+
+Serves the arrayent endpoints of the mobile application API and the
+salus-it500.com endpoints of the web application from one local server,
+so both clients can use its URL as their base URL.
+"""
+import logging
+import secrets
+
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+from .cloud import (
+    OPERATION_READ,
+    OPERATION_WRITE,
+    CloudError,
+    SalusCloud,
+    TokenError,
+)
+
+SESSION_COOKIE = "PHPSESSID"
+
+LOGIN_PAGE = "<html><body><form action=\"login.php\" method=\"post\"></form></body></html>"
+
+_LOGGER = logging.getLogger(__name__)
+
+_CLOUD = web.AppKey("cloud", SalusCloud)
+_SESSIONS = web.AppKey("sessions", dict)
+
+
+def create_app(cloud: SalusCloud) -> web.Application:
+    """Creates the web application serving the cloud."""
+    app = web.Application(middlewares=[_errors])
+    app[_CLOUD] = cloud
+    # Web application sessions, the username of each session cookie
+    app[_SESSIONS] = {}
+    app.router.add_post("/acc/applications/SalusService/sessions", api_login)
+    app.router.add_get("/zdk/services/zamapi/getDeviceAttributesWithValues", api_get_attributes)
+    app.router.add_put("/zdk/services/zamapi/setMultiDeviceAttributes2", api_set_attributes)
+    app.router.add_post("/public/login.php", web_login)
+    app.router.add_get("/public/control.php", web_control)
+    app.router.add_get("/public/ajax_device_values.php", web_get_values)
+    app.router.add_post("/includes/set.php", web_set_values)
+    return app
+
+
+class EmulatorServer:
+    """Runs the emulated cloud on a local port."""
+
+    def __init__(self, cloud: SalusCloud, host: str = "127.0.0.1", port: int = 0):
+        """Initialize the server, on a free port unless one is given."""
+        self.cloud = cloud
+        self._host = host
+        self._port = port
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        """Returns the base URL of both backends.
+
+        The URL uses the host name, as the web client's cookies are not
+        stored for IP addresses.
+        """
+        host = "localhost" if self._host == "127.0.0.1" else self._host
+        return f"http://{host}:{self._port}"
+
+    async def start(self) -> str:
+        """Starts serving and returns the base URL."""
+        self._runner = web.AppRunner(create_app(self.cloud), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        self._port = self._runner.addresses[0][1]
+        _LOGGER.info("Salus cloud emulator listening on %s", self.base_url)
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stops serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "EmulatorServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+
+@web.middleware
+async def _errors(request: web.Request, handler) -> web.StreamResponse:
+    try:
+        return await handler(request)
+    except CloudError as err:
+        return web.Response(status=err.status, text=str(err))
+
+
+async def api_login(request: web.Request) -> web.Response:
+    """Logs in to the mobile application API, the password is MD5 hashed."""
+    cloud = request.app[_CLOUD]
+    payload = await request.json()
+    token = await cloud.login(
+        payload.get("username", ""), payload.get("password", ""), hashed=True)
+    return web.json_response({"securityToken": token})
+
+
+async def api_get_attributes(request: web.Request) -> web.Response:
+    """Returns the attributes of a device as XML."""
+    cloud = request.app[_CLOUD]
+    try:
+        account = await cloud.authorize(OPERATION_READ, request.query.get("secToken"))
+        thermostat = cloud.device(account, request.query.get("devId"))
+    except TokenError as err:
+        return _xml_error(err)
+    except CloudError as err:
+        if err.status != 404:
+            raise
+        return _xml_error(err)
+
+    return _xml(attributes_xml(request.query["devId"], thermostat.attributes()))
+
+
+async def api_set_attributes(request: web.Request) -> web.Response:
+    """Sets the numbered name/value pairs of the form."""
+    cloud = request.app[_CLOUD]
+    form = await request.post()
+    try:
+        account = await cloud.authorize(OPERATION_WRITE, form.get("secToken"))
+        thermostat = cloud.device(account, form.get("devId"))
+    except TokenError as err:
+        return _xml_error(err)
+    except CloudError as err:
+        if err.status != 404:
+            raise
+        return _xml_error(err)
+
+    index = 1
+    try:
+        while f"name{index}" in form:
+            thermostat.write(form[f"name{index}"], form[f"value{index}"])
+            index += 1
+    except ValueError:
+        return _xml("<response><retCode>1</retCode></response>")
+    return _xml("<response><retCode>0</retCode></response>")
+
+
+async def web_login(request: web.Request) -> web.Response:
+    """Logs in to the web application, keeping the login in a session cookie."""
+    cloud = request.app[_CLOUD]
+    form = await request.post()
+    try:
+        await cloud.login(form.get("IDemail", ""), form.get("password", ""))
+    except CloudError as err:
+        if err.status != 401:
+            raise
+        return _html(LOGIN_PAGE)
+
+    session = secrets.token_hex(16)
+    request.app[_SESSIONS][session] = form["IDemail"]
+    response = _html("<html><body>Logged in</body></html>")
+    response.set_cookie(SESSION_COOKIE, session)
+    return response
+
+
+async def web_control(request: web.Request) -> web.Response:
+    """Shows the control page of a device with a fresh token, or the login page when logged out."""
+    cloud = request.app[_CLOUD]
+    username = request.app[_SESSIONS].get(request.cookies.get(SESSION_COOKIE))
+    if username is None:
+        return _html(LOGIN_PAGE)
+
+    account = cloud.accounts[username.lower()]
+    # The page hands out a token of the logged in session
+    token = await cloud.login(account.username, account.password)
+    return _html(
+        "<html><body>"
+        f"<input id=\"token\" type=\"hidden\" value=\"{token}\" />"
+        "</body></html>")
+
+
+async def web_get_values(request: web.Request) -> web.Response:
+    """Returns the values of a device as JSON, or the login page once the token expired."""
+    cloud = request.app[_CLOUD]
+    try:
+        account = await cloud.authorize(OPERATION_READ, request.query.get("token"))
+    except TokenError:
+        return _html(LOGIN_PAGE)
+
+    thermostat = cloud.device(account, request.query.get("devId"))
+    return web.json_response(thermostat.values())
+
+
+async def web_set_values(request: web.Request) -> web.Response:
+    """Applies one setting of the control page."""
+    cloud = request.app[_CLOUD]
+    form = await request.post()
+    try:
+        account = await cloud.authorize(OPERATION_WRITE, form.get("token"))
+    except TokenError:
+        return _html(LOGIN_PAGE)
+
+    thermostat = cloud.device(account, form.get("devId"))
+    try:
+        if "current_tempZ1_set" in form:
+            thermostat.write("A85", str(round(float(form["current_tempZ1"]) * 100)))
+            thermostat.write("A88", "1")
+            return web.json_response({"retCode": "0"})
+        if "auto_setZ1" in form:
+            thermostat.write("A89", "1" if form["auto"] == "1" else "0")
+            return web.json_response("1")
+        if "hwmode_cont" in form or "hwmode_off" in form:
+            mode = "2" if "hwmode_cont" in form else "3"
+            thermostat.write("C42", mode)
+            return web.json_response(mode)
+        if "frost_temp_set" in form:
+            thermostat.write("S09", str(round(float(form["frost_temp"]) * 100)))
+            return web.json_response(form["frost_temp"])
+    except ValueError as err:
+        return web.json_response({"errorMsg": str(err)})
+    return web.json_response({"errorMsg": "Unknown setting"})
+
+
+def attributes_xml(device_id: str, attributes: dict[str, str]) -> str:
+    """Returns the body of getDeviceAttributesWithValues, without the XML declaration."""
+    attribute_list = "".join(
+        f"<attrList><id>{index}</id><name>{name}</name><value>{value}</value></attrList>"
+        for index, (name, value) in enumerate(attributes.items(), start=1))
+    return (
+        "<ns1:getDeviceAttributesWithValuesResponse xmlns:ns1=\"http://zamapi.services.zdk.arrayent.com/\">"
+        f"<devList><devId>{escape(device_id)}</devId>{attribute_list}</devList>"
+        "</ns1:getDeviceAttributesWithValuesResponse>")
+
+
+def _xml(body: str) -> web.Response:
+    return web.Response(
+        text=f"<?xml version=\"1.0\" encoding=\"UTF-8\"?>{body}",
+        content_type="application/xml")
+
+
+def _xml_error(err: CloudError) -> web.Response:
+    return _xml(f"<response><errorMsg>{escape(str(err))}</errorMsg></response>")
+
+
+def _html(body: str) -> web.Response:
+    return web.Response(text=body, content_type="text/html")
@@ -0,0 +1,138 @@
+"""
+Simulated iT500 thermostat heating a room.
+"""
+import time
+
+from collections.abc import Callable
+
+# Hysteresis of each temperature span, the two narrowest are numbered the other way round
+SPAN_HYSTERESIS = {1: 0.25, 0: 0.5, 2: 1.0, 3: 1.5, 4: 2.0}
+
+TEMPERATURE_OFFSETS = [
+    -3.0, -2.5, -2.0, -1.5, -1.0, -0.5, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0]
+
+HOT_WATER_ON = "2"
+HOT_WATER_OFF = "3"
+
+# The room is integrated in steps short enough for the relay to switch in time
+STEP_SECONDS = 10
+
+
+class Thermostat:
+    """Room heated by a boiler the thermostat switches.
+
+    The room cools toward the outside temperature and warms while the relay
+    is on. The relay switches on once the measured temperature drops below
+    the target by the span's hysteresis and off once it exceeds the target
+    by the same amount. When the thermostat is off, it only keeps the room
+    above the freeze protection temperature.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 room_temperature: float = 19.0,
+                 target_temperature: float = 21.0,
+                 outside_temperature: float = 5.0,
+                 heating_rate: float = 3.0,
+                 loss_rate: float = 0.1):
+        """Initialize the thermostat.
+
+        The heating rate is in °C per hour, the loss rate is the share of the
+        difference to the outside temperature lost per hour.
+        """
+        self._clock = clock
+        self.room_temperature = room_temperature
+        self.target_temperature = target_temperature
+        self.outside_temperature = outside_temperature
+        self.heating_rate = heating_rate
+        self.loss_rate = loss_rate
+        self.frost = 5.0
+        self.off = False
+        self.hold = False
+        self.hot_water_mode = HOT_WATER_ON
+        self.span = 0
+        self.offset_index = TEMPERATURE_OFFSETS.index(0.0)
+        self.heating = False
+        self.relay_switches = 0
+        self._updated_at = clock()
+
+    @property
+    def measured_temperature(self) -> float:
+        """Returns the room temperature corrected by the offset."""
+        return self.room_temperature + TEMPERATURE_OFFSETS[self.offset_index]
+
+    def advance(self) -> None:
+        """Moves the room to the current time."""
+        now = self._clock()
+        while self._updated_at < now:
+            step = min(STEP_SECONDS, now - self._updated_at)
+            self._switch_relay()
+            gain = self.heating_rate * step / 3600 if self.heating else 0.0
+            loss = (self.room_temperature - self.outside_temperature) * self.loss_rate * step / 3600
+            self.room_temperature += gain - loss
+            self._updated_at += step
+
+    def attributes(self) -> dict[str, str]:
+        """Returns the raw attributes of the mobile application API."""
+        self.advance()
+        return {
+            "A84": str(round(self.measured_temperature * 100)),
+            "A85": str(round(self.target_temperature * 100)),
+            "A87": "1" if self.heating else "0",
+            "A88": "1" if self.hold else "0",
+            "A89": "1" if self.off else "0",
+            "C42": self.hot_water_mode,
+            "C45": "1" if self.hot_water_mode == HOT_WATER_ON else "0",
+            "S09": str(round(self.frost * 100)),
+            "S15": str(self.span),
+            "S17": str(self.offset_index),
+        }
+
+    def write(self, code: str, raw: str) -> None:
+        """Sets a raw attribute of the mobile application API."""
+        self.advance()
+        try:
+            self._write(code, raw)
+        except ValueError:
+            raise ValueError(f"Attribute {code} cannot be set to {raw}") from None
+
+    def _write(self, code: str, raw: str) -> None:
+        if code == "A85":
+            self.target_temperature = int(raw) / 100
+        elif code == "A88":
+            self.hold = raw == "1"
+        elif code == "A89":
+            self.off = raw == "1"
+        elif code == "C42" and raw in (HOT_WATER_ON, HOT_WATER_OFF):
+            self.hot_water_mode = raw
+        elif code == "S09":
+            self.frost = int(raw) / 100
+        elif code == "S15" and int(raw) in SPAN_HYSTERESIS:
+            self.span = int(raw)
+        elif code == "S17" and int(raw) in range(len(TEMPERATURE_OFFSETS)):
+            self.offset_index = int(raw)
+        else:
+            raise ValueError(f"Attribute {code} cannot be set to {raw}")
+
+    def values(self) -> dict[str, str]:
+        """Returns the values shown by the web application."""
+        self.advance()
+        return {
+            "CH1currentSetPoint": f"{self.target_temperature:.1f}",
+            "CH1currentRoomTemp": f"{self.measured_temperature:.1f}",
+            "frost": f"{self.frost:.1f}",
+            "CH1heatOnOffStatus": "1" if self.heating else "0",
+            "CH1heatOnOff": "1" if self.off else "0",
+            "HWonOffStatus": "1" if self.hot_water_mode == HOT_WATER_ON else "0",
+        }
+
+    def _switch_relay(self) -> None:
+        target = self.frost if self.off else self.target_temperature
+        hysteresis = SPAN_HYSTERESIS[self.span]
+        heating = self.heating
+        if self.measured_temperature < target - hysteresis:
+            heating = True
+        elif self.measured_temperature > target + hysteresis:
+            heating = False
+        if heating != self.heating:
+            self.heating = heating
+            self.relay_switches += 1
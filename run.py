@@ -1,59 +1,268 @@
-"""Exercises the Salus client as if it was run through Home Assistant"""
-
-# To run this script to test the component:
-# 1 Copy config.sample.py to config.py
-# 2 Replace the username/password/deviceid (don't worry, this file will be ignored by git)
-# 3 Run with `python run.py`
-
-import asyncio
-import logging
-
-import argparse
-
-from homeassistant.components.climate.const import HVACMode
-
-from salusfy import climate
-from tests.test_climate import MockHass
-from tests.config_adapter import ConfigAdapter
-from tests.entity_registry import EntityRegistry
-
-
-import config
-
-logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.DEBUG)
-
-
-async def main(set_temp: bool) -> None:
-    """Exercises the Salus client"""
-
-    registry = EntityRegistry()
-    config_adapter = ConfigAdapter(config)
-
-    await climate.async_setup_platform(
-        MockHass(), config_adapter, async_add_entities=registry.register, discovery_info=None)
-
-    thermostat = registry.first
-
-    await thermostat.async_update()
-    await thermostat.async_update()
-
-    if set_temp:
-        await thermostat.async_set_hvac_mode(HVACMode.HEAT)
-        await thermostat.async_set_temperature(temperature=9.8)
-
-    print("Current: " + str(thermostat.current_temperature))
-    print("Target: " + str(thermostat.target_temperature))
-    print("HVAC Action: " + thermostat.hvac_action)
-    print("HVAC Mode: " + thermostat.hvac_mode)
-
-
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser("Salus Client Simulator")
-    parser.add_argument("--set_temp", default=False, required=False,
-                        help="Determines whether to set the temp",
-                        type=bool)
-    args = parser.parse_args()
-
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(main(args.set_temp))
+"""Load test of the Salus clients and coordinator against the cloud emulator.
+
+Polls many thermostats of several accounts while writing random changes to
+them, through the same ApiClient/WebClient and SalusCoordinator code Home
+Assistant runs, then reports throughput, latency percentiles, logins and
+error rates.
+
+The emulator runs in this process unless the URL of one started with
+`python -m emulator` is given, which keeps its work off the measured loop:
+
+    python -m emulator --accounts 10 --devices 5 --latency 0.2
+    python run.py --url http://localhost:8080 --accounts 10 --devices 5
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import random
+import tempfile
+
+from homeassistant.components.climate.const import HVACMode
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fixtures import (
+    async_setup_entities,
+    create_client,
+    create_cloud,
+    device_ids_of,
+    trace_requests,
+    username_of,
+)
+from benchmarks.stats import summarize
+from custom_components.salus_controls import api_client, web_client
+from custom_components.salus_controls.attributes import (
+    TEMPERATURE_OFFSET_VALUES,
+    TEMPERATURE_SPAN_COUNT,
+)
+from custom_components.salus_controls.client import create_session
+from custom_components.salus_controls.const import (
+    BACKEND_API,
+    BACKEND_WEB,
+    FREEZE_PROTECTION_MAX_TEMP,
+    FREEZE_PROTECTION_MIN_TEMP,
+)
+from custom_components.salus_controls.coordinator import SalusCoordinator
+from emulator import EmulatorServer, Faults
+
+# Operation of each path the clients send requests to
+OPERATIONS = {
+    api_client.URL_LOGIN: "login",
+    api_client.URL_GET_DATA: "read",
+    api_client.URL_SET_DATA: "write",
+    web_client.URL_LOGIN: "login",
+    web_client.URL_GET_TOKEN: "login",
+    web_client.URL_GET_DATA: "read",
+    web_client.URL_SET_DATA: "write",
+}
+
+DEFAULT_WRITE_MIX = "target_temperature=6,mode=1,hot_water_enabled=1,frost=1"
+
+# Random values of the fields written
+VALUES = {
+    "target_temperature": lambda rng: rng.randint(30, 50) / 2,
+    "mode": lambda rng: rng.choice((HVACMode.HEAT, HVACMode.OFF)),
+    "hot_water_enabled": lambda rng: rng.choice((True, False)),
+    "frost": lambda rng: float(rng.randint(FREEZE_PROTECTION_MIN_TEMP, FREEZE_PROTECTION_MAX_TEMP)),
+    "temperature_offset": lambda rng: rng.choice(TEMPERATURE_OFFSET_VALUES),
+    "temperature_span": lambda rng: rng.randrange(TEMPERATURE_SPAN_COUNT),
+}
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LoadReport:
+    """Requests, polls and writes observed during the run."""
+
+    def __init__(self):
+        # Seconds of each request, poll and write
+        self.requests = collections.defaultdict(list)
+        self.polls = []
+        self.writes = []
+        self.request_errors = collections.Counter()
+        self.device_reads = 0
+        self.device_errors = 0
+        self.write_errors = collections.Counter()
+
+    def record_request(self, path: str, seconds: float, outcome: int | str) -> None:
+        """Records a request reported by the trace of a session."""
+        operation = OPERATIONS.get(path, path)
+        self.requests[operation].append(seconds)
+        if isinstance(outcome, str) or outcome >= 400:
+            self.request_errors[outcome] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        """Returns the throughput, latency in milliseconds and error rates."""
+        requests = [seconds for samples in self.requests.values() for seconds in samples]
+        errors = sum(self.request_errors.values())
+        return {
+            "seconds": round(elapsed, 3),
+            "requests": len(requests),
+            "requests_per_second": round(len(requests) / elapsed, 3),
+            "device_reads_per_second": round(self.device_reads / elapsed, 3),
+            "writes_per_second": round(len(self.writes) / elapsed, 3),
+            "logins": len(self.requests["login"]),
+            "latency": {
+                "request": summarize(requests),
+                **{operation: summarize(samples) for operation, samples in sorted(self.requests.items())},
+                "poll": summarize(self.polls),
+                "write": summarize(self.writes),
+            },
+            "errors": {
+                "request_rate": errors / len(requests) if requests else 0.0,
+                "device_read_rate": self.device_errors / self.device_reads if self.device_reads else 0.0,
+                "write_rate": (sum(self.write_errors.values()) / (len(self.writes) + sum(self.write_errors.values()))
+                               if self.writes or self.write_errors else 0.0),
+                "requests": dict(self.request_errors),
+                "writes": dict(self.write_errors),
+            },
+        }
+
+
+async def async_poll(hass, coordinator: SalusCoordinator, interval: float,
+                     end: float, report: LoadReport) -> None:
+    """Refreshes the coordinator every interval until the end."""
+    loop = hass.loop
+    # Accounts start polling spread over the first interval
+    await asyncio.sleep(random.uniform(0, interval))
+    while (started := loop.time()) < end:
+        await coordinator.async_refresh()
+        report.polls.append(loop.time() - started)
+        report.device_reads += len(coordinator.device_ids)
+        if not coordinator.last_update_success:
+            report.device_errors += len(coordinator.device_ids)
+        else:
+            report.device_errors += sum(state is None for state in coordinator.data.values())
+        await asyncio.sleep(max(0.0, started + interval - loop.time()))
+
+
+async def async_write(hass, coordinator: SalusCoordinator, device_id: str, rate: float,
+                      mix: dict[str, float], end: float, report: LoadReport) -> None:
+    """Writes random changes to the device, on average `rate` per second, until the end."""
+    loop = hass.loop
+    rng = random.Random()
+    fields = list(mix)
+    weights = list(mix.values())
+    while True:
+        delay = rng.expovariate(rate)
+        if loop.time() + delay >= end:
+            return
+        await asyncio.sleep(delay)
+        field = rng.choices(fields, weights)[0]
+        started = loop.time()
+        try:
+            await coordinator.async_set_attributes(device_id, **{field: VALUES[field](rng)})
+        except Exception as err:  # pylint: disable=broad-except
+            report.write_errors[type(err).__name__] += 1
+            _LOGGER.debug("Could not write %s of %s: %s", field, device_id, err)
+        else:
+            report.writes.append(loop.time() - started)
+
+
+async def main(args: argparse.Namespace) -> dict:
+    """Runs the load against the emulator and returns the report."""
+    report = LoadReport()
+    write_rate = args.writes_per_hour / 3600
+
+    async with contextlib.AsyncExitStack() as stack:
+        config_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        hass = HomeAssistant(config_dir)
+        stack.push_async_callback(hass.async_stop, force=True)
+
+        base_url = args.url
+        if base_url is None:
+            cloud = create_cloud(args.accounts, args.devices, Faults(
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                token_lifetime=args.token_lifetime,
+                rate_limit=args.rate_limit))
+            server = await stack.enter_async_context(EmulatorServer(cloud))
+            base_url = server.base_url
+
+        trace_config = trace_requests(hass.loop.time, report.record_request)
+        coordinators = []
+        for account in range(args.accounts):
+            # The web client keeps its login in a cookie of its session
+            session = create_session(trace_configs=[trace_config])
+            stack.push_async_callback(session.close)
+            client = create_client(args.backend, username_of(account), base_url, session=session)
+            stack.push_async_callback(client.close)
+            coordinator = SalusCoordinator(hass, client, device_ids_of(account, args.devices))
+            stack.push_async_callback(coordinator.async_shutdown)
+            await async_setup_entities(hass, coordinator)
+            coordinators.append(coordinator)
+
+        started = hass.loop.time()
+        end = started + args.duration
+        tasks = [async_poll(hass, coordinator, args.poll_interval, end, report)
+                 for coordinator in coordinators]
+        if write_rate > 0:
+            tasks.extend(
+                async_write(hass, coordinator, device_id, write_rate, {
+                    field: weight for field, weight in args.write_mix.items()
+                    if field in coordinator.get_client.writable_fields}, end, report)
+                for coordinator in coordinators
+                for device_id in coordinator.device_ids)
+        await asyncio.gather(*tasks)
+        return report.summary(hass.loop.time() - started)
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parses the weights of the written fields, e.g. `target_temperature=6,mode=1`."""
+    weights = {}
+    for item in mix.split(","):
+        field, _, weight = item.partition("=")
+        if field not in VALUES:
+            raise argparse.ArgumentTypeError(
+                f"Unknown field {field}, expected one of {', '.join(VALUES)}")
+        weights[field] = float(weight or 1)
+    return weights
+
+
+def print_report(summary: dict) -> None:
+    """Prints the report for people."""
+    print(f"{summary['requests']} requests in {summary['seconds']:.1f} s: "
+          f"{summary['requests_per_second']:.1f} requests/s, "
+          f"{summary['device_reads_per_second']:.1f} device reads/s, "
+          f"{summary['writes_per_second']:.2f} writes/s, {summary['logins']} logins")
+    print(f"{'latency (ms)':<14}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, latency in summary["latency"].items():
+        if latency["count"]:
+            print(f"{name:<14}{latency['count']:>8}{latency['p50']:>10.1f}"
+                  f"{latency['p95']:>10.1f}{latency['p99']:>10.1f}")
+    errors = summary["errors"]
+    print(f"errors: {errors['request_rate']:.2%} of requests, "
+          f"{errors['device_read_rate']:.2%} of device reads, {errors['write_rate']:.2%} of writes")
+    for kind in ("requests", "writes"):
+        for error, count in errors[kind].items():
+            print(f"  {kind[:-1]} {error}: {count}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("run.py", description="Salus Controls load test")
+    parser.add_argument("--url", help="Base URL of a running emulator, one is started in-process otherwise")
+    parser.add_argument("--backend", default=BACKEND_API, choices=(BACKEND_API, BACKEND_WEB))
+    parser.add_argument("--accounts", default=1, type=int)
+    parser.add_argument("--devices", default=10, type=int, help="Devices per account")
+    parser.add_argument("--duration", default=60.0, type=float, help="Seconds to run")
+    parser.add_argument("--poll-interval", default=10.0, type=float, help="Seconds between polls of an account")
+    parser.add_argument("--writes-per-hour", default=60.0, type=float, help="Average writes per device and hour")
+    parser.add_argument("--write-mix", default=DEFAULT_WRITE_MIX, type=parse_mix,
+                        help="Weights of the written fields, unsupported ones are skipped")
+    parser.add_argument("--latency", default=0.05, type=float, help="Seconds added to every request")
+    parser.add_argument("--jitter", default=0.05, type=float, help="Random extra seconds per request")
+    parser.add_argument("--error-rate", default=0.0, type=float, help="Share of requests failing with 503")
+    parser.add_argument("--token-lifetime", default=3600.0, type=float, help="Seconds until a token expires")
+    parser.add_argument("--rate-limit", default=None, type=int, help="Requests per account and minute")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    arguments = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.ERROR)
+
+    result = asyncio.run(main(arguments))
+    if arguments.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
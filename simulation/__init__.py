@@ -0,0 +1,13 @@
+"""
+Long-horizon simulations of the integration on a virtual clock.
+
+Run with `python -m simulation`, a simulated day takes a few seconds.
+"""
+from .harness import Scenario, Simulation
+from .loop import VirtualClockLoop
+
+__all__ = [
+    "Scenario",
+    "Simulation",
+    "VirtualClockLoop",
+]
@@ -0,0 +1,57 @@
+"""Simulates the integration for hours of virtual time and reports how it behaved."""
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.salus_controls.const import BACKEND_API, BACKEND_WEB
+from emulator import Faults
+
+from .harness import Scenario, Simulation
+from .loop import VirtualClockLoop
+
+
+async def main(scenario: Scenario) -> dict:
+    """Runs the scenario with a Home Assistant instance of its own."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        try:
+            return await Simulation(hass, scenario).async_run()
+        finally:
+            await hass.async_stop(force=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("python -m simulation", description="Salus Controls simulation")
+    parser.add_argument("--backend", default=BACKEND_API, choices=(BACKEND_API, BACKEND_WEB))
+    parser.add_argument("--accounts", default=1, type=int)
+    parser.add_argument("--devices", default=2, type=int, help="Devices per account")
+    parser.add_argument("--hours", default=24.0, type=float, help="Simulated hours")
+    parser.add_argument("--setpoint-changes", default=4, type=int, help="Setpoint changes per device and day")
+    parser.add_argument("--latency", default=0.3, type=float, help="Seconds added to every request")
+    parser.add_argument("--jitter", default=0.2, type=float, help="Random extra seconds per request")
+    parser.add_argument("--error-rate", default=0.01, type=float, help="Share of requests failing with 503")
+    parser.add_argument("--token-lifetime", default=3600.0, type=float, help="Seconds until a token expires")
+    parser.add_argument("--rate-limit", default=None, type=int, help="Requests per account and minute")
+    parser.add_argument("--seed", default=None, type=int)
+    args = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s: %(message)s', level=logging.ERROR)
+
+    scenario = Scenario(
+        backend=args.backend,
+        accounts=args.accounts,
+        devices=args.devices,
+        hours=args.hours,
+        setpoint_changes=args.setpoint_changes,
+        faults=Faults(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            token_lifetime=args.token_lifetime,
+            rate_limit=args.rate_limit),
+        seed=args.seed)
+    with asyncio.Runner(loop_factory=VirtualClockLoop) as runner:
+        print(json.dumps(runner.run(main(scenario)), indent=2))
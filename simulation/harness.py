@@ -0,0 +1,200 @@
+"""
+Runs the integration against simulated thermostats for hours of virtual time.
+"""
+import asyncio
+import collections
+import dataclasses
+import random
+import time
+
+from homeassistant.components.climate.const import ATTR_HVAC_ACTION, HVACAction
+from homeassistant.const import ATTR_TEMPERATURE
+
+from benchmarks.fixtures import async_setup_entities, create_client, create_cloud, trace_requests
+from benchmarks.stats import summarize
+from custom_components.salus_controls.climate import ThermostatEntity
+from custom_components.salus_controls.client import create_session
+from custom_components.salus_controls.const import BACKEND_API
+from custom_components.salus_controls.coordinator import SalusCoordinator
+from emulator import EmulatorServer, Faults
+
+# Setpoints the simulated user alternates between
+SETPOINTS = (21.0, 18.0)
+
+
+@dataclasses.dataclass
+class Scenario:
+    """What is simulated and for how long."""
+
+    backend: str = BACKEND_API
+    accounts: int = 1
+    devices: int = 2
+    hours: float = 24.0
+    # Setpoint changes per device and day, made through the climate entity
+    setpoint_changes: int = 4
+    # Seconds between comparisons of the shown states with the thermostats
+    sample_interval: float = 5.0
+    faults: Faults = dataclasses.field(default_factory=Faults)
+    seed: int | None = None
+
+
+class _Lag:
+    """Tracks how long a shown value differs from the thermostat's."""
+
+    def __init__(self):
+        self.lags = []
+        self.samples = 0
+        self.stale_samples = 0
+        self._since = None
+
+    def sample(self, now: float, shown, actual) -> None:
+        self.samples += 1
+        if shown == actual:
+            if self._since is not None:
+                self.lags.append(now - self._since)
+                self._since = None
+            return
+        self.stale_samples += 1
+        if self._since is None:
+            self._since = now
+
+
+class Simulation:
+    """Drives the coordinators, clients and entities of every account on a virtual clock.
+
+    Must run on a `VirtualClockLoop`, the emulated cloud and thermostats
+    share its clock, so a simulated day passes in seconds.
+    """
+
+    def __init__(self, hass, scenario: Scenario):
+        """Initialize the simulation."""
+        self.hass = hass
+        self.scenario = scenario
+        self._loop = hass.loop
+        self._random = random.Random(scenario.seed)
+        self.cloud = create_cloud(
+            scenario.accounts, scenario.devices, scenario.faults,
+            clock=self._loop.time, seed=scenario.seed)
+        for account in self.cloud.accounts.values():
+            for thermostat in account.devices.values():
+                thermostat.room_temperature = self._random.uniform(16.0, 21.0)
+        # Seconds each request took, by the path of its URL
+        self.latencies = collections.defaultdict(list)
+        self.request_errors = collections.Counter()
+        self._lags = collections.defaultdict(_Lag)
+        self._writes = set()
+        self.write_errors = collections.Counter()
+
+    async def async_run(self) -> dict:
+        """Runs the scenario and returns its report."""
+        started = time.perf_counter()
+        async with EmulatorServer(self.cloud) as server:
+            trace_config = trace_requests(self._loop.time, self._record_request)
+            coordinators = []
+            thermostats = []
+            for username, account in self.cloud.accounts.items():
+                # The web client keeps its login in a cookie of its session
+                session = create_session(trace_configs=[trace_config])
+                client = create_client(
+                    self.scenario.backend, username, server.base_url,
+                    session=session, clock=self._loop.time)
+                coordinator = SalusCoordinator(self.hass, client, list(account.devices))
+                await coordinator.async_refresh()
+                # Subscribed entities make the coordinator poll on its own
+                entities = await async_setup_entities(self.hass, coordinator)
+                coordinators.append(coordinator)
+                # One climate entity per device, in the order of the devices
+                climates = [entity for entity in entities if isinstance(entity, ThermostatEntity)]
+                thermostats.extend(
+                    (entity, account.devices[device_id])
+                    for entity, device_id in zip(climates, coordinator.device_ids))
+
+            simulated = await self._async_observe(thermostats)
+
+            await asyncio.gather(*self._writes, return_exceptions=True)
+            for coordinator in coordinators:
+                await coordinator.async_shutdown()
+                client = coordinator.get_client
+                await client.close()
+                await client.session.close()
+
+        return self._report(simulated, time.perf_counter() - started, thermostats)
+
+    async def _async_observe(self, thermostats: list) -> float:
+        """Samples the shown states and changes setpoints until the scenario ends."""
+        scenario = self.scenario
+        start = self._loop.time()
+        end = start + scenario.hours * 3600
+        change_interval = (
+            86400 / scenario.setpoint_changes if scenario.setpoint_changes else None)
+        next_change = start + change_interval if change_interval else end
+        changes = 0
+
+        while (now := self._loop.time()) < end:
+            if now >= next_change:
+                setpoint = SETPOINTS[changes % len(SETPOINTS)]
+                for entity, _ in thermostats:
+                    self._write(entity.async_set_temperature(temperature=setpoint))
+                changes += 1
+                next_change += change_interval
+
+            for entity, thermostat in thermostats:
+                thermostat.advance()
+                state = self.hass.states.get(entity.entity_id)
+                attributes = state.attributes if state is not None else {}
+                heating = attributes.get(ATTR_HVAC_ACTION) == HVACAction.HEATING
+                self._lags[(entity.entity_id, ATTR_HVAC_ACTION)].sample(
+                    now, heating, thermostat.heating)
+                self._lags[(entity.entity_id, ATTR_TEMPERATURE)].sample(
+                    now, attributes.get(ATTR_TEMPERATURE), thermostat.target_temperature)
+
+            await asyncio.sleep(scenario.sample_interval)
+        return self._loop.time() - start
+
+    def _write(self, write) -> None:
+        task = self._loop.create_task(write)
+        self._writes.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task: asyncio.Task) -> None:
+        self._writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.write_errors[type(task.exception()).__name__] += 1
+
+    def _record_request(self, path: str, seconds: float, outcome: int | str) -> None:
+        if isinstance(outcome, str) or outcome >= 400:
+            self.request_errors[outcome] += 1
+        if not isinstance(outcome, str):
+            self.latencies[path].append(seconds)
+
+    def _report(self, simulated: float, elapsed: float, thermostats: list) -> dict:
+        stats = self.cloud.stats
+        hours = simulated / 3600
+        devices = len(thermostats)
+        requests = sum(len(latencies) for latencies in self.latencies.values())
+
+        staleness = {}
+        for field in (ATTR_HVAC_ACTION, ATTR_TEMPERATURE):
+            lags = [lag for (_, name), lag in self._lags.items() if name == field]
+            samples = sum(lag.samples for lag in lags)
+            staleness[field] = {
+                # Seconds from a change of the thermostat until it was shown
+                "lag": summarize([value for lag in lags for value in lag.lags], 1.0),
+                "stale_share": sum(lag.stale_samples for lag in lags) / samples if samples else 0.0,
+            }
+
+        return {
+            "simulated_hours": round(hours, 3),
+            "wall_seconds": round(elapsed, 3),
+            "devices": devices,
+            "requests": requests,
+            "requests_per_device_hour": round(requests / devices / hours, 3),
+            "cloud": dict(stats),
+            "logins": stats["login"],
+            "request_errors": dict(self.request_errors),
+            "write_errors": dict(self.write_errors),
+            "relay_switches": sum(thermostat.relay_switches for _, thermostat in thermostats),
+            "staleness": staleness,
+            # Milliseconds per request, by the path of its URL
+            "latency": {path: summarize(samples) for path, samples in sorted(self.latencies.items())},
+        }
@@ -0,0 +1,71 @@
+"""
+Event loop whose clock jumps ahead instead of waiting.
+"""
+import asyncio
+import selectors
+import time
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Selector advancing the clock of its loop by the time it would wait."""
+
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    def select(self, timeout: float | None = None):
+        # Sockets between the clients and an emulator in the same process
+        # are readable as soon as the peer wrote to them
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if self.loop.executor_jobs:
+            # Wait for the worker thread, e.g. resolving a host name, in real time
+            events = super().select(timeout)
+            if events:
+                return events
+        elif timeout is None:
+            return super().select(None)
+        self.loop.advance(timeout)
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop running on a virtual clock.
+
+    Whenever nothing is ready to run, the clock jumps to the next scheduled
+    callback, so sleeps, timeouts and polling intervals take no real time.
+    Network I/O stays real and must only reach servers in the same process,
+    whose responses are there by the time the loop looks for them. Jobs of
+    the executor are waited for in real time.
+    """
+
+    def __init__(self, start: float | None = None):
+        """Initialize the loop, its clock starting where the real loop's would unless given.
+
+        Times as large as the wall clock's would lose the precision the
+        loop needs to tell a callback is due.
+        """
+        selector = _VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self._now = time.monotonic() if start is None else start
+        self.executor_jobs = 0
+
+    def time(self) -> float:
+        """Returns the virtual time."""
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        """Moves the clock forward."""
+        self._now += seconds
+
+    def run_in_executor(self, executor, func, *args) -> asyncio.Future:
+        """Runs the function in the executor, keeping the clock still until it returns."""
+        future = super().run_in_executor(executor, func, *args)
+        self.executor_jobs += 1
+        future.add_done_callback(self._executor_job_done)
+        return future
+
+    def _executor_job_done(self, _future: asyncio.Future) -> None:
+        self.executor_jobs -= 1
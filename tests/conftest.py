@@ -0,0 +1,120 @@
+"""Fixtures for the Salus Controls tests."""
+import dataclasses
+from collections.abc import Iterable
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.components.climate.const import HVACAction, HVACMode
+from homeassistant.const import CONF_DEVICES, CONF_PASSWORD, CONF_USERNAME
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.salus_controls.client import SalusClient
+from custom_components.salus_controls.const import BACKEND_API, CONF_BACKENDS, DOMAIN
+from custom_components.salus_controls.metrics import Metrics
+from custom_components.salus_controls.state import State
+from custom_components.salus_controls.trace import PayloadTracer
+from emulator import EmulatorServer, Faults, SalusCloud
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Loads the integration from custom_components."""
+    yield
+
+
+def make_state(**fields) -> State:
+    """Returns a heating thermostat with the fields overridden."""
+    defaults = dict(current_temperature=20.0, target_temperature=21.0, frost=5.0,
+                    action=HVACAction.HEATING, mode=HVACMode.HEAT, hot_water_enabled=True,
+                    temperature_span=0, temperature_offset=0.0)
+    return State(**{**defaults, **fields})
+
+
+class FakeClient(SalusClient):
+    """Keeps the state of the devices in memory and counts the requests."""
+
+    writable_fields = frozenset(("target_temperature", "mode", "frost", "hot_water_enabled"))
+
+    def __init__(self, device_ids=("1",)):
+        self.states = {device_id: make_state() for device_id in device_ids}
+        self.reads = []
+        self.writes = []
+        self.closed = False
+        self.settings = {}
+        self._metrics = Metrics()
+        self._tracer = PayloadTracer()
+        self._token = (None, None)
+
+    @property
+    def metrics(self) -> Metrics:
+        return self._metrics
+
+    @property
+    def tracer(self) -> PayloadTracer:
+        return self._tracer
+
+    @property
+    def retry_after(self) -> float | None:
+        return None
+
+    @property
+    def token(self) -> tuple[str | None, float | None]:
+        return self._token
+
+    def restore_token(self, token: str, retrieved_at: float) -> None:
+        self._token = (token, retrieved_at)
+
+    def configure(self, timeouts: dict | None = None, retries: int | None = None,
+                  token_max_age: float | None = None, freshness: float | None = None,
+                  trace_errors: bool | None = None, trace_sample_rate: float | None = None,
+                  trace_devices: Iterable[str] | None = None) -> None:
+        self.settings = {"timeouts": timeouts, "retries": retries, "token_max_age": token_max_age,
+                         "freshness": freshness}
+
+    async def get_state(self, device_id: str) -> State:
+        self.reads.append(device_id)
+        return dataclasses.replace(self.states[device_id])
+
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        self.writes.append((device_id, changes))
+        for field, value in changes.items():
+            setattr(self.states[device_id], field, value)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def client() -> FakeClient:
+    """Returns a client of two thermostats."""
+    return FakeClient(("1", "2"))
+
+
+async def async_setup_entry(hass, client: FakeClient, **data) -> MockConfigEntry:
+    """Sets up an entry of the devices of the client, talking to the client."""
+    entry = MockConfigEntry(domain=DOMAIN, version=2, minor_version=2, data={
+        CONF_USERNAME: "me@example.com", CONF_PASSWORD: "secret",
+        CONF_DEVICES: list(client.states), CONF_BACKENDS: [BACKEND_API], **data})
+    entry.add_to_hass(hass)
+    with patch("custom_components.salus_controls.create_client_from", return_value=client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+@pytest.fixture
+def cloud() -> SalusCloud:
+    """Returns an emulated cloud with an account of two thermostats."""
+    cloud = SalusCloud(Faults(), seed=0)
+    cloud.add_account("me@example.com", "secret")
+    for device_id in ("1", "2"):
+        cloud.add_device("me@example.com", device_id)
+    return cloud
+
+
+@pytest.fixture
+async def emulator(cloud: SalusCloud, socket_enabled):
+    """Serves the cloud locally, yielding its base URL."""
+    async with EmulatorServer(cloud) as server:
+        yield server.base_url
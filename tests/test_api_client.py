@@ -0,0 +1,156 @@
+"""Tests of the client of the mobile application API."""
+import pytest
+
+from homeassistant.components.climate.const import HVACAction, HVACMode
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.api_client import ApiClient, DeviceAttributesResponse
+
+LOGIN_BODY = '{"securityToken": "token"}'
+
+
+class FakeResponse:
+    """Response of the fake session."""
+
+    def __init__(self, status: int, body: str):
+        self.status = status
+        self._body = body
+
+    async def text(self) -> str:
+        return self._body
+
+    async def read(self) -> bytes:
+        return self._body.encode()
+
+    async def __aenter__(self) -> "FakeResponse":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+class FakeSession:
+    """Records the requests and answers them with the queued bodies."""
+
+    closed = False
+
+    def __init__(self, *bodies: str):
+        self.bodies = list(bodies)
+        self.requests = []
+
+    def request(self, method: str, url: str, **kwargs) -> FakeResponse:
+        self.requests.append((method, url, kwargs))
+        return FakeResponse(200, self.bodies.pop(0))
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> FakeResponse:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> FakeResponse:
+        return self.request("PUT", url, **kwargs)
+
+
+def ret_code(code: int) -> str:
+    return f"<response><retCode>{code}</retCode></response>"
+
+
+async def test_set_attributes_sends_one_batched_request():
+    session = FakeSession(LOGIN_BODY, ret_code(0))
+    client = ApiClient("me@example.com", "secret", session=session)
+
+    await client.set_attributes("1", target_temperature=21.5, mode=HVACMode.HEAT, hot_water_enabled=False)
+
+    _, (method, _, write) = session.requests
+    assert method == "PUT"
+    assert write["data"] == {
+        "name1": "A88", "value1": "1",
+        "name2": "A85", "value2": 2150,
+        "name3": "A89", "value3": "0",
+        "name4": "C42", "value4": "3",
+        "secToken": "token", "devId": "1"}
+
+
+async def test_set_attributes_fails_on_return_code():
+    session = FakeSession(LOGIN_BODY, ret_code(7))
+    client = ApiClient("me@example.com", "secret", session=session)
+
+    with pytest.raises(UpdateFailed, match="returned 7"):
+        await client.set_attributes("1", target_temperature=21.5, frost=5.0)
+    assert len(session.requests) == 2
+
+
+async def test_set_attributes_validates_before_sending():
+    session = FakeSession()
+    client = ApiClient("me@example.com", "secret", session=session)
+
+    with pytest.raises(ValueError):
+        await client.set_attributes("1", target_temperature=99.0)
+    assert session.requests == []
+
+
+ATTRIBUTES = {"A84": "2010", "A85": "2150", "A87": "1", "A89": "0", "S09": "500",
+              "C45": "1", "S15": "2", "S17": "7"}
+
+
+def attributes_body(**overrides) -> str:
+    values = {**ATTRIBUTES, **overrides}
+    return "<response>" + "".join(
+        f"<attrList><name>{name}</name><value>{value}</value></attrList>"
+        for name, value in values.items() if value is not None) + "</response>"
+
+
+def test_convert_to_state_decodes_the_attributes():
+    state = ApiClient.convert_to_state(DeviceAttributesResponse(attributes_body()))
+
+    assert state.current_temperature == pytest.approx(20.1)
+    assert state.target_temperature == pytest.approx(21.5)
+    assert state.frost == pytest.approx(5.0)
+    assert state.action == HVACAction.HEATING
+    assert state.mode == HVACMode.HEAT
+    assert state.hot_water_enabled is True
+    assert state.temperature_span == 2
+    assert state.temperature_offset == 0.5
+
+
+def test_missing_attribute_fails_naming_it():
+    response = DeviceAttributesResponse(attributes_body(A85=None))
+
+    with pytest.raises(UpdateFailed, match="does not contain attribute A85"):
+        ApiClient.convert_to_state(response)
+
+
+def test_unknown_temperature_span_is_left_unknown():
+    state = ApiClient.convert_to_state(DeviceAttributesResponse(attributes_body(S15="9")))
+
+    assert state.temperature_span is None
+    assert state.target_temperature == pytest.approx(21.5)
+
+
+async def test_identical_response_returns_the_same_state():
+    session = FakeSession(LOGIN_BODY, attributes_body(), attributes_body(), attributes_body(A84="2050"))
+    client = ApiClient("me@example.com", "secret", session=session)
+
+    first = await client.fetch_state("1")
+    second = await client.fetch_state("1")
+    changed = await client.fetch_state("1")
+
+    assert second is first
+    assert changed is not first
+    assert changed.current_temperature == pytest.approx(20.5)
+    assert changed.diff(first) == {"current_temperature"}
+
+
+async def test_set_attributes_changes_the_emulated_thermostat(cloud, emulator):
+    client = ApiClient("me@example.com", "secret", base_url=emulator)
+
+    await client.set_attributes("1", target_temperature=23.5, hot_water_enabled=False, temperature_span=3)
+
+    assert cloud.stats["write"] == 1
+    thermostat = cloud.accounts["me@example.com"].devices["1"]
+    assert (thermostat.target_temperature, thermostat.hold) == (23.5, True)
+    assert (thermostat.hot_water_mode, thermostat.span) == ("3", 3)
+    state = await client.fetch_state("1")
+    assert (state.target_temperature, state.hot_water_enabled, state.temperature_span) == (23.5, False, 3)
+    await client.close()
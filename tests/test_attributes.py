@@ -0,0 +1,124 @@
+"""Tests of the attribute registry."""
+import pytest
+
+from homeassistant.components.climate.const import HVACAction, HVACMode
+from homeassistant.const import Platform
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.attributes import (
+    ATTRIBUTES,
+    TEMPERATURE_OFFSET_VALUES,
+    decode_attributes,
+    encode_attributes,
+    entity_attributes,
+)
+
+from .conftest import make_state
+
+# Raw values read of each field and the value they decode to
+DECODED = {
+    "current_temperature": ("2010", 20.1),
+    "target_temperature": ("2150", 21.5),
+    "action": ("1", HVACAction.HEATING),
+    "mode": ("1", HVACMode.OFF),
+    "hot_water_enabled": ("0", False),
+    "frost": ("500", 5.0),
+    "temperature_span": ("2", 2),
+    "temperature_offset": ("7", 0.5),
+}
+
+# Values written of each writable field and the raw attributes they encode to
+ENCODED = {
+    "target_temperature": (21.5, {"A88": "1", "A85": 2150}),
+    "mode": (HVACMode.OFF, {"A89": "1"}),
+    "hot_water_enabled": (False, {"C42": "3"}),
+    "frost": (7.5, {"S09": 750}),
+    "temperature_span": (4, {"S15": "4"}),
+    "temperature_offset": (-3.0, {"S17": "0"}),
+}
+
+
+def test_entity_attributes_by_platform():
+    assert [attribute.field for attribute in entity_attributes(Platform.SWITCH)] == [
+        "hot_water_enabled"]
+    assert [attribute.field for attribute in entity_attributes(Platform.NUMBER)] == [
+        "frost", "temperature_offset"]
+    assert [attribute.field for attribute in entity_attributes(Platform.SELECT)] == [
+        "temperature_span"]
+    assert entity_attributes(Platform.CLIMATE) == []
+
+
+def test_every_attribute_is_covered():
+    assert {attribute.field for attribute in ATTRIBUTES} == set(DECODED)
+    assert {attribute.field for attribute in ATTRIBUTES if attribute.writable} == set(ENCODED)
+
+
+@pytest.mark.parametrize("attribute", ATTRIBUTES, ids=lambda attribute: attribute.field)
+def test_decode(attribute):
+    raw, value = DECODED[attribute.field]
+
+    assert attribute.decode(raw) == pytest.approx(value)
+
+
+@pytest.mark.parametrize(
+    "attribute", [attribute for attribute in ATTRIBUTES if attribute.writable],
+    ids=lambda attribute: attribute.field)
+def test_encode_round_trip(attribute):
+    value, raw = ENCODED[attribute.field]
+
+    assert attribute.encode(value) == raw
+    # Read back, the written code holds the raw value unless writing goes
+    # through another code
+    if attribute.write_code is None:
+        assert attribute.decode(str(raw[attribute.code])) == pytest.approx(value)
+
+
+def test_target_temperature_is_held():
+    assert encode_attributes({"target_temperature": 19.0}) == {"A88": "1", "A85": 1900}
+
+
+def test_offset_values_are_labelled_in_order():
+    attribute = next(attribute for attribute in ATTRIBUTES if attribute.field == "temperature_offset")
+
+    for index, value in enumerate(TEMPERATURE_OFFSET_VALUES):
+        assert attribute.encode(value) == {"S17": str(index)}
+        assert attribute.decode(str(index)) == value
+
+
+def test_span_labels_cover_every_value():
+    (attribute,) = entity_attributes(Platform.SELECT)
+
+    assert set(attribute.labels) == set(attribute.values.values())
+    assert attribute.labels[1] == "Hysteresis ±0.25°C"
+    assert attribute.labels[0] == "Hysteresis ±0.5°C"
+
+
+def test_decode_attributes_builds_the_state():
+    raw = {attribute.code: DECODED[attribute.field][0] for attribute in ATTRIBUTES}
+
+    state = decode_attributes(raw.__getitem__)
+
+    assert state.diff(make_state(
+        current_temperature=20.1, target_temperature=21.5, frost=5.0, mode=HVACMode.OFF,
+        hot_water_enabled=False, temperature_span=2, temperature_offset=0.5)) == set()
+
+
+def test_unsupported_span_is_left_unknown():
+    (attribute,) = entity_attributes(Platform.SELECT)
+
+    assert attribute.decode("9") is None
+
+
+def test_unsupported_offset_fails():
+    attribute = next(attribute for attribute in ATTRIBUTES if attribute.field == "temperature_offset")
+
+    with pytest.raises(UpdateFailed, match="unsupported value 13"):
+        attribute.decode("13")
+
+
+@pytest.mark.parametrize("changes", [
+    {}, {"current_temperature": 20.0}, {"target_temperature": 99.0}, {"mode": HVACMode.AUTO},
+    {"temperature_offset": 0.25}])
+def test_invalid_changes_are_rejected(changes):
+    with pytest.raises(ValueError):
+        encode_attributes(changes)
@@ -0,0 +1,114 @@
+"""Tests of restoring the token and the states after a restart."""
+import asyncio
+from unittest.mock import patch
+
+from homeassistant.components.climate import ATTR_TEMPERATURE
+from homeassistant.const import ATTR_ASSUMED_STATE, CONF_DEVICES, CONF_PASSWORD, CONF_USERNAME
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.salus_controls.cache import STORAGE_VERSION
+from custom_components.salus_controls.const import DOMAIN
+
+from .conftest import FakeClient, async_setup_entry, make_state
+from .test_climate import climate_entity_id
+
+ENTRY_ID = "entry"
+STORAGE_KEY = f"{DOMAIN}.{ENTRY_ID}"
+
+
+class BlockedClient(FakeClient):
+    """Answers the reads only once released."""
+
+    def __init__(self, device_ids):
+        super().__init__(device_ids)
+        self.released = asyncio.Event()
+
+    async def get_state(self, device_id: str):
+        await self.released.wait()
+        return await super().get_state(device_id)
+
+
+def cached(**states) -> dict:
+    return {
+        "version": STORAGE_VERSION,
+        "key": STORAGE_KEY,
+        "data": {
+            "token": "cached",
+            "token_retrieved_at": 1000.0,
+            "states": {device_id: state.as_dict() for device_id, state in states.items()},
+        },
+    }
+
+
+async def async_setup_cached_entry(hass, client: FakeClient) -> MockConfigEntry:
+    entry = MockConfigEntry(domain=DOMAIN, version=2, entry_id=ENTRY_ID, data={
+        CONF_USERNAME: "me@example.com", CONF_PASSWORD: "secret", CONF_DEVICES: list(client.states)})
+    entry.add_to_hass(hass)
+    with patch("custom_components.salus_controls.create_client_from", return_value=client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    return entry
+
+
+async def async_wait_refreshed(hass, entry: MockConfigEntry) -> None:
+    """Waits for the first refresh, a background task Home Assistant does not wait for."""
+    while entry.runtime_data.stale:
+        await asyncio.sleep(0)
+    await hass.async_block_till_done()
+
+
+async def test_cached_states_are_shown_until_the_first_refresh(hass, hass_storage):
+    hass_storage[STORAGE_KEY] = cached(**{"1": make_state(target_temperature=18.0)})
+    client = BlockedClient(("1",))
+
+    entry = await async_setup_cached_entry(hass, client)
+    await hass.async_block_till_done()
+
+    assert client.token == ("cached", 1000.0)
+    state = hass.states.get(climate_entity_id(hass, "1"))
+    assert state.attributes[ATTR_TEMPERATURE] == 18.0
+    assert state.attributes[ATTR_ASSUMED_STATE] is True
+
+    client.released.set()
+    await async_wait_refreshed(hass, entry)
+
+    state = hass.states.get(climate_entity_id(hass, "1"))
+    assert state.attributes[ATTR_TEMPERATURE] == 21.0
+    assert ATTR_ASSUMED_STATE not in state.attributes
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_unchanged_refresh_clears_the_assumed_state(hass, hass_storage):
+    hass_storage[STORAGE_KEY] = cached(**{"1": make_state()})
+    client = FakeClient(("1",))
+
+    entry = await async_setup_cached_entry(hass, client)
+    await async_wait_refreshed(hass, entry)
+
+    assert client.reads == ["1"]
+    state = hass.states.get(climate_entity_id(hass, "1"))
+    assert ATTR_ASSUMED_STATE not in state.attributes
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_missing_cached_state_refreshes_before_setup(hass, hass_storage):
+    hass_storage[STORAGE_KEY] = cached(**{"1": make_state(target_temperature=18.0)})
+    client = FakeClient(("1", "2"))
+
+    entry = await async_setup_cached_entry(hass, client)
+
+    assert sorted(client.reads) == ["1", "2"]
+    assert entry.runtime_data.data["1"].target_temperature == 21.0
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_states_are_saved_on_unload_and_removed_with_the_entry(hass, hass_storage, client):
+    entry = await async_setup_entry(hass, client)
+    store_key = f"{DOMAIN}.{entry.entry_id}"
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert set(hass_storage[store_key]["data"]["states"]) == {"1", "2"}
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert store_key not in hass_storage
@@ -0,0 +1,67 @@
+"""Tests of recording the exchanges with the Salus cloud."""
+import gzip
+import threading
+
+import pytest
+
+from custom_components.salus_controls.api_client import ApiClient
+from custom_components.salus_controls.capture import (
+    CaptureWriter,
+    ReplayError,
+    read_capture,
+    replay,
+    start_capture,
+    stop_capture,
+)
+from custom_components.salus_controls.trace import REDACTED, PayloadTracer
+from custom_components.salus_controls.transport import Request
+
+
+def test_capture_is_written_by_the_writer_thread(tmp_path, monkeypatch):
+    path = tmp_path / "capture.jsonl.gz"
+    writers = []
+    gzip_open = gzip.open
+
+    def open_file(*args, **kwargs):
+        writers.append(threading.current_thread())
+        return gzip_open(*args, **kwargs)
+
+    monkeypatch.setattr("custom_components.salus_controls.capture.gzip.open", open_file)
+    tracer = PayloadTracer()
+    tracer.add_token("secret-token")
+    request = Request("GET", "https://salus-it500.com/apiv1/devices", "read",
+                      {"params": {"devId": "1", "token": "secret-token"}}, seconds=0.25)
+
+    with CaptureWriter(str(path), tracer) as writer:
+        writer.record(request, 200, b'{"token": "secret-token", "A84": "2000"}')
+        writer.record(request, None, None, "Connection reset")
+
+    assert writers and writers[0] is not threading.current_thread()
+    exchanges = read_capture(str(path))
+    assert [exchange.status for exchange in exchanges] == [200, None]
+    assert exchanges[0].params == {"devId": "1", "token": REDACTED}
+    assert "secret-token" not in exchanges[0].body
+    assert exchanges[1].error == "Connection reset"
+
+
+async def test_replayed_client_reads_the_captured_states(cloud, emulator, tmp_path):
+    path = str(tmp_path / "capture.jsonl.gz")
+    client = ApiClient("me@example.com", "secret", base_url=emulator)
+    writer = start_capture(client, path)
+    try:
+        recorded = [await client.fetch_state(device_id) for device_id in ("1", "2")]
+    finally:
+        stop_capture(client)
+        await client.close()
+    writer.join()
+
+    replayed = ApiClient("me@example.com", "secret", base_url=emulator)
+    replay(replayed, read_capture(path))
+    logins = cloud.stats["login"]
+
+    assert [await replayed.fetch_state(device_id) for device_id in ("2", "1")] == recorded[::-1]
+    assert replayed.transport.remaining == 0
+    assert cloud.stats["login"] == logins
+    with pytest.raises(ReplayError):
+        await replayed.fetch_state("1")
+    await replayed.close()
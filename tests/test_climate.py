@@ -0,0 +1,54 @@
+"""Tests of the thermostat entity."""
+import asyncio
+
+from homeassistant.components.climate import (
+    ATTR_TEMPERATURE,
+    DOMAIN as CLIMATE_DOMAIN,
+    SERVICE_SET_TEMPERATURE,
+)
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.salus_controls.const import DOMAIN
+
+from .conftest import FakeClient, async_setup_entry
+
+
+def climate_entity_id(hass, device_id: str) -> str:
+    return er.async_get(hass).async_get_entity_id(CLIMATE_DOMAIN, DOMAIN, f"{device_id}_climate")
+
+
+async def test_burst_of_service_calls_is_written_once_per_device(hass, client):
+    entry = await async_setup_entry(hass, client)
+    for device in entry.runtime_data.devices.values():
+        device.writes.delay = 0.05
+    entity_ids = [climate_entity_id(hass, device_id) for device_id in ("1", "2")]
+
+    # Calls targeting several entities go through the platform's semaphore
+    await asyncio.gather(*(
+        hass.services.async_call(
+            CLIMATE_DOMAIN, SERVICE_SET_TEMPERATURE,
+            {ATTR_ENTITY_ID: entity_ids, ATTR_TEMPERATURE: temperature}, blocking=True)
+        for temperature in (21.5, 22.0, 22.5, 23.0)))
+
+    assert sorted(client.writes, key=lambda write: write[0]) == [
+        ("1", {"target_temperature": 23.0}), ("2", {"target_temperature": 23.0})]
+    for entity_id in entity_ids:
+        assert hass.states.get(entity_id).attributes[ATTR_TEMPERATURE] == 23.0
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_thermostat_takes_the_name_of_its_device(hass):
+    await async_setup_entry(hass, FakeClient(("1", "2")))
+
+    for device_id in ("1", "2"):
+        entity_id = climate_entity_id(hass, device_id)
+        assert entity_id == f"climate.salus_{device_id}"
+        assert hass.states.get(entity_id).name == f"Salus {device_id}"
+
+
+async def test_single_thermostat_is_named_salus(hass):
+    await async_setup_entry(hass, FakeClient(("1",)))
+
+    assert climate_entity_id(hass, "1") == "climate.salus"
+    assert hass.states.get("climate.salus").name == "Salus"
@@ -0,0 +1,176 @@
+"""Tests of the config flow."""
+import functools
+from unittest.mock import patch
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_DEVICES, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.api_client import ApiClient
+from custom_components.salus_controls.client import AuthenticationError
+from custom_components.salus_controls.const import (
+    BACKEND_API,
+    BACKEND_WEB,
+    CONF_BACKENDS,
+    CONF_FAILOVER,
+    CONF_FEATURES,
+    CONF_LATENCY,
+    CONF_MAX_PARALLEL_FETCHES,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_POLL_INTERVAL,
+    CONF_READ_TIMEOUT,
+    CONF_RETRIES,
+    DOMAIN,
+)
+from custom_components.salus_controls.transport import OPERATION_READ
+from custom_components.salus_controls.web_client import WebClient
+from emulator import Faults
+
+from .conftest import async_setup_entry
+
+USER_INPUT = {CONF_USERNAME: "me@example.com", CONF_PASSWORD: "secret", CONF_DEVICES: "1, 2"}
+
+
+async def probe(client, device_ids):
+    # The web application answers faster
+    return {"login": 0.2, "fetch": 0.3 if isinstance(client, ApiClient) else 0.1}
+
+
+async def _async_configure(hass, user_input: dict, side_effect=probe):
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER})
+    with patch("custom_components.salus_controls.config_flow.probe_backend", side_effect=side_effect):
+        return await hass.config_entries.flow.async_configure(result["flow_id"], user_input)
+
+
+async def _async_configure_against(hass, emulator: str, user_input: dict):
+    """Configures an entry probing the backends of the emulator."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER})
+    with patch("custom_components.salus_controls.config_flow.ApiClient",
+               functools.partial(ApiClient, base_url=emulator)), \
+            patch("custom_components.salus_controls.config_flow.WebClient",
+                  functools.partial(WebClient, base_url=emulator)):
+        return await hass.config_entries.flow.async_configure(result["flow_id"], user_input)
+
+
+async def test_fastest_backend_only_by_default(hass):
+    result = await _async_configure(hass, USER_INPUT)
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"][CONF_DEVICES] == ["1", "2"]
+    assert result["data"][CONF_BACKENDS] == [BACKEND_WEB]
+    assert result["data"][CONF_LATENCY][BACKEND_WEB] == {"login": 0.2, "fetch": 0.1}
+    assert "temperature_offset" not in result["data"][CONF_FEATURES]
+
+
+async def test_failover_is_opt_in(hass):
+    result = await _async_configure(hass, {**USER_INPUT, CONF_FAILOVER: True})
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"][CONF_BACKENDS] == [BACKEND_WEB, BACKEND_API]
+    assert "temperature_offset" in result["data"][CONF_FEATURES]
+
+
+async def test_backend_rejecting_the_credentials_is_left_out(hass):
+    async def api_only(client, device_ids):
+        if not isinstance(client, ApiClient):
+            raise AuthenticationError("rejected")
+        return await probe(client, device_ids)
+
+    result = await _async_configure(hass, {**USER_INPUT, CONF_FAILOVER: True}, api_only)
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"][CONF_BACKENDS] == [BACKEND_API]
+
+
+async def test_credentials_rejected_by_every_backend(hass):
+    result = await _async_configure(hass, USER_INPUT, AuthenticationError("rejected"))
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "auth_error"}
+
+
+async def test_no_backend_available(hass):
+    result = await _async_configure(hass, USER_INPUT, UpdateFailed("unreachable"))
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "connect_error"}
+
+
+async def test_emulated_backends_are_probed(hass, cloud, emulator):
+    result = await _async_configure_against(hass, emulator, {**USER_INPUT, CONF_FAILOVER: True})
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert sorted(result["data"][CONF_BACKENDS]) == [BACKEND_API, BACKEND_WEB]
+    assert set(result["data"][CONF_LATENCY]) == {BACKEND_API, BACKEND_WEB}
+    # Both backends logged in and fetched both devices
+    assert cloud.stats["login"] >= 2
+    assert cloud.stats["read"] >= 4
+
+
+async def test_emulated_backends_reject_the_password(hass, cloud, emulator):
+    result = await _async_configure_against(hass, emulator, {**USER_INPUT, CONF_PASSWORD: "wrong"})
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "auth_error"}
+
+
+async def test_emulated_backends_fail(hass, cloud, emulator):
+    cloud.faults = Faults(error_rate=1.0)
+
+    result = await _async_configure_against(hass, emulator, USER_INPUT)
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "connect_error"}
+
+
+async def test_no_devices_are_probed(hass, cloud, emulator):
+    result = await _async_configure_against(hass, emulator, {**USER_INPUT, CONF_DEVICES: " , "})
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {CONF_DEVICES: "no_devices"}
+    assert not cloud.stats
+
+
+async def test_devices_are_required(hass):
+    result = await _async_configure(hass, {**USER_INPUT, CONF_DEVICES: " , "})
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {CONF_DEVICES: "no_devices"}
+
+
+async def test_poll_interval_outside_its_bounds_is_rejected(hass, client):
+    entry = await async_setup_entry(hass, client)
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {
+        CONF_POLL_INTERVAL: 10, CONF_MIN_POLL_INTERVAL: 20, CONF_MAX_POLL_INTERVAL: 300})
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "invalid_poll_interval"}
+    assert entry.options == {}
+
+
+async def test_options_are_applied_without_reloading(hass, client):
+    entry = await async_setup_entry(hass, client)
+    coordinator = entry.runtime_data
+    semaphore = coordinator._fetch_semaphore
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {
+        CONF_POLL_INTERVAL: 10, CONF_MIN_POLL_INTERVAL: 5, CONF_MAX_POLL_INTERVAL: 15,
+        CONF_READ_TIMEOUT: 4, CONF_RETRIES: 0, CONF_MAX_PARALLEL_FETCHES: 1})
+    await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert entry.runtime_data is coordinator
+    assert coordinator.update_interval.total_seconds() == 15
+    for device in coordinator.devices.values():
+        assert (device.polling.interval, device.polling.min_interval, device.polling.max_interval) == (10, 5, 15)
+    assert coordinator._fetch_semaphore is not semaphore
+    assert client.settings["timeouts"][OPERATION_READ] == 4
+    assert client.settings["retries"] == 0
+    assert client.settings["token_max_age"] is None
@@ -0,0 +1,112 @@
+"""Tests of the coordinator polling and writing to the thermostats of an account."""
+from datetime import timedelta
+
+import pytest
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.coordinator import CONFIRM_ATTEMPTS, SalusCoordinator
+
+from .conftest import FakeClient
+from .test_entity import IgnoringClient
+
+
+class FailingClient(FakeClient):
+    """Fails every write."""
+
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        raise UpdateFailed("rejected")
+
+
+async def test_refresh_records_the_changed_fields(hass, client):
+    coordinator = SalusCoordinator(hass, client, ["1", "2"])
+    await coordinator.async_refresh()
+
+    client.states["1"].current_temperature = 19.5
+    await coordinator.async_refresh()
+
+    assert coordinator.changed_fields == {"1": {"current_temperature"}, "2": frozenset()}
+    await coordinator.async_shutdown()
+
+
+async def test_write_is_shown_before_it_is_confirmed(hass, client):
+    coordinator = SalusCoordinator(hass, client, ["1"], write_delay=0)
+    await coordinator.async_refresh()
+
+    await coordinator.async_set_attributes("1", target_temperature=25.0)
+
+    assert coordinator.data["1"].target_temperature == 25.0
+    assert client.writes == [("1", {"target_temperature": 25.0})]
+    await coordinator.async_refresh()
+    assert coordinator.data["1"].target_temperature == 25.0
+    assert coordinator.devices["1"].rejected_changes == {}
+    await coordinator.async_shutdown()
+
+
+async def test_change_not_applied_is_rejected_until_written_again(hass):
+    client = IgnoringClient(("1",))
+    coordinator = SalusCoordinator(hass, client, ["1"], write_delay=0)
+    await coordinator.async_refresh()
+
+    await coordinator.async_set_attributes("1", target_temperature=25.0)
+    for _ in range(CONFIRM_ATTEMPTS):
+        assert coordinator.data["1"].target_temperature == 25.0
+        await coordinator.async_refresh()
+
+    assert coordinator.data["1"].target_temperature == 21.0
+    assert coordinator.devices["1"].rejected_changes == {"target_temperature": 25.0}
+
+    await coordinator.async_set_attributes("1", target_temperature=24.0)
+    assert coordinator.devices["1"].rejected_changes == {}
+    await coordinator.async_shutdown()
+
+
+async def test_failed_write_drops_the_shown_change(hass):
+    client = FailingClient(("1",))
+    coordinator = SalusCoordinator(hass, client, ["1"], write_delay=0)
+    await coordinator.async_refresh()
+
+    with pytest.raises(UpdateFailed):
+        await coordinator.async_set_attributes("1", target_temperature=25.0)
+
+    assert coordinator.data["1"].target_temperature == 21.0
+    await coordinator.async_shutdown()
+
+
+async def test_scheduled_refresh_polls_due_devices_only(hass, client):
+    coordinator = SalusCoordinator(hass, client, ["1", "2"])
+    await coordinator.async_refresh()
+    assert sorted(client.reads) == ["1", "2"]
+
+    client.reads.clear()
+    now = hass.loop.time()
+    coordinator.devices["1"].due_at = now
+    coordinator.devices["2"].due_at = now + 45
+    await coordinator._handle_refresh_interval()
+
+    assert client.reads == ["1"]
+    assert set(coordinator.data) == {"1", "2"}
+    assert coordinator.data["2"] is not None
+    assert coordinator.update_interval <= timedelta(seconds=45)
+    await coordinator.async_shutdown()
+
+
+async def test_requested_refresh_polls_all_devices(hass, client):
+    coordinator = SalusCoordinator(hass, client, ["1", "2"])
+    await coordinator.async_refresh()
+    client.reads.clear()
+
+    await coordinator.async_refresh()
+
+    assert sorted(client.reads) == ["1", "2"]
+    await coordinator.async_shutdown()
+
+
+async def test_failing_device_is_unavailable_alone(hass, client):
+    coordinator = SalusCoordinator(hass, client, ["1", "2", "3"])
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert coordinator.data["3"] is None
+    assert coordinator.data["1"] is not None
+    await coordinator.async_shutdown()
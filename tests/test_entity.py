@@ -0,0 +1,74 @@
+"""Tests of the state the entities show."""
+from datetime import timedelta
+
+from homeassistant.components.climate import (
+    ATTR_TEMPERATURE,
+    DOMAIN as CLIMATE_DOMAIN,
+    SERVICE_SET_TEMPERATURE,
+)
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.salus_controls.coordinator import CONFIRM_ATTEMPTS, CONFIRM_DELAY_SECONDS
+from custom_components.salus_controls.diagnostics import async_get_config_entry_diagnostics
+
+from .conftest import FakeClient, async_setup_entry
+from .test_climate import climate_entity_id
+
+
+async def async_confirm(hass, attempts: int) -> None:
+    """Lets the coordinator fetch the written devices the given number of times."""
+    now = dt_util.utcnow()
+    for attempt in range(1, attempts + 1):
+        async_fire_time_changed(hass, now + timedelta(seconds=attempt * (CONFIRM_DELAY_SECONDS + 1)))
+        await hass.async_block_till_done()
+
+
+class IgnoringClient(FakeClient):
+    """Accepts the writes without the thermostat applying them."""
+
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        self.writes.append((device_id, changes))
+
+
+async def test_entity_shows_the_first_refresh(hass, client):
+    entry = await async_setup_entry(hass, client)
+
+    state = hass.states.get(climate_entity_id(hass, "1"))
+    assert state.attributes[ATTR_TEMPERATURE] == 21.0
+    assert sorted(client.reads) == ["1", "2"]
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_rejected_changes_are_shown(hass):
+    client = IgnoringClient(("1",))
+    entry = await async_setup_entry(hass, client)
+    entity_id = climate_entity_id(hass, "1")
+
+    await hass.services.async_call(
+        CLIMATE_DOMAIN, SERVICE_SET_TEMPERATURE,
+        {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 25.0}, blocking=True)
+    await async_confirm(hass, CONFIRM_ATTEMPTS)
+
+    state = hass.states.get(entity_id)
+    assert state.attributes[ATTR_TEMPERATURE] == 21.0
+    assert state.attributes["rejected_changes"] == {"target_temperature": 25.0}
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["rejected_changes"] == {"1": {"target_temperature": 25.0}}
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_confirmed_changes_are_not_shown_as_rejected(hass, client):
+    entry = await async_setup_entry(hass, client)
+    entity_id = climate_entity_id(hass, "1")
+
+    await hass.services.async_call(
+        CLIMATE_DOMAIN, SERVICE_SET_TEMPERATURE,
+        {ATTR_ENTITY_ID: entity_id, ATTR_TEMPERATURE: 25.0}, blocking=True)
+    await async_confirm(hass, 1)
+
+    state = hass.states.get(entity_id)
+    assert state.attributes[ATTR_TEMPERATURE] == 25.0
+    assert "rejected_changes" not in state.attributes
+    await hass.config_entries.async_unload(entry.entry_id)
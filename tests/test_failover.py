@@ -0,0 +1,127 @@
+"""Tests of the hedged reads and failed over writes of the failover client."""
+import asyncio
+import math
+from unittest.mock import AsyncMock
+
+import pytest
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.client import CloudClient
+from custom_components.salus_controls.failover import Backend, FailoverClient
+
+from .conftest import make_state
+
+
+class SlowClient(CloudClient):
+    """Answers every read after a fixed delay."""
+
+    def __init__(self, delay: float, temperature: float):
+        super().__init__(token_max_age=3600)
+        self.delay = delay
+        self.temperature = temperature
+        self.started = 0
+        self.cancelled = 0
+
+    async def fetch_state(self, device_id: str):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return make_state(current_temperature=self.temperature)
+
+
+def seed(backend: Backend, latency: float) -> None:
+    backend.latencies.extend([latency] * 10)
+
+
+def test_unmeasured_backend_ranks_last():
+    measured = Backend("api", SlowClient(0.0, 20.0))
+    seed(measured, 5.0)
+    unmeasured = Backend("web", SlowClient(0.0, 20.0))
+    assert unmeasured.rank()[2] == math.inf
+    assert sorted([unmeasured, measured], key=Backend.rank) == [measured, unmeasured]
+
+
+async def test_hedge_fires_after_p95_and_first_answer_wins():
+    slow, fast = SlowClient(1.0, 20.0), SlowClient(0.0, 22.0)
+    client = FailoverClient({"api": slow, "web": fast})
+    seed(client.backends[0], 0.02)
+    seed(client.backends[1], 0.5)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    state = await client.fetch_state("1")
+
+    assert state.current_temperature == 22.0
+    assert loop.time() - started < 0.5
+    assert (slow.started, fast.started) == (1, 1)
+    await client.close()
+
+
+async def test_no_hedge_when_primary_answers_in_time():
+    fast, other = SlowClient(0.0, 20.0), SlowClient(0.0, 22.0)
+    client = FailoverClient({"api": fast, "web": other})
+    seed(client.backends[0], 0.5)
+    seed(client.backends[1], 0.5)
+
+    assert (await client.fetch_state("1")).current_temperature == 20.0
+    assert other.started == 0
+    await client.close()
+
+
+async def test_cancellation_cancels_both_reads():
+    first, second = SlowClient(10.0, 20.0), SlowClient(10.0, 22.0)
+    client = FailoverClient({"api": first, "web": second})
+    seed(client.backends[0], 0.01)
+    seed(client.backends[1], 0.01)
+
+    read = asyncio.ensure_future(client.get_state("1"))
+    await asyncio.sleep(0.1)
+    assert (first.started, second.started) == (1, 1)
+    read.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await read
+    # The cancellation passes through the read caches of both clients
+    await asyncio.sleep(0.01)
+
+    assert (first.cancelled, second.cancelled) == (1, 1)
+    await client.close()
+
+
+async def test_losing_read_is_cancelled():
+    slow, fast = SlowClient(10.0, 20.0), SlowClient(0.0, 22.0)
+    client = FailoverClient({"api": slow, "web": fast})
+    seed(client.backends[0], 0.02)
+    seed(client.backends[1], 0.5)
+
+    await client.fetch_state("1")
+    await asyncio.sleep(0.01)
+
+    assert slow.cancelled == 1
+    await client.close()
+
+
+class FailingClient(SlowClient):
+    """Rejects every write."""
+
+    writable_fields = frozenset(("target_temperature",))
+
+    async def set_attributes(self, device_id: str, **changes) -> None:
+        self.started += 1
+        raise UpdateFailed("rejected")
+
+
+async def test_write_fails_over_to_the_next_backend():
+    failing, other = FailingClient(0.0, 20.0), FailingClient(0.0, 20.0)
+    other.set_attributes = AsyncMock()
+    client = FailoverClient({"api": failing, "web": other})
+
+    await client.set_attributes("1", target_temperature=21.0)
+
+    assert failing.started == 1
+    other.set_attributes.assert_awaited_once_with("1", target_temperature=21.0)
+    assert client.backends[0].failures == 1
+    await client.close()
@@ -0,0 +1,116 @@
+"""Tests of setting up and migrating the entries."""
+from unittest.mock import patch
+
+from homeassistant.const import CONF_DEVICE_ID, CONF_DEVICES, CONF_PASSWORD, CONF_USERNAME
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.salus_controls import async_migrate_entry, backend_of, create_client_from
+from custom_components.salus_controls.accounts import AccountRegistry
+from custom_components.salus_controls.const import (
+    BACKEND_API,
+    BACKEND_AUTO,
+    BACKEND_WEB,
+    CONF_BACKEND,
+    CONF_BACKENDS,
+    CONF_FEATURES,
+    CONF_LATENCY,
+    DOMAIN,
+)
+from custom_components.salus_controls.failover import FailoverClient
+
+from .conftest import FakeClient, async_setup_entry
+
+CREDENTIALS = {CONF_USERNAME: "me@example.com", CONF_PASSWORD: "secret"}
+
+
+async def test_migrate_single_device_entry_to_api_backend(hass):
+    entry = MockConfigEntry(domain=DOMAIN, version=1, data={**CREDENTIALS, CONF_DEVICE_ID: "1"})
+    entry.add_to_hass(hass)
+
+    assert await async_migrate_entry(hass, entry)
+
+    assert (entry.version, entry.minor_version) == (2, 2)
+    assert entry.data == {**CREDENTIALS, CONF_DEVICES: ["1"], CONF_BACKENDS: [BACKEND_API]}
+    assert backend_of(entry.data) == BACKEND_API
+
+
+async def test_migrate_entry_failing_over_to_both_backends(hass):
+    data = {**CREDENTIALS, CONF_DEVICES: ["1"], CONF_BACKEND: BACKEND_AUTO}
+    entry = MockConfigEntry(domain=DOMAIN, version=2, minor_version=1, data=data)
+    entry.add_to_hass(hass)
+
+    assert await async_migrate_entry(hass, entry)
+
+    assert entry.minor_version == 2
+    assert entry.data == {**CREDENTIALS, CONF_DEVICES: ["1"], CONF_BACKENDS: [BACKEND_API, BACKEND_WEB]}
+    assert backend_of(entry.data) == BACKEND_AUTO
+
+
+def test_backend_defaults_to_api():
+    assert backend_of({**CREDENTIALS, CONF_DEVICES: ["1"]}) == BACKEND_API
+
+
+async def test_failover_client_seeded_with_probed_latency():
+    client = create_client_from({
+        **CREDENTIALS, CONF_BACKENDS: [BACKEND_WEB, BACKEND_API],
+        CONF_LATENCY: {BACKEND_WEB: {"login": 0.5, "fetch": 0.2}, BACKEND_API: {"login": 0.5, "fetch": 0.4}}})
+
+    assert isinstance(client, FailoverClient)
+    assert [backend.name for backend in client.backends] == [BACKEND_WEB, BACKEND_API]
+    assert [list(backend.latencies) for backend in client.backends] == [[0.2], [0.4]]
+    await client.close()
+
+
+async def test_entities_follow_configured_features(hass, client):
+    await async_setup_entry(hass, client, **{CONF_FEATURES: ["target_temperature", "mode"]})
+
+    assert hass.states.async_entity_ids("switch") == []
+    assert hass.states.async_entity_ids("number") == []
+    assert len(hass.states.async_entity_ids("climate")) == 2
+
+
+async def test_entities_default_to_client_features(hass, client):
+    await async_setup_entry(hass, client)
+
+    assert len(hass.states.async_entity_ids("switch")) == 2
+
+
+async def test_entries_of_an_account_share_one_client(hass, client):
+    entries = [
+        MockConfigEntry(domain=DOMAIN, version=2, minor_version=2,
+                        data={**CREDENTIALS, CONF_DEVICES: [device_id], CONF_BACKENDS: [BACKEND_API]})
+        for device_id in ("1", "2")]
+    with patch("custom_components.salus_controls.create_client_from", return_value=client) as create:
+        for entry in entries:
+            entry.add_to_hass(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert create.call_count == 1
+    assert entries[0].runtime_data.client is entries[1].runtime_data.client
+
+    await hass.config_entries.async_unload(entries[0].entry_id)
+    assert not client.closed
+    await hass.config_entries.async_unload(entries[1].entry_id)
+    assert client.closed
+
+
+def test_changed_password_gets_a_new_client():
+    accounts = AccountRegistry()
+    client = accounts.acquire(BACKEND_API, "me@example.com", "secret", FakeClient)
+
+    assert accounts.acquire(BACKEND_API, "Me@Example.com", "secret", FakeClient) is client
+    assert accounts.acquire(BACKEND_API, "me@example.com", "changed", FakeClient) is not client
+    assert len(accounts) == 2
+
+
+async def test_client_is_closed_on_the_last_release():
+    accounts = AccountRegistry()
+    client = accounts.acquire(BACKEND_API, "me@example.com", "secret", FakeClient)
+    accounts.acquire(BACKEND_API, "me@example.com", "secret", FakeClient)
+
+    await accounts.async_release(client)
+    assert not client.closed
+    await accounts.async_release(client)
+    assert client.closed
+    assert len(accounts) == 0
@@ -0,0 +1,96 @@
+"""Tests of the rolling timings and counters."""
+import pytest
+
+from custom_components.salus_controls.metrics import (
+    COUNTER_ERRORS,
+    COUNTER_REQUESTS,
+    MIN_RATE_SECONDS,
+    Metrics,
+    RollingCounter,
+    RollingHistogram,
+)
+
+
+class Clock:
+    """Time advanced by the test."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_histogram_percentiles():
+    histogram = RollingHistogram()
+    for value in range(100, 0, -1):
+        histogram.observe(value)
+
+    assert histogram.percentile(0.5) == 51
+    assert histogram.percentile(0.95) == 96
+    assert histogram.percentile(1.0) == 100
+    assert histogram.last == 1
+
+
+def test_histogram_keeps_the_most_recent_samples():
+    histogram = RollingHistogram(size=10)
+    for value in range(20):
+        histogram.observe(value)
+
+    summary = histogram.as_dict()
+    assert (summary["count"], summary["last"], summary["max"]) == (10, 19, 19)
+    assert histogram.percentile(0.0) == 10
+
+
+def test_empty_histogram_has_no_percentile():
+    assert RollingHistogram().percentile(0.95) is None
+    assert RollingHistogram().last is None
+
+
+def test_counter_drops_events_outside_the_window():
+    clock = Clock()
+    counter = RollingCounter(window=3600, clock=clock)
+    counter.increment()
+    clock.now = 1800
+    counter.increment()
+
+    assert counter.count() == 2
+    clock.now = 3600
+    assert counter.count() == 1
+    clock.now = 5400
+    assert counter.count() == 0
+
+
+def test_counter_rate_is_not_extrapolated_from_a_short_time():
+    clock = Clock()
+    counter = RollingCounter(window=3600, clock=clock)
+    clock.now = 1
+    counter.increment()
+
+    assert counter.per_hour() == pytest.approx(3600 / MIN_RATE_SECONDS)
+    clock.now = 3600
+    assert counter.per_hour() == pytest.approx(1)
+
+
+def test_failed_block_is_timed():
+    clock = Clock()
+    metrics = Metrics(clock=clock)
+
+    with pytest.raises(RuntimeError), metrics.time("fetch", "1"):
+        clock.now = 0.25
+        raise RuntimeError()
+
+    assert metrics.histogram("fetch", "1").last == 0.25
+    assert metrics.histogram("fetch").last is None
+
+
+def test_error_rate():
+    metrics = Metrics()
+    assert metrics.error_rate() is None
+
+    for _ in range(4):
+        metrics.increment(COUNTER_REQUESTS)
+    metrics.increment(COUNTER_ERRORS)
+
+    assert metrics.error_rate() == 0.25
+    assert metrics.as_dict()["error_rate"] == 0.25
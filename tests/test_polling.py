@@ -0,0 +1,73 @@
+"""Tests of the adaptive polling policy."""
+from datetime import timedelta
+
+from homeassistant.components.climate.const import HVACAction
+
+from custom_components.salus_controls.polling import (
+    DEFAULT_INTERVAL_SECONDS,
+    DEFAULT_MAX_INTERVAL_SECONDS,
+    DEFAULT_MIN_INTERVAL_SECONDS,
+    AdaptivePolling,
+)
+from emulator.thermostat import Thermostat
+
+from .conftest import make_state
+
+
+def test_failures_back_off_without_overflow():
+    polling = AdaptivePolling()
+    for _ in range(2000):
+        interval = polling.next_interval(make_state(), None, 0.0)
+    assert interval == timedelta(seconds=DEFAULT_MAX_INTERVAL_SECONDS)
+
+
+def test_temperature_noise_backs_off():
+    polling = AdaptivePolling()
+    previous = make_state()
+    intervals = []
+    for poll in range(10):
+        # Wanders by a tenth of a degree around 20
+        current = make_state(current_temperature=20.0 + (poll % 2) / 10)
+        intervals.append(polling.next_interval(previous, current, poll * 60.0))
+        previous = current
+    assert intervals[0] == timedelta(seconds=DEFAULT_INTERVAL_SECONDS)
+    assert intervals[-1] == timedelta(seconds=DEFAULT_MAX_INTERVAL_SECONDS)
+
+
+def test_transition_polls_quickly_for_a_window():
+    polling = AdaptivePolling()
+    previous = make_state()
+    for poll in range(10):
+        polling.next_interval(previous, previous, poll * 60.0)
+    heating_off = make_state(action=HVACAction.IDLE)
+    assert polling.next_interval(previous, heating_off, 600.0) == timedelta(
+        seconds=DEFAULT_MIN_INTERVAL_SECONDS)
+    assert polling.next_interval(heating_off, heating_off, 1000.0) == timedelta(
+        seconds=DEFAULT_INTERVAL_SECONDS)
+
+
+def test_day_of_heating_needs_fewer_polls_than_fixed_interval():
+    now = 0.0
+    thermostat = Thermostat(clock=lambda: now)
+    polling = AdaptivePolling()
+    previous = None
+    polls = 0
+    day = 24 * 3600
+    # A new setpoint in the morning and in the evening
+    setpoints = {7 * 3600: 21.0, 9 * 3600: 17.0, 17 * 3600: 21.0, 23 * 3600: 17.0}
+    while now < day:
+        for at, target in list(setpoints.items()):
+            if at <= now:
+                thermostat.target_temperature = target
+                polling.notify_activity(now)
+                del setpoints[at]
+        thermostat.advance()
+        current = make_state(
+            current_temperature=round(thermostat.measured_temperature, 1),
+            target_temperature=thermostat.target_temperature,
+            action=HVACAction.HEATING if thermostat.heating else HVACAction.IDLE)
+        polls += 1
+        now += polling.next_interval(previous, current, now).total_seconds()
+        previous = current
+
+    assert polls < day / DEFAULT_INTERVAL_SECONDS / 2
@@ -0,0 +1,88 @@
+"""Tests of sharing the reads of a device."""
+import asyncio
+
+import pytest
+
+from custom_components.salus_controls.read_cache import ReadCache
+
+from .conftest import make_state
+
+
+class Fetch:
+    """Fetches after the release event is set, counting the fetches and cancellations."""
+
+    def __init__(self):
+        self.count = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, device_id: str):
+        self.count += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return make_state()
+
+
+async def test_concurrent_reads_share_one_fetch():
+    fetch = Fetch()
+    cache = ReadCache(fetch)
+
+    reads = [asyncio.ensure_future(cache.async_get("1")) for _ in range(5)]
+    await asyncio.sleep(0)
+    fetch.release.set()
+    states = await asyncio.gather(*reads)
+
+    assert fetch.count == 1
+    assert all(state is states[0] for state in states)
+    # Fresh enough to be reused without a request
+    assert await cache.async_get("1") is states[0]
+    assert fetch.count == 1
+
+
+async def test_invalidated_state_is_fetched_again():
+    fetch = Fetch()
+    fetch.release.set()
+    cache = ReadCache(fetch)
+
+    first = await cache.async_get("1")
+    cache.invalidate("1")
+
+    assert await cache.async_get("1") is not first
+    assert fetch.count == 2
+
+
+async def test_fetch_continues_while_a_caller_waits():
+    fetch = Fetch()
+    cache = ReadCache(fetch)
+
+    cancelled = asyncio.ensure_future(cache.async_get("1"))
+    waiting = asyncio.ensure_future(cache.async_get("1"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    fetch.release.set()
+
+    assert await waiting is not None
+    assert (fetch.count, fetch.cancelled) == (1, 0)
+
+
+async def test_cancelling_every_caller_cancels_the_fetch():
+    fetch = Fetch()
+    cache = ReadCache(fetch)
+
+    reads = [asyncio.ensure_future(cache.async_get("1")) for _ in range(2)]
+    await asyncio.sleep(0)
+    for read in reads:
+        read.cancel()
+    await asyncio.gather(*reads, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert fetch.cancelled == 1
+    # The next caller starts a new fetch
+    fetch.release.set()
+    assert await cache.async_get("1") is not None
+    assert fetch.count == 2
@@ -0,0 +1,36 @@
+"""Tests of the diagnostic sensors."""
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.salus_controls.metrics import METRIC_FETCH
+
+from .conftest import async_setup_entry
+
+
+def sensor_keys(hass, entry) -> set[str]:
+    """Returns the unique IDs of the sensors of the entry."""
+    return {
+        registry_entry.unique_id
+        for registry_entry in er.async_entries_for_config_entry(er.async_get(hass), entry.entry_id)
+        if registry_entry.domain == "sensor"}
+
+
+async def test_account_sensors_only_for_the_first_device(hass, client):
+    entry = await async_setup_entry(hass, client)
+
+    assert sensor_keys(hass, entry) == {
+        "1_fetch_latency", "2_fetch_latency",
+        "1_poll_latency", "1_token_refreshes", "1_error_rate", "1_requests"}
+    await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_fetch_latency_of_each_device(hass, client):
+    for seconds in (0.1, 0.2, 0.3):
+        client.metrics.observe(METRIC_FETCH, seconds, "2")
+    entry = await async_setup_entry(hass, client)
+
+    registry = er.async_get(hass)
+    entity_id = registry.async_get_entity_id("sensor", "salus_controls", "2_fetch_latency")
+    assert float(hass.states.get(entity_id).state) == 300.0
+    entity_id = registry.async_get_entity_id("sensor", "salus_controls", "1_fetch_latency")
+    assert hass.states.get(entity_id).state == "unknown"
+    await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,73 @@
+"""Tests of the single-flight token management."""
+import asyncio
+
+import pytest
+
+from custom_components.salus_controls.token_manager import TokenManager
+
+
+class Login:
+    """Logs in after the release event is set, counting the logins."""
+
+    def __init__(self):
+        self.count = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.count += 1
+        await self.release.wait()
+        return f"token-{self.count}"
+
+
+async def test_concurrent_callers_share_one_login():
+    login = Login()
+    tokens = TokenManager(login, max_age=3600)
+
+    callers = [asyncio.ensure_future(tokens.async_get_token()) for _ in range(10)]
+    await asyncio.sleep(0)
+    login.release.set()
+
+    assert await asyncio.gather(*callers) == ["token-1"] * 10
+    assert login.count == 1
+
+
+async def test_cancelled_caller_leaves_the_login_running():
+    login = Login()
+    tokens = TokenManager(login, max_age=3600)
+
+    cancelled = asyncio.ensure_future(tokens.async_get_token())
+    waiting = asyncio.ensure_future(tokens.async_get_token())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    login.release.set()
+
+    assert await waiting == "token-1"
+    assert login.count == 1
+
+
+async def test_token_refreshed_in_background_before_expiry():
+    now = 0.0
+    login = Login()
+    login.release.set()
+    tokens = TokenManager(login, max_age=3600, refresh_margin=300, clock=lambda: now)
+    assert await tokens.async_get_token() == "token-1"
+
+    now = 3400.0
+    # The current token is still handed out while the new one is fetched
+    assert await tokens.async_get_token() == "token-1"
+    await asyncio.sleep(0)
+    assert await tokens.async_get_token() == "token-2"
+    assert login.count == 2
+
+
+async def test_rejected_token_is_replaced():
+    login = Login()
+    login.release.set()
+    tokens = TokenManager(login, max_age=3600)
+    token = await tokens.async_get_token()
+
+    tokens.invalidate(token)
+
+    assert await tokens.async_get_token() == "token-2"
@@ -0,0 +1,122 @@
+"""Tests of the recording of the exchanges with the Salus cloud."""
+import json
+
+from custom_components.salus_controls.api_client import ApiClient
+from custom_components.salus_controls.trace import MAX_BODY_CHARS, REDACTED, PayloadTracer
+from custom_components.salus_controls.transport import Request, Response
+
+
+def _request(**params) -> Request:
+    return Request("GET", "https://salus.example/api", "read", {"params": params})
+
+
+def test_requests_are_sampled_at_the_sample_rate():
+    draws = iter((0.05, 0.5, 0.09, 0.95))
+    tracer = PayloadTracer(sample_rate=0.1, rng=lambda: next(draws))
+
+    assert [tracer.wants(_request(devId="1")) for _ in range(4)] == [True, False, True, False]
+
+
+def test_nothing_is_sampled_by_default():
+    tracer = PayloadTracer(rng=lambda: 0.0)
+
+    assert not tracer.wants(_request(devId="1"))
+    assert tracer.enabled
+    assert not PayloadTracer(errors=False).enabled
+
+
+def test_requests_of_the_traced_devices_are_always_recorded():
+    tracer = PayloadTracer(errors=False, devices=["2"], rng=lambda: 0.0)
+
+    assert tracer.enabled
+    assert tracer.wants(_request(devId="2"))
+    assert not tracer.wants(_request(devId="1"))
+    assert not tracer.wants(_request())
+
+
+def test_failure_of_a_sampled_exchange_is_added_to_its_record():
+    tracer = PayloadTracer()
+    request = _request(devId="1")
+    request.exchange = tracer.record(request, 200, b"{}")
+
+    tracer.record_failure(Response(200, b"{}", request), ValueError("not a state"))
+
+    assert [exchange.error for exchange in tracer.exchanges] == ["not a state"]
+
+
+def test_failure_is_recorded_only_while_tracing_errors():
+    response = Response(200, b"<html>", _request(devId="1"))
+    tracer = PayloadTracer(errors=False)
+
+    tracer.record_failure(response, ValueError())
+    assert tracer.exchanges == []
+
+    tracer.errors = True
+    tracer.record_failure(response, ValueError())
+    assert [(exchange.status, exchange.body, exchange.error) for exchange in tracer.exchanges] == [
+        (200, "<html>", "ValueError")]
+
+
+def test_secret_parameters_are_redacted():
+    tracer = PayloadTracer()
+    request = Request("POST", "https://salus.example/login", "login", {
+        "data": {"IDemail": "me@example.com", "password": "secret", "token": "abc", "lang": "en"}})
+
+    exchange = tracer.record(request, 200, None)
+
+    assert exchange.params == {"IDemail": REDACTED, "password": REDACTED, "token": REDACTED, "lang": "en"}
+
+
+def test_issued_tokens_are_redacted_from_the_bodies():
+    tracer = PayloadTracer()
+
+    json_body = tracer.record(_request(), 200, b'{"securityToken": "abc", "password" : "xyz"}').body
+    form_body = tracer.record(_request(), 200, b'<input id="token" type="hidden" value="def">').body
+
+    assert json.loads(json_body) == {"securityToken": REDACTED, "password": REDACTED}
+    assert form_body == f'<input id="token" type="hidden" value="{REDACTED}">'
+
+
+def test_credentials_and_known_tokens_are_redacted_from_the_bodies():
+    tracer = PayloadTracer()
+    tracer.add_credentials("me@example.com", "secret", "")
+    tracer.add_token("abc")
+    replacement = PayloadTracer()
+    replacement.adopt(tracer)
+
+    exchange = replacement.record(_request(), 200, b"me@example.com secret abc ok")
+
+    assert exchange.body == f"{REDACTED} {REDACTED} {REDACTED} ok"
+
+
+def test_long_bodies_are_cut():
+    body = b"x" * (MAX_BODY_CHARS + 10)
+
+    exchange = PayloadTracer().record(_request(), 200, body)
+
+    assert exchange.body == "x" * MAX_BODY_CHARS + f"... ({len(body)} bytes)"
+
+
+def test_oldest_exchanges_are_dropped():
+    tracer = PayloadTracer(size=2)
+
+    for device_id in ("1", "2", "3"):
+        tracer.record(_request(devId=device_id), 200, None)
+
+    assert [exchange.params["devId"] for exchange in tracer.exchanges] == ["2", "3"]
+
+
+async def test_traced_exchanges_with_the_emulator_hold_no_secrets(emulator):
+    client = ApiClient("me@example.com", "secret", base_url=emulator)
+    client.configure(trace_sample_rate=1.0)
+
+    try:
+        await client.get_state("1")
+        token, _ = client.token
+    finally:
+        await client.close()
+
+    exchanges = [str(exchange.as_dict()) for exchange in client.tracer.exchanges]
+    assert len(exchanges) >= 2
+    for secret in ("me@example.com", "secret", token):
+        assert not any(secret in exchange for exchange in exchanges)
@@ -0,0 +1,103 @@
+"""Tests of the circuit breaker and the retries of the transport."""
+import asyncio
+
+import aiohttp
+import pytest
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.transport import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Response,
+    Transport,
+)
+
+
+class FakeTransport(Transport):
+    """Answers the requests with the queued outcomes."""
+
+    def __init__(self, *outcomes, **kwargs):
+        super().__init__(lambda: None, **kwargs)
+        self.outcomes = list(outcomes)
+        self.sent = 0
+
+    async def _send(self, method: str, url: str, operation: str, **kwargs) -> Response:
+        self.sent += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == "hang":
+            await asyncio.sleep(3600)
+        return Response(outcome, b"")
+
+
+def opened_breaker(clock) -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=3, reset_seconds=60, clock=clock)
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_probes_once_and_closes():
+    now = 0.0
+    breaker = opened_breaker(lambda: now)
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    now = 61.0
+    breaker.before_request()
+    # Only the probe is let through
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert not breaker.is_open
+    breaker.before_request()
+    breaker.before_request()
+
+
+def test_failed_probe_pauses_again():
+    now = 0.0
+    breaker = opened_breaker(lambda: now)
+    now = 61.0
+    breaker.before_request()
+
+    breaker.record_failure()
+
+    assert breaker.retry_after == 60
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+async def test_transport_opens_breaker_after_consecutive_failures():
+    transport = FakeTransport(
+        *[aiohttp.ClientConnectionError("reset")] * 3,
+        breaker=CircuitBreaker(threshold=3), retries=0)
+
+    for _ in range(3):
+        with pytest.raises(UpdateFailed):
+            await transport.request("GET", "https://example.com", "read", idempotent=True)
+    with pytest.raises(CircuitOpenError):
+        await transport.request("GET", "https://example.com", "read", idempotent=True)
+
+    assert transport.sent == 3
+
+
+async def test_cancelled_probe_lets_the_next_request_probe():
+    now = 0.0
+    breaker = opened_breaker(lambda: now)
+    transport = FakeTransport("hang", 200, breaker=breaker)
+    now = 61.0
+
+    probe = asyncio.ensure_future(transport.request("GET", "https://example.com", "read"))
+    await asyncio.sleep(0)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    response = await transport.request("GET", "https://example.com", "read")
+    assert response.status == 200
+    assert not breaker.is_open
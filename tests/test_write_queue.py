@@ -0,0 +1,75 @@
+"""Tests of merging the writes to a thermostat."""
+import asyncio
+
+import pytest
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.salus_controls.write_queue import WriteQueue
+
+
+class Writes:
+    """Records the writes, failing them while an error is set."""
+
+    def __init__(self):
+        self.calls = []
+        self.error = None
+
+    async def __call__(self, **changes) -> None:
+        self.calls.append(changes)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+
+
+async def test_burst_is_coalesced_into_one_write():
+    writes = Writes()
+    queue = WriteQueue(writes, delay=0.05)
+
+    await asyncio.gather(
+        queue.async_enqueue(target_temperature=21.0),
+        queue.async_enqueue(target_temperature=21.5),
+        queue.async_enqueue(hot_water_enabled=False),
+        queue.async_enqueue(target_temperature=22.0))
+
+    assert writes.calls == [{"target_temperature": 22.0, "hot_water_enabled": False}]
+
+
+async def test_immediate_write_takes_the_queued_changes_along():
+    writes = Writes()
+    queue = WriteQueue(writes, delay=10)
+
+    debounced = asyncio.ensure_future(queue.async_enqueue(target_temperature=22.0))
+    await asyncio.sleep(0)
+    await queue.async_enqueue(False, mode="off")
+    await debounced
+
+    assert writes.calls == [{"target_temperature": 22.0, "mode": "off"}]
+
+
+async def test_error_reaches_every_caller_of_the_write():
+    writes = Writes()
+    writes.error = UpdateFailed("rejected")
+    queue = WriteQueue(writes, delay=0.05)
+
+    results = await asyncio.gather(
+        queue.async_enqueue(target_temperature=21.0),
+        queue.async_enqueue(target_temperature=22.0),
+        return_exceptions=True)
+
+    assert [type(result) for result in results] == [UpdateFailed, UpdateFailed]
+    assert len(writes.calls) == 1
+
+
+async def test_cancelled_caller_does_not_cancel_the_write():
+    writes = Writes()
+    queue = WriteQueue(writes, delay=0.05)
+
+    cancelled = asyncio.ensure_future(queue.async_enqueue(target_temperature=21.0))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await queue.async_close()
+
+    assert writes.calls == [{"target_temperature": 21.0}]